@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Measures attachment download throughput of Downloader for different numbers of
+in-flight downloads against a local HTTP stand-in server, with connections kept
+open for reuse by the http client (pooled) and with a new connection for every
+file (unpooled).
+Reports the number of connections the server accepted per 1,000 files.
+
+Usage:
+    python -m benchmarks.download_benchmark --files 1000 --latency 0.02 \\
+        --workers 1 4 16 --tls
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.http_stub import HTTPStub
+from slack_export_csv_converter.downloader import Downloader
+from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.http_client import HTTPClient
+
+
+def run(
+    files: int, body_size: int, latency: float, max_workers: int, tls: bool, pooled: bool
+) -> None:
+    with HTTPStub(body_size=body_size, latency=latency, tls=tls) as stub:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            downloads = [
+                (stub.url(f"files/{x}.bin"), Path(tmp_dir) / f"{x}.bin")
+                for x in range(files)
+            ]
+            # without idle connections to reuse, every request opens a connection
+            http_client = HTTPClient(
+                max_idle_connections=max_workers if pooled else 0, cafile=stub.cafile
+            )
+            downloader = Downloader(
+                FileIO(http_client=http_client), max_workers=max_workers
+            )
+
+            start = time.perf_counter()
+            result = downloader.download_all(downloads)
+            elapsed = time.perf_counter() - start
+            http_client.close()
+
+    print(
+        f"{'pooled' if pooled else 'unpooled':<8} workers={max_workers:<4} "
+        f"files={files} elapsed={elapsed:.2f}s files/sec={files / elapsed:.1f} "
+        f"connections/1000 files={stub.connections * 1000 / files:.1f} "
+        f"downloaded={result.downloaded} skipped={result.skipped} "
+        f"failed={result.failed}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--body-size", type=int, default=16 * 1024)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--tls", action="store_true")
+    args = parser.parse_args()
+
+    for max_workers in args.workers:
+        for pooled in [False, True]:
+            run(
+                args.files,
+                args.body_size,
+                args.latency,
+                max_workers,
+                args.tls,
+                pooled,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Times Converter.run end to end on synthetic exports of increasing size, with
+attachments downloaded from a local HTTP stand-in server.
+Each size is converted in a fresh process so that its peak RSS is its own.
+
+Reports messages/sec and peak RSS for each size, along with time spent in each
+stage (reading message files, generating rows, writing csv files, downloading)
+when channels are converted in a single process.
+Stages overlap in pipelined mode, so their times may add up to more than elapsed.
+--read-latency adds a delay to opening each message file, standing in for network
+mounted storage.
+--search-index times a few queries of the full text index once it is written,
+one of them shorter than a trigram and so scanned for.
+--channel-pattern, --since and --until convert only part of the export, whose days start
+on 2023-01-01 in UTC, to compare targeted extracts with whole conversions.
+CPU time of each stage is reported next to its elapsed time, the rest of which is
+spent waiting, mostly on I/O, along with the size of csv files written, so that
+--csv-compression and --csv-compression-level can be weighed against one another.
+
+Usage:
+    python -m benchmarks.end_to_end_benchmark --messages-per-day 100 1000 10000 \\
+        --channels 4 --days 30 --attachment-ratio 0.01 --pipelined --read-latency 0.01
+"""
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from collections import defaultdict
+from datetime import date, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.http_stub import HTTPStub
+from benchmarks.synthetic_export import write_export
+from slack_export_csv_converter.converter import Converter
+from slack_export_csv_converter.csv_data_generator import CSVDataGenerator
+from slack_export_csv_converter.downloader import Downloader
+from slack_export_csv_converter.export_dir import ExportDir
+from slack_export_csv_converter.export_selection import ExportSelection
+from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.search_index import SearchIndex, search
+from slack_export_csv_converter.sqlite_sink import SQLiteSink
+
+# methods of converter components timed as stages, keyed by name of stage
+_STAGES = {
+    "read": ("file_io", "iter_json_array"),
+    "generate": ("csv_data_generator", "generate_rows"),
+    "write": ("file_io", "csv_write"),
+    "download": ("downloader", "download_all"),
+}
+# queries timed against the full text index, the last one shorter than a trigram
+_SEARCH_QUERIES = ["了解です", "release bug", "資料"]
+
+
+class StageTimer:
+    """
+    Accumulates time spent in methods of converter components, along with CPU time
+    of the thread calling them, by replacing them on the instances with timed wrappers.
+    Generators returned by the methods are timed as they are consumed.
+    """
+
+    def __init__(self) -> None:
+        self.elapsed: Dict[str, float] = defaultdict(float)
+        self.cpu: Dict[str, float] = defaultdict(float)
+
+    def wrap(self, stage: str, instance: Any, method_name: str) -> None:
+        method = getattr(instance, method_name)
+        elapsed = self.elapsed
+        cpu = self.cpu
+
+        def timed_generator(generator):
+            while True:
+                start = time.perf_counter()
+                cpu_start = time.thread_time()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed[stage] += time.perf_counter() - start
+                    cpu[stage] += time.thread_time() - cpu_start
+                yield item
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            cpu_start = time.thread_time()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                elapsed[stage] += time.perf_counter() - start
+                cpu[stage] += time.thread_time() - cpu_start
+
+            if isinstance(result, types.GeneratorType):
+                return timed_generator(result)
+            return result
+
+        setattr(instance, method_name, timed)
+
+
+def add_read_latency(file_io: FileIO, latency: float) -> None:
+    """Delays opening of each message file
+
+    Args:
+        file_io: instance to replace iter_json_array of
+        latency: seconds to wait before a file is read
+
+    Returns:
+        None
+    """
+    iter_json_array = file_io.iter_json_array
+
+    @wraps(iter_json_array)
+    def delayed(*args, **kwargs):
+        time.sleep(latency)
+        yield from iter_json_array(*args, **kwargs)
+
+    setattr(file_io, "iter_json_array", delayed)
+
+
+def convert(args: argparse.Namespace, messages_per_day: int) -> Dict[str, Any]:
+    """Converts a synthetic export of the given size and measures it
+
+    Args:
+        args: parsed command line arguments
+        messages_per_day: number of messages in each message file
+
+    Returns:
+        Measurements of the conversion
+    """
+    with HTTPStub(body_size=args.body_size, latency=args.latency) as stub:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export_path = Path(tmp_dir) / "export"
+            save_path = Path(tmp_dir) / "save"
+            save_path.mkdir()
+            messages = write_export(
+                export_path,
+                channels=args.channels,
+                days=args.days,
+                messages_per_day=messages_per_day,
+                users=args.users,
+                mention_density=args.mention_density,
+                thread_ratio=args.thread_ratio,
+                attachment_ratio=args.attachment_ratio,
+                file_url_base=stub.url("files"),
+            )
+
+            selection = None
+            if args.channels_pattern or args.since or args.until:
+                selection = ExportSelection(
+                    include_channels=args.channels_pattern,
+                    since=args.since,
+                    until=args.until,
+                    timezone=timezone.utc,
+                )
+            export_dir = ExportDir(export_path, save_path, selection=selection)
+            file_io = FileIO(
+                csv_encoding="utf-8",
+                csv_compression=args.csv_compression,
+                csv_compression_level=args.csv_compression_level,
+            )
+            csv_data_generator = CSVDataGenerator(
+                file_io.read_json(export_dir.get_users_file())
+            )
+            downloader = Downloader(file_io, max_workers=args.download_workers)
+
+            timer = StageTimer()
+            components = {
+                "file_io": file_io,
+                "csv_data_generator": csv_data_generator,
+                "downloader": downloader,
+            }
+            # wrappers cannot be sent to worker processes
+            if args.workers == 1:
+                if args.read_latency:
+                    add_read_latency(file_io, args.read_latency)
+                for stage, (component, method_name) in _STAGES.items():
+                    timer.wrap(stage, components[component], method_name)
+
+            sqlite_sink = None
+            if args.sqlite:
+                sqlite_sink = SQLiteSink(
+                    export_dir.get_database_file(),
+                    csv_data_generator.get_message_fields(),
+                    csv_data_generator.get_attachment_fields(),
+                )
+            search_index = None
+            if args.search_index:
+                search_index = SearchIndex(
+                    export_dir.get_search_index_file(),
+                    csv_data_generator.get_message_fields(),
+                )
+
+            converter = Converter(
+                export_dir,
+                file_io,
+                csv_data_generator,
+                workers=args.workers,
+                downloader=downloader,
+                streaming=args.streaming,
+                pipelined=args.pipelined,
+                sqlite_sink=sqlite_sink,
+                search_index=search_index,
+            )
+
+            start = time.perf_counter()
+            converter.run()
+            elapsed = time.perf_counter() - start
+
+            csv_bytes = sum(
+                path.stat().st_size
+                for path in export_dir.get_csv_path().rglob(
+                    f"*{file_io.get_csv_suffix()}"
+                )
+            )
+            searches = {}
+            if args.search_index:
+                for query in _SEARCH_QUERIES:
+                    start = time.perf_counter()
+                    search(export_dir.get_search_index_file(), query)
+                    searches[query] = time.perf_counter() - start
+
+    return {
+        "messages_per_day": messages_per_day,
+        "messages": messages,
+        "elapsed": elapsed,
+        "peak_rss_kb": _peak_rss_kb(),
+        "downloads": stub.requests,
+        "stages": dict(timer.elapsed),
+        "stages_cpu": dict(timer.cpu),
+        "csv_bytes": csv_bytes,
+        "searches": searches,
+    }
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss is in kilobytes on linux, worker processes count separately
+    return max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+
+def run_in_subprocess(argv: List[str], messages_per_day: int) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.end_to_end_benchmark",
+            *argv,
+            "--single",
+            str(messages_per_day),
+        ],
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def report(result: Dict[str, Any]) -> None:
+    stages = " ".join(
+        f"{stage}={elapsed:.2f}s(cpu={result['stages_cpu'][stage]:.2f}s)"
+        for (stage, elapsed) in result["stages"].items()
+    )
+    searches = " ".join(
+        f"search({query})={elapsed * 1000:.1f}ms"
+        for (query, elapsed) in result["searches"].items()
+    )
+    print(
+        f"messages/day={result['messages_per_day']:<8} "
+        f"messages={result['messages']:<10} elapsed={result['elapsed']:.2f}s "
+        f"messages/sec={result['messages'] / result['elapsed']:,.0f} "
+        f"peak_rss={result['peak_rss_kb'] / 1024:.1f}MiB "
+        f"csv={result['csv_bytes'] / 1024 / 1024:.1f}MiB "
+        f"downloads={result['downloads']} {stages} {searches}".rstrip()
+    )
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages-per-day", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--mention-density", type=float, default=0.1)
+    parser.add_argument("--thread-ratio", type=float, default=0.2)
+    parser.add_argument("--attachment-ratio", type=float, default=0.01)
+    parser.add_argument("--body-size", type=int, default=16 * 1024)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--download-workers", type=int, default=1)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--sqlite", action="store_true")
+    parser.add_argument("--search-index", action="store_true")
+    parser.add_argument("--csv-compression", choices=["gzip", "bz2", "lzma"])
+    parser.add_argument("--csv-compression-level", type=int)
+    parser.add_argument("--channel-pattern", dest="channels_pattern", nargs="+")
+    parser.add_argument("--since", type=date.fromisoformat)
+    parser.add_argument("--until", type=date.fromisoformat)
+    parser.add_argument("--read-latency", type=float, default=0.0)
+    # converts one size in this process and prints measurements as json
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    if args.single is not None:
+        print(json.dumps(convert(args, args.single)))
+        return
+
+    for messages_per_day in args.messages_per_day:
+        report(run_in_subprocess(_strip_sizes(argv), messages_per_day))
+
+
+def _strip_sizes(argv: List[str]) -> List[str]:
+    # the rest of the arguments are passed on to subprocesses as they are
+    stripped = []
+    skipping = False
+    for arg in argv:
+        if arg.startswith("--messages-per-day"):
+            skipping = "=" not in arg
+            continue
+        if skipping and not arg.startswith("--"):
+            continue
+        skipping = False
+        stripped.append(arg)
+
+    return stripped
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
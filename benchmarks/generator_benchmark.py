@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Measures row generation of CSVDataGenerator on a synthetic channel.
+The extractor plan compiled on construction, producing message and attachment rows
+in a single pass, is compared with the if/elif chain that used to be walked for
+every field of every row in two separate passes.
+
+Usage:
+    python -m benchmarks.generator_benchmark --messages 1000000
+"""
+import argparse
+import time
+from typing import Optional, Tuple
+
+from benchmarks.synthetic_export import generate_messages, generate_users
+from slack_export_csv_converter.csv_data_generator import CSVDataGenerator
+from slack_export_csv_converter.types import ExportFileContent, ExportFileElement, CSVData
+
+
+class IfChainCSVDataGenerator(CSVDataGenerator):
+    """
+    Reference implementation deciding what to compute for each field on every row,
+    walking messages once for message rows and once more for attachment rows.
+    """
+
+    def generate_rows(self, messages_data: ExportFileContent) -> Tuple[CSVData, CSVData]:
+        return (
+            self.generate_messages(messages_data),
+            self.generate_attachments(messages_data),
+        )
+
+    def generate_messages(self, messages_data: ExportFileContent) -> CSVData:
+        fields = self.get_message_fields()
+        return [
+            {field: self._convert_field(field, message) for field in fields}
+            for message in messages_data
+            if message["type"] == "message"
+        ]
+
+    def generate_attachments(self, messages_data: ExportFileContent) -> CSVData:
+        fields = self.get_attachment_fields()
+        return [
+            {field: self._convert_field(field, message, attachment) for field in fields}
+            for message in messages_data
+            for attachment in message.get("files") or []
+            if attachment.get("url_private")
+        ]
+
+    def _convert_field(
+        self,
+        field_name: str,
+        message: ExportFileElement,
+        attachment: Optional[ExportFileElement] = None,
+    ) -> str:
+        if field_name == "ts":
+            field_value = message["ts"]
+        elif field_name == "投稿日時":
+            field_value = self._convert_ts(message["ts"])
+        elif field_name == "ユーザー":
+            field_value = self._convert_userid(message.get("user", ""))
+        elif field_name == "テキスト":
+            field_value = self._convert_textcontent(message["text"])
+        elif field_name == "thread_ts":
+            field_value = message.get("thread_ts", "")
+        elif field_name == "アップロード日時" and attachment is not None:
+            field_value = self._convert_ts(attachment["created"])
+        elif field_name == "message_ts":
+            field_value = message["ts"]
+        elif field_name == "url" and attachment is not None:
+            field_value = attachment["url_private"]
+        elif field_name == "ファイル名" and attachment is not None:
+            field_value = self._convert_filename(attachment)
+        else:
+            field_value = ""
+
+        return field_value
+
+
+def measure(csv_data_generator: CSVDataGenerator, messages: ExportFileContent) -> float:
+    start = time.perf_counter()
+    csv_data_generator.generate_rows(messages)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    users = generate_users(args.users)
+    messages = generate_messages(args.messages, [user["id"] for user in users])
+
+    for name, generator_class in [
+        ("if-chain", IfChainCSVDataGenerator),
+        ("single pass", CSVDataGenerator),
+    ]:
+        csv_data_generator = generator_class(users)
+        elapsed = min(measure(csv_data_generator, messages) for _ in range(args.repeat))
+        print(
+            f"{name:<14} messages={args.messages} elapsed={elapsed:.2f}s "
+            f"messages/sec={args.messages / elapsed:,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+A local stand-in for files.slack.com used by the benchmarks.
+Every path is answered with a deterministic body of the requested size.
+"""
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+
+class HTTPStub:
+    """
+    Serves files from a background thread until stopped.
+
+    With tls, files are served over https with a self-signed certificate made by
+    the openssl command, which clients can trust through the file at stub.cafile.
+
+    Usage:
+        with HTTPStub(body_size=1024, latency=0.05) as stub:
+            url = stub.url("some/file.png")
+    """
+
+    def __init__(
+        self, body_size: int = 1024, latency: float = 0.0, tls: bool = False
+    ) -> None:
+        self._body = bytes(i % 256 for i in range(body_size))
+        self._latency = latency
+        self._tls = tls
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tmp_dir: Optional[tempfile.TemporaryDirectory] = None
+        self.cafile: Optional[str] = None
+        self.requests = 0
+        self.connections = 0
+
+    def __enter__(self) -> "HTTPStub":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, which nagle would delay
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                stub.connections += 1
+                super().setup()
+
+            def do_GET(self) -> None:
+                stub.requests += 1
+                time.sleep(stub._latency)
+
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(stub._body)))
+                self.end_headers()
+                self.wfile.write(stub._body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        if self._tls:
+            self._server.socket = self._create_ssl_context().wrap_socket(
+                self._server.socket, server_side=True
+            )
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+            self._tmp_dir = None
+
+    def url(self, path: str) -> str:
+        if self._server is None:
+            raise RuntimeError("stub server is not running")
+
+        (host, port) = self._server.server_address[:2]
+        scheme = "https" if self._tls else "http"
+        return f"{scheme}://{host}:{port}/{path}"
+
+    def _create_ssl_context(self) -> ssl.SSLContext:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        certfile = Path(self._tmp_dir.name) / "cert.pem"
+        keyfile = Path(self._tmp_dir.name) / "key.pem"
+        subprocess.run(
+            [
+                "openssl",
+                "req",
+                "-x509",
+                "-newkey",
+                "rsa:2048",
+                "-nodes",
+                "-days",
+                "1",
+                "-subj",
+                "/CN=127.0.0.1",
+                "-addext",
+                "subjectAltName=IP:127.0.0.1",
+                "-keyout",
+                str(keyfile),
+                "-out",
+                str(certfile),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        self.cafile = str(certfile)
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        return context
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Measures decoding of message files of a synthetic export with each available json
+backend, parsing them as a stream the way files too large to be decoded at once are
+read, and projecting messages onto keys the csv files are made of while decoding.
+Peak memory is traced while holding what a single message file decodes into.
+
+Usage:
+    python -m benchmarks.json_benchmark --messages-per-day 10000 --days 10 --metadata
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+from pathlib import Path
+from typing import AbstractSet, List, Optional, Tuple
+from unittest.mock import patch
+
+from benchmarks.synthetic_export import generate_users, write_export
+from slack_export_csv_converter.csv_data_generator import CSVDataGenerator
+from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.json_decoder import JSONDecoder, get_available_backends
+
+
+def measure(
+    file_io: FileIO,
+    message_files: List[Path],
+    keys: Optional[AbstractSet[str]],
+    streamed: bool,
+    repeat: int,
+) -> Tuple[float, int]:
+    with ExitStack() as stack:
+        if streamed:
+            stack.enter_context(patch.object(FileIO, "_JSON_STREAMING_THRESHOLD", -1))
+
+        elapsed = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for message_file in message_files:
+                list(file_io.iter_json_array(message_file, keys=keys))
+            elapsed.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        list(file_io.iter_json_array(message_files[0], keys=keys))
+        (_, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return (min(elapsed), peak)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages-per-day", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--metadata", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    keys = CSVDataGenerator(generate_users(1)).get_used_keys()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = Path(tmp_dir)
+        messages = write_export(
+            export_path,
+            channels=1,
+            days=args.days,
+            messages_per_day=args.messages_per_day,
+            metadata=args.metadata,
+        )
+        message_files = sorted((export_path / "channel0").iterdir())
+        size = sum(message_file.stat().st_size for message_file in message_files)
+
+        cases = [(backend, backend, None, False) for backend in get_available_backends()]
+        cases += [
+            ("streamed", "json", None, True),
+            ("projected", "json", keys, False),
+            ("projected streamed", "json", keys, True),
+        ]
+        for (name, backend, projected_keys, streamed) in cases:
+            file_io = FileIO(json_decoder=JSONDecoder(backend))
+            (elapsed, peak) = measure(
+                file_io, message_files, projected_keys, streamed, args.repeat
+            )
+            print(
+                f"{name:<18} messages={messages} elapsed={elapsed:.2f}s "
+                f"messages/sec={messages / elapsed:,.0f} "
+                f"MiB/sec={size / elapsed / 1024 / 1024:.1f} "
+                f"peak_per_file={peak / 1024 / 1024:.1f}MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic generator of synthetic slack export data used by the benchmarks.
+The same arguments always produce the same data.
+"""
+import json
+import random
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+from slack_export_csv_converter.types import ExportFileContent, ExportFileElement
+
+_WORDS = [
+    "slack", "export", "csv", "message", "hello", "world", "こんにちは", "資料",
+    "deploy", "review", "meeting", "thanks", "了解です", "lunch", "bug", "release",
+]  # fmt: skip
+
+_FILE_URL_BASE = "https://files.slack.com/files-pri"
+_START_TS = 1672531200
+_SECONDS_PER_DAY = 86_400
+
+
+def generate_users(count: int) -> ExportFileContent:
+    """Generates contents of users.json
+
+    Args:
+        count: number of users
+
+    Returns:
+        List of user data
+    """
+    return [
+        {
+            "id": f"U{x:08d}",
+            "name": f"user{x}",
+            "real_name": f"User {x}",
+            "profile": {"real_name": f"User {x}", "display_name": f"user{x}"},
+        }
+        for x in range(count)
+    ]
+
+
+def generate_messages(
+    count: int,
+    user_ids: List[str],
+    start_ts: float = 1672531200.0,
+    interval: float = 10.0,
+    mention_density: float = 0.1,
+    thread_ratio: float = 0.2,
+    attachment_ratio: float = 0.05,
+    seed: int = 0,
+    file_url_base: str = _FILE_URL_BASE,
+    metadata: bool = False,
+) -> ExportFileContent:
+    """Generates messages the way they appear in a message file of a channel
+
+    Args:
+        count: number of messages
+        user_ids: ids of users posting and being mentioned
+        start_ts: ts of the first message
+        interval: seconds between messages
+        mention_density: chance of each word being a user mention
+        thread_ratio: chance of a message being a reply in a thread
+        attachment_ratio: chance of a message having a file attached
+        seed: seed of the random generator
+        file_url_base: url attached files are placed under
+        metadata: whether to add blocks, user profile, reactions and the like
+            that slack puts on messages besides what the csv files are made of
+
+    Returns:
+        List of message data
+    """
+    rng = random.Random(seed)
+    messages = []
+    thread_ts = None
+
+    for x in range(count):
+        ts = f"{start_ts + x * interval:.6f}"
+        message: ExportFileElement = {
+            "type": "message",
+            "ts": ts,
+            "user": rng.choice(user_ids),
+            "text": _generate_text(rng, user_ids, mention_density),
+        }
+
+        if thread_ts is not None and rng.random() < thread_ratio:
+            message["thread_ts"] = thread_ts
+        else:
+            thread_ts = ts
+
+        if rng.random() < attachment_ratio:
+            message["files"] = [_generate_file(rng, ts, x, file_url_base)]
+
+        if metadata:
+            message.update(_generate_metadata(rng, message, user_ids))
+
+        messages.append(message)
+
+    return messages
+
+
+def _generate_text(
+    rng: random.Random, user_ids: List[str], mention_density: float
+) -> str:
+    words = []
+    for _ in range(rng.randint(3, 30)):
+        if rng.random() < mention_density:
+            words.append(f"<@{rng.choice(user_ids)}>")
+        else:
+            words.append(rng.choice(_WORDS))
+
+    lines = [" ".join(words[i : i + 8]) for i in range(0, len(words), 8)]
+    return "\n".join(lines)
+
+
+def write_export(
+    export_path: Path,
+    channels: int,
+    days: int,
+    messages_per_day: int,
+    users: int = 1_000,
+    mention_density: float = 0.1,
+    thread_ratio: float = 0.2,
+    attachment_ratio: float = 0.05,
+    seed: int = 0,
+    file_url_base: str = _FILE_URL_BASE,
+    metadata: bool = False,
+) -> int:
+    """Writes a synthetic export to disk laid out the way slack exports it,
+    a users.json and one directory per channel holding a message file per day
+
+    Args:
+        export_path: directory to write the export to
+        channels: number of channels
+        days: number of days with messages in each channel
+        messages_per_day: number of messages in each message file
+        users: number of users in users.json
+        mention_density: chance of each word being a user mention
+        thread_ratio: chance of a message being a reply in a thread
+        attachment_ratio: chance of a message having a file attached
+        seed: seed of the random generator
+        file_url_base: url attached files are placed under
+        metadata: whether to add blocks, user profile, reactions and the like
+            to messages
+
+    Returns:
+        Number of messages written
+    """
+    export_path.mkdir(parents=True, exist_ok=True)
+    users_data = generate_users(users)
+    user_ids = [user["id"] for user in users_data]
+    _write_json(export_path / "users.json", users_data)
+
+    for channel in range(channels):
+        channel_path = export_path / f"channel{channel}"
+        channel_path.mkdir(exist_ok=True)
+
+        for day in range(days):
+            start_ts = _START_TS + day * _SECONDS_PER_DAY
+            messages = generate_messages(
+                messages_per_day,
+                user_ids,
+                start_ts=start_ts,
+                interval=_SECONDS_PER_DAY / max(messages_per_day, 1),
+                mention_density=mention_density,
+                thread_ratio=thread_ratio,
+                attachment_ratio=attachment_ratio,
+                seed=seed + channel * days + day,
+                file_url_base=f"{file_url_base}/C{channel}D{day}",
+                metadata=metadata,
+            )
+            date = datetime.fromtimestamp(start_ts, timezone.utc).date()
+            _write_json(channel_path / f"{date.isoformat()}.json", messages)
+
+    return channels * days * messages_per_day
+
+
+def _generate_metadata(
+    rng: random.Random, message: ExportFileElement, user_ids: List[str]
+) -> ExportFileElement:
+    user = message["user"]
+    elements = []
+    for word in message["text"].split(" "):
+        if word.startswith("<@"):
+            elements.append({"type": "user", "user_id": word[2:-1]})
+        else:
+            elements.append({"type": "text", "text": word + " "})
+
+    return {
+        "client_msg_id": f"{rng.getrandbits(128):032x}",
+        "team": "T0000",
+        "user_team": "T0000",
+        "source_team": "T0000",
+        "user_profile": {
+            "avatar_hash": f"{rng.getrandbits(48):012x}",
+            "image_72": f"https://avatars.slack-edge.com/{user}_72.png",
+            "first_name": user,
+            "real_name": f"User {user}",
+            "display_name": user.lower(),
+            "team": "T0000",
+            "name": user.lower(),
+            "is_restricted": False,
+            "is_ultra_restricted": False,
+        },
+        "blocks": [
+            {
+                "type": "rich_text",
+                "block_id": f"{rng.getrandbits(24):06x}",
+                "elements": [{"type": "rich_text_section", "elements": elements}],
+            }
+        ],
+        "reactions": [
+            {"name": "+1", "users": rng.sample(user_ids, 2), "count": 2}
+            for _ in range(rng.randint(0, 2))
+        ],
+    }
+
+
+def _write_json(path: Path, data: ExportFileContent) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def _generate_file(
+    rng: random.Random, ts: str, index: int, file_url_base: str
+) -> ExportFileElement:
+    file_id = f"F{index:09d}"
+    return {
+        "id": file_id,
+        "created": int(float(ts)),
+        "name": f"file_{index}.png",
+        "size": rng.randint(1_000, 5_000_000),
+        "url_private": f"{file_url_base}/T0000-{file_id}/file_{index}.png",
+    }
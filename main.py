@@ -1,24 +1,62 @@
 # -*- coding: utf-8 -*-
 import sys
 from pathlib import Path
-from typing import List, cast
+from datetime import date, tzinfo
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 import logging
 import os
 
 from slack_export_csv_converter.logger import setup_logger
+from slack_export_csv_converter.attachment_store import AttachmentStore
 from slack_export_csv_converter.export_dir import ExportDir
+from slack_export_csv_converter.export_selection import ExportSelection
 from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.http_client import HTTPClient
+from slack_export_csv_converter.json_decoder import JSONDecoder
 from slack_export_csv_converter.csv_data_generator import CSVDataGenerator
 from slack_export_csv_converter.converter import Converter
-from slack_export_csv_converter.types import ExportFileContent
+from slack_export_csv_converter.downloader import Downloader
+from slack_export_csv_converter.profiler import Profiler
+from slack_export_csv_converter.search_index import SearchIndex
+from slack_export_csv_converter.sqlite_sink import SQLiteSink
+from slack_export_csv_converter.timestamp_formatter import parse_timezone
+from slack_export_csv_converter.types import ExportFileElement
+from slack_export_csv_converter.user_index import UserIndex
 from slack_export_csv_converter.exceptions import ConverterException
 
+# options accepted in the form of --name=value or --name
+OPTIONS = {
+    "workers",
+    "download-workers",
+    "streaming",
+    "incremental",
+    "timezone",
+    "json-backend",
+    "projecting",
+    "user-index",
+    "token",
+    "attachment-store",
+    "pipelined",
+    "profile",
+    "sqlite",
+    "search-index",
+    "csv-compression",
+    "csv-compression-level",
+    "channels",
+    "exclude-channels",
+    "since",
+    "until",
+}
+# environment variable the token is taken from when --token is not given
+TOKEN_ENVIRONMENT_VARIABLE = "SLACK_TOKEN"
+
 
 def main(args):
     try:
         setup_logger()
-        path_args = convert_args_to_path(validate_args(sanitize_args(args)))
-        converter = setup_converter(path_args)
+        (positional_args, options) = split_options(sanitize_args(args))
+        path_args = convert_args_to_path(validate_args(positional_args))
+        converter = setup_converter(path_args, options)
         converter.run()
     except Exception as e:
         logging.error(str(e))
@@ -35,6 +73,24 @@ def sanitize_args(args: List[str]) -> List[str]:
     return sanitized_args
 
 
+def split_options(
+    args: List[str], accepted_options: Set[str] = OPTIONS
+) -> Tuple[List[str], Dict[str, str]]:
+    positional_args = []
+    options = {}
+    for arg in args:
+        if not arg.startswith("--"):
+            positional_args.append(arg)
+            continue
+
+        (name, _, value) = arg[2:].partition("=")
+        if name not in accepted_options:
+            raise ConverterException(f"不明なオプションです: {arg}")
+        options[name] = value
+
+    return (positional_args, options)
+
+
 def validate_args(args: List[str]) -> List[str]:
     if len(args) < 1:
         raise ConverterException("有効なパスを1つまたは2つ指定してください。")
@@ -50,15 +106,151 @@ def convert_args_to_path(args: List[str]) -> List[Path]:
     return [Path(arg) for arg in args]
 
 
-def setup_converter(paths: List[Path]) -> Converter:
-    export_dir = ExportDir(*paths)
-    file_io = FileIO(csv_encoding="utf-8")
-    users_file_content = cast(
-        ExportFileContent, file_io.read_json(export_dir.get_users_file())
+def get_int_option(options: Dict[str, str], name: str, default: int) -> int:
+    value = options.get(name)
+    if value is None:
+        return default
+
+    try:
+        return int(value)
+    except ValueError:
+        raise ConverterException(f"--{name} には整数を指定してください。")
+
+
+def get_flag_option(options: Dict[str, str], name: str) -> bool:
+    return name in options
+
+
+def get_profiler_option(options: Dict[str, str], name: str) -> Optional[Profiler]:
+    if name not in options:
+        return None
+    if options[name] not in ("", "memory"):
+        raise ConverterException(f"--{name} には memory のみ指定できます。")
+
+    return Profiler(trace_memory=options[name] == "memory")
+
+
+def get_list_option(options: Dict[str, str], name: str) -> Optional[List[str]]:
+    value = options.get(name)
+    if not value:
+        return None
+
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def get_date_option(options: Dict[str, str], name: str) -> Optional[date]:
+    value = options.get(name)
+    if not value:
+        return None
+
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ConverterException(f"--{name} には YYYY-MM-DD 形式の日付を指定してください。")
+
+
+def get_selection_option(
+    options: Dict[str, str], timezone: Optional[tzinfo]
+) -> Optional[ExportSelection]:
+    if not any(
+        options.get(name) for name in ["channels", "exclude-channels", "since", "until"]
+    ):
+        return None
+
+    return ExportSelection(
+        include_channels=get_list_option(options, "channels"),
+        exclude_channels=get_list_option(options, "exclude-channels"),
+        since=get_date_option(options, "since"),
+        until=get_date_option(options, "until"),
+        timezone=timezone,
+    )
+
+
+def get_timezone_option(options: Dict[str, str], name: str) -> Optional[tzinfo]:
+    value = options.get(name)
+    if not value:
+        return None
+
+    return parse_timezone(value)
+
+
+def setup_converter(
+    paths: List[Path], options: Optional[Dict[str, str]] = None
+) -> Converter:
+    options = options or {}
+
+    timezone = get_timezone_option(options, "timezone")
+    export_dir = ExportDir(*paths, selection=get_selection_option(options, timezone))
+    csv_compression = None
+    if "csv-compression" in options:
+        csv_compression = options["csv-compression"] or "gzip"
+    csv_compression_level = None
+    if "csv-compression-level" in options:
+        csv_compression_level = get_int_option(options, "csv-compression-level", 0)
+    file_io = FileIO(
+        csv_encoding="utf-8",
+        json_decoder=JSONDecoder(options.get("json-backend") or None),
+        http_client=HTTPClient(
+            token=options.get("token") or os.environ.get(TOKEN_ENVIRONMENT_VARIABLE)
+        ),
+        csv_compression=csv_compression,
+        csv_compression_level=csv_compression_level,
+    )
+    users_file = export_dir.get_users_file()
+    if get_flag_option(options, "user-index"):
+        users_data: Union[
+            Iterable[ExportFileElement], UserIndex
+        ] = UserIndex.load_or_build(file_io, users_file, export_dir.get_user_index_file())
+    else:
+        users_data = file_io.iter_json_array(users_file)
+    attachment_store = None
+    attachment_fields = None
+    if "attachment-store" in options:
+        attachment_store = AttachmentStore(
+            file_io,
+            export_dir.get_csv_path(),
+            link_mode=options["attachment-store"] or "hardlink",
+        )
+        attachment_fields = CSVDataGenerator.get_default_attachment_fields() + [
+            AttachmentStore.FIELD
+        ]
+    csv_data_generator = CSVDataGenerator(
+        users_data,
+        attachment_fields=attachment_fields,
+        timezone=timezone,
     )
-    csv_data_generator = CSVDataGenerator(users_file_content)
+    downloader = Downloader(
+        file_io, max_workers=get_int_option(options, "download-workers", 1)
+    )
+    sqlite_sink = None
+    if get_flag_option(options, "sqlite"):
+        sqlite_sink = SQLiteSink(
+            export_dir.get_database_file(),
+            csv_data_generator.get_message_fields(),
+            csv_data_generator.get_attachment_fields(),
+        )
+    search_index = None
+    if get_flag_option(options, "search-index"):
+        search_index = SearchIndex(
+            export_dir.get_search_index_file(),
+            csv_data_generator.get_message_fields(),
+        )
 
-    return Converter(export_dir, file_io, csv_data_generator)
+    return Converter(
+        export_dir,
+        file_io,
+        csv_data_generator,
+        workers=get_int_option(options, "workers", 1),
+        downloader=downloader,
+        streaming=get_flag_option(options, "streaming"),
+        incremental=get_flag_option(options, "incremental"),
+        projecting=get_flag_option(options, "projecting"),
+        pipelined=get_flag_option(options, "pipelined"),
+        attachment_store=attachment_store,
+        profiler=get_profiler_option(options, "profile"),
+        sqlite_sink=sqlite_sink,
+        search_index=search_index,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import sys
+from csv import DictWriter, QUOTE_ALL
+from pathlib import Path
+from typing import List, Tuple
+import logging
+
+from main import get_int_option, sanitize_args, split_options
+from slack_export_csv_converter.search_index import search
+from slack_export_csv_converter.exceptions import ConverterException
+from slack_export_csv_converter.types import CSVData
+
+# options accepted in the form of --name=value
+OPTIONS = {"channel", "limit"}
+# number of rows printed when --limit is not given
+DEFAULT_LIMIT = 100
+
+
+def main(args):
+    try:
+        # the log file of main.py is left alone, as it holds the log of the conversion
+        logging.basicConfig(format="[%(levelname)s] %(message)s", level=logging.INFO)
+        (positional_args, options) = split_options(sanitize_args(args), OPTIONS)
+        (index_file, query) = validate_args(positional_args)
+        rows = search(
+            index_file,
+            query,
+            channel=options.get("channel") or None,
+            limit=get_int_option(options, "limit", DEFAULT_LIMIT),
+        )
+        print_rows(rows)
+    except Exception as e:
+        logging.error(str(e))
+        exit(1)
+
+
+def validate_args(args: List[str]) -> Tuple[Path, str]:
+    if len(args) < 2:
+        raise ConverterException("インデックスファイルのパスと検索語を指定してください。")
+
+    return (Path(args[0]), " ".join(args[1:]))
+
+
+def print_rows(rows: CSVData) -> None:
+    if not rows:
+        logging.info("一致するメッセージは見つかりませんでした。")
+        return
+
+    writer = DictWriter(sys.stdout, list(rows[0]), quoting=QUOTE_ALL)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .downloader import Downloader, DownloadResult
+from .exceptions import ConverterException
+from .file_io import FileIO
+from .types import ExportFileElement
+
+
+class AttachmentStore:
+    """
+    Keeps a single copy of each attachment file under the output directory, shared by
+    every channel the file was posted to.
+    Attachment directories of channels hold links to the copies instead of copies
+    of their own.
+
+    Layout of the store:
+        by-id/<id of file>/<file name>: canonical copy of each file
+        by-hash/<xx>/<hash of content>: hard link of the first canonical copy with
+            that content, which later copies with the same content are replaced with
+
+    A file is downloaded by whichever process gets to create the lock file next to
+    its canonical copy first, while other processes wait for the lock to go away.
+    Waiting is given up on when the process holding the lock has exited or takes
+    longer than _LOCK_TIMEOUT, and the file is counted as failed.
+    """
+
+    DIR_NAME = "attachments.store"
+    # field of attachments csv files holding path of the canonical copy
+    FIELD = "canonical_path"
+    LINK_MODES = ["hardlink", "symlink"]
+    _LOCK_SUFFIX = ".lock"
+    # seconds between checks of whether another process finished a download
+    _LOCK_POLL_INTERVAL = 0.1
+    # seconds a process waits for another one to finish a download
+    _LOCK_TIMEOUT = 30 * 60.0
+
+    def __init__(
+        self, file_io: FileIO, csv_path: Path, link_mode: str = "hardlink"
+    ) -> None:
+        """
+        Args:
+            file_io: used to download, link and hash files
+            csv_path: directory csv converted data is stored in
+            link_mode: how channels link to the canonical copies,
+                "hardlink" or "symlink"
+        """
+        if link_mode not in self.LINK_MODES:
+            link_modes = ", ".join(self.LINK_MODES)
+            raise ConverterException(f"添付ファイルのリンク方法には {link_modes} のいずれかを指定してください。")
+
+        self._file_io = file_io
+        self._csv_path = csv_path
+        self._symbolic = link_mode == "symlink"
+
+    @classmethod
+    def get_canonical_path(cls, attachment: ExportFileElement, file_name: str) -> str:
+        """Get path of the canonical copy of an attachment file
+
+        Files are keyed by their id, or by their url when they have none.
+
+        Args:
+            attachment: file element of a message
+            file_name: name the file is saved as
+
+        Returns:
+            Path relative to the directory csv converted data is stored in
+        """
+        key = attachment.get("id")
+        if not key:
+            url_hash = hashlib.sha1(attachment["url_private"].encode("utf-8"))
+            key = f"url-{url_hash.hexdigest()}"
+
+        return f"{cls.DIR_NAME}/by-id/{key}/{file_name}"
+
+    def clear_locks(self) -> None:
+        """Removes lock files left over by an interrupted conversion
+
+        Must not be called while files are being stored.
+
+        Returns:
+            None
+        """
+        store_path = self._csv_path / self.DIR_NAME
+        for lock_path in store_path.glob(f"by-id/*/*{self._LOCK_SUFFIX}"):
+            self._file_io.remove(lock_path)
+
+    def store_all(
+        self, downloader: Downloader, attachments: Iterable[Tuple[str, str, Path]]
+    ) -> DownloadResult:
+        """Downloads files that are not in the store yet, and links them into channels
+
+        Files already linked into a channel are left as they are.
+
+        Args:
+            downloader: downloads files into the store
+            attachments: url of each file, path of its canonical copy as returned by
+                get_canonical_path(), and path to link the file to within a channel
+
+        Returns:
+            Number of files downloaded, skipped and failed,
+            along with bytes and latencies of the downloads
+        """
+        attachments = list(attachments)
+        # canonical copies this process downloads, and ones another process is downloading
+        downloads: Dict[Path, str] = {}
+        awaited: Set[Path] = set()
+        for (url, canonical_path, _) in attachments:
+            canonical_file = self._csv_path / canonical_path
+            if (
+                canonical_file in downloads
+                or canonical_file in awaited
+                or self._file_io.exists(canonical_file)
+            ):
+                continue
+
+            if self._file_io.create_lock(self._get_lock_path(canonical_file)):
+                downloads[canonical_file] = url
+            else:
+                awaited.add(canonical_file)
+
+        try:
+            result = downloader.download_all(
+                (url, canonical_file) for (canonical_file, url) in downloads.items()
+            )
+            for canonical_file in downloads:
+                if self._file_io.exists(canonical_file):
+                    self._deduplicate(canonical_file)
+        finally:
+            for canonical_file in downloads:
+                self._file_io.remove(self._get_lock_path(canonical_file))
+
+        for canonical_file in awaited:
+            self._wait_for_download(canonical_file)
+
+        failed = self._link_all(attachments)
+
+        return DownloadResult(
+            downloaded=result.downloaded,
+            skipped=len(attachments) - result.downloaded - failed,
+            failed=failed,
+            downloaded_bytes=result.downloaded_bytes,
+            latencies=result.latencies,
+        )
+
+    def _link_all(self, attachments: List[Tuple[str, str, Path]]) -> int:
+        failed = 0
+        for (_, canonical_path, channel_file) in attachments:
+            canonical_file = self._csv_path / canonical_path
+            if not self._file_io.exists(canonical_file):
+                failed += 1
+            elif not self._file_io.exists(channel_file):
+                self._file_io.link(canonical_file, channel_file, symbolic=self._symbolic)
+
+        return failed
+
+    def _deduplicate(self, canonical_file: Path) -> None:
+        digest = self._file_io.hash_file(canonical_file)
+        content_file = self._csv_path / self.DIR_NAME / "by-hash" / digest[:2] / digest
+        if self._file_io.exists(content_file):
+            logging.debug(f"File {str(canonical_file)} has the same content as another")
+            self._file_io.link(content_file, canonical_file)
+        else:
+            self._file_io.link(canonical_file, content_file)
+
+    def _wait_for_download(self, canonical_file: Path) -> None:
+        lock_path = self._get_lock_path(canonical_file)
+        deadline = time.monotonic() + self._LOCK_TIMEOUT
+        while self._file_io.exists(lock_path):
+            # the lock is left in place, to be cleared by the next conversion
+            if self._file_io.is_lock_abandoned(lock_path):
+                logging.warning(f"Download of {str(canonical_file)} was abandoned")
+                return
+            if time.monotonic() > deadline:
+                logging.warning(
+                    f"Timed out waiting for download of {str(canonical_file)}"
+                )
+                return
+
+            time.sleep(self._LOCK_POLL_INTERVAL)
+
+    def _get_lock_path(self, canonical_file: Path) -> Path:
+        return canonical_file.with_name(canonical_file.name + self._LOCK_SUFFIX)
@@ -1,12 +1,72 @@
 # -*- coding: utf-8 -*-
 import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack, closing, nullcontext
+from dataclasses import dataclass, field
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import cast, List, Tuple
+from typing import (
+    cast,
+    Any,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
+from .attachment_store import AttachmentStore
 from .export_dir import ExportDir
 from .file_io import FileIO
 from .csv_data_generator import CSVDataGenerator
-from .types import CSVData, ExportFileContent
+from .downloader import Downloader, DownloadResult
+from .exceptions import ConverterException
+from .manifest import Manifest, ManifestEntries
+from .metrics import ConversionMetrics, ConversionReport
+from .message_merger import MessageMerger
+from .pipeline import Pipeline
+from .profiler import Profiler, ProfileResult
+from .search_index import SearchIndex
+from .sqlite_sink import SQLiteDatabase, SQLiteSink
+from .types import CSVData, CSVFields, ExportFileElement, ExportPath
+
+
+@dataclass
+class ChannelResult:
+    """
+    Outcome of converting a single channel.
+    Passed back to the main process when channels are converted in worker processes.
+    """
+
+    manifest_entries: Optional[ManifestEntries] = None
+    metrics: ConversionMetrics = field(default_factory=ConversionMetrics)
+    profile: Optional[ProfileResult] = None
+
+
+class _TimedIterator:
+    """
+    Wraps an iterable, accumulating time spent producing its items.
+    """
+
+    def __init__(self, iterable: Iterable[Any]) -> None:
+        self._iterator = iter(iterable)
+        self.elapsed = 0.0
+
+    def __iter__(self) -> "_TimedIterator":
+        return self
+
+    def __next__(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.elapsed += time.perf_counter() - start
 
 
 class Converter:
@@ -14,14 +74,65 @@ class Converter:
     Class that performs conversion of slack export files.
     """
 
+    # number of message files that may wait between two stages in pipelined mode
+    _PIPELINE_QUEUE_SIZE = 2
+    # stands in for stages of the profiler when not profiling
+    _UNPROFILED = nullcontext()
+
     def __init__(
-        self, export_dir: ExportDir, file_io: FileIO, csv_data_generator: CSVDataGenerator
+        self,
+        export_dir: ExportDir,
+        file_io: FileIO,
+        csv_data_generator: CSVDataGenerator,
+        workers: int = 1,
+        downloader: Optional[Downloader] = None,
+        streaming: bool = False,
+        incremental: bool = False,
+        projecting: bool = False,
+        pipelined: bool = False,
+        attachment_store: Optional[AttachmentStore] = None,
+        profiler: Optional[Profiler] = None,
+        sqlite_sink: Optional[SQLiteSink] = None,
+        search_index: Optional[SearchIndex] = None,
     ) -> None:
+        if workers < 1:
+            raise ConverterException("並列処理数には1以上の値を指定してください。")
+        if (
+            attachment_store is not None
+            and AttachmentStore.FIELD not in csv_data_generator.get_attachment_fields()
+        ):
+            raise ConverterException(f"添付ファイルを共有するには {AttachmentStore.FIELD} 列が必要です。")
+        # databases rows are written into alongside the csv files
+        databases: List[SQLiteDatabase] = [
+            database for database in (sqlite_sink, search_index) if database is not None
+        ]
+        if incremental and databases:
+            raise ConverterException("差分変換ではSQLiteデータベースに出力できません。")
+        selection = export_dir.get_selection()
+        if incremental and selection is not None and selection.has_date_window():
+            raise ConverterException("差分変換では期間を指定できません。")
+
         self._export_dir = export_dir
         self._file_io = file_io
         self._csv_data_generator = csv_data_generator
+        self._workers = workers
+        self._downloader = downloader if downloader is not None else Downloader(file_io)
+        self._streaming = streaming
+        self._incremental = incremental
+        self._pipelined = pipelined
+        # keys message files are projected onto while being decoded
+        self._projected_keys: Optional[Set[str]] = (
+            csv_data_generator.get_used_keys() if projecting else None
+        )
+        if self._projected_keys is not None:
+            # messages are ordered and selected by their ts, kept even when unused
+            self._projected_keys.add("ts")
+        self._attachment_store = attachment_store
+        self._profiler = profiler
+        self._databases = databases
+        self._manifest: Optional[Manifest] = None
 
-    def run(self) -> None:
+    def run(self) -> ConversionReport:
         """Starts the conversion process of the slack export files.
 
         Does the following things:
@@ -29,64 +140,567 @@ class Converter:
         - Gathers attachment file info to a separate csv
         - Downloads attachment files
 
+        Channels are spread across a pool of processes when more than one worker
+        was requested.
+        In streaming mode rows are written out file by file, so that only
+        a single message file of a channel is held in memory at a time.
+        Pipelined mode writes rows out file by file as well, while reading
+        message files, generating rows, writing them and downloading attachments
+        run concurrently on consecutive files.
+        In incremental mode only message files that are new or changed since
+        the previous incremental run are converted, and their rows are spliced
+        into the existing csv files.
+        In projecting mode only keys of messages that csv files are generated from
+        are kept while decoding message files.
+        With an attachment store, each attachment file is downloaded once into
+        the store and linked into every channel it was posted to.
+
+        Measurements of the conversion are written to the metrics file as well,
+        even when the conversion fails.
+        With a profiler, stages of the conversion are profiled and the results
+        are written to the profile directory.
+        With a sqlite sink, rows are written to the database as well as to
+        the csv files, and the database is indexed once every channel was converted.
+        With a search index, text of messages is indexed for full text search
+        in the same way.
+        With a selection of the export, only channels and message files selected
+        are read, and messages of files on the boundary of the window of dates
+        are selected one by one.
+
+        Rows of each channel are written in the order messages were posted in,
+        merging messages of message files as they are read.
+        In incremental mode messages are ordered within each message file,
+        as rows of each file are spliced on their own.
+
         Returns:
-            None
+            Measurements of the conversion, in total and of each channel
         """
         logging.info("Slackエクスポートの変換処理を開始します...")
+        start = time.perf_counter()
+        report = ConversionReport(
+            json_backend=self._file_io.get_json_backend(
+                projecting=self._projected_keys is not None
+            )
+        )
+        logging.info(f"JSONの読み込みには {report.json_backend} を使用します")
 
         channels = self._export_dir.get_channels()
+        manifest_file = self._export_dir.get_manifest_file()
 
-        for channel in channels:
-            logging.info(f"チャンネル #{str(channel)} を変換中...")
+        if self._incremental:
+            self._manifest = Manifest.load(
+                self._file_io,
+                manifest_file,
+                self._csv_data_generator.get_message_fields(),
+                self._csv_data_generator.get_attachment_fields(),
+            )
+            # channels left out by a selection are still kept for later runs
+            self._manifest.remove_channels_except(self._export_dir.get_all_channels())
+        else:
+            # csv files rewritten by a full conversion no longer match the manifest
+            self._file_io.remove(manifest_file)
 
-            message_files = self._export_dir.get_message_files(channel)
-            (csv_data_messages, csv_data_attachments) = self._gather_data(message_files)
+        if self._attachment_store is not None:
+            self._attachment_store.clear_locks()
+        for database in self._databases:
+            database.create_tables()
 
-            self._write_csv_data(csv_data_messages, csv_data_attachments, channel)
-            self._download_attachments(csv_data_attachments, channel)
+        try:
+            if self._workers > 1:
+                self._convert_channels_parallel(channels, report)
+            else:
+                for channel in channels:
+                    try:
+                        result = self._convert_channel(channel)
+                    except Exception:
+                        report.failed_channels.append(channel)
+                        raise
+                    self._record_channel_result(channel, result, report)
+            for database in self._databases:
+                database.create_indexes()
+        finally:
+            for database in self._databases:
+                database.close()
+            if self._manifest is not None:
+                self._manifest.save(self._file_io, manifest_file)
+            report.elapsed_seconds = time.perf_counter() - start
+            self._file_io.write_json(
+                self._export_dir.get_metrics_file(), report.to_dict()
+            )
+            if self._profiler is not None:
+                profile_path = self._export_dir.get_profile_path()
+                self._profiler.write(self._file_io, profile_path)
+                logging.info(f"プロファイル結果を {str(profile_path)} に書き出しました")
 
         logging.info("Slackエクスポートの変換処理が完了しました！")
+        return report
+
+    def _record_channel_result(
+        self, channel: str, result: ChannelResult, report: ConversionReport
+    ) -> None:
+        if self._manifest is not None and result.manifest_entries is not None:
+            self._manifest.set_channel(channel, result.manifest_entries)
+        report.channels[channel] = result.metrics
+        if self._profiler is not None and result.profile is not None:
+            self._profiler.add(result.profile)
+
+    def _convert_channel(self, channel: str) -> ChannelResult:
+        logging.info(f"チャンネル #{str(channel)} を変換中...")
+
+        result = ChannelResult()
+        if self._profiler is None:
+            result.manifest_entries = self._convert_message_files(channel, result.metrics)
+            return result
+
+        with self._profiler.channel(channel):
+            result.manifest_entries = self._convert_message_files(channel, result.metrics)
+        result.profile = self._profiler.collect()
+
+        return result
+
+    def _convert_message_files(
+        self, channel: str, metrics: ConversionMetrics
+    ) -> Optional[ManifestEntries]:
+        message_files = self._export_dir.get_message_files(channel)
+        if self._incremental:
+            return self._convert_channel_incremental(message_files, channel, metrics)
+        if self._pipelined:
+            self._convert_channel_pipelined(message_files, channel, metrics)
+            return None
+        if self._streaming:
+            self._convert_channel_streaming(message_files, channel, metrics)
+            return None
+
+        (csv_data_messages, csv_data_attachments) = self._gather_data(
+            message_files, metrics
+        )
+
+        self._write_csv_data(csv_data_messages, csv_data_attachments, channel, metrics)
+        metrics.downloads = self._download_attachments(csv_data_attachments, channel)
+        self._log_download_result(metrics.downloads, channel)
+
+        return None
+
+    def _convert_channel_streaming(
+        self, message_files: List[ExportPath], channel: str, metrics: ConversionMetrics
+    ) -> None:
+        # csv files start out with the header only and grow file by file
+        self._write_csv_data([], [], channel, metrics)
+
+        merger = MessageMerger()
+        for (message_file, next_file) in _pair_with_next(message_files):
+            elements = self._read_message_file(message_file, metrics)
+            (csv_data_messages, csv_data_attachments) = self._merge_rows(
+                merger, list(elements), next_file, elements.elapsed, metrics
+            )
+
+            self._append_csv_data(
+                csv_data_messages, csv_data_attachments, channel, metrics
+            )
+            metrics.downloads += self._download_attachments(csv_data_attachments, channel)
+
+        self._log_download_result(metrics.downloads, channel)
+
+    def _convert_channel_pipelined(
+        self, message_files: List[ExportPath], channel: str, metrics: ConversionMetrics
+    ) -> None:
+        # csv files start out with the header only and grow file by file
+        self._write_csv_data([], [], channel, metrics)
+
+        # only used by the generate stage, which takes files one at a time in order
+        merger = MessageMerger()
+
+        def read(
+            files: Tuple[ExportPath, Optional[ExportPath]]
+        ) -> Tuple[List[ExportFileElement], Optional[ExportPath], float]:
+            (message_file, next_file) = files
+            elements = self._read_message_file(message_file, metrics)
+            return (list(elements), next_file, elements.elapsed)
+
+        def generate(
+            content: Tuple[List[ExportFileElement], Optional[ExportPath], float]
+        ) -> Tuple[CSVData, CSVData]:
+            (elements, next_file, decode_seconds) = content
+            return self._merge_rows(merger, elements, next_file, decode_seconds, metrics)
+
+        def write(rows: Tuple[CSVData, CSVData]) -> CSVData:
+            (csv_data_messages, csv_data_attachments) = rows
+            self._append_csv_data(
+                csv_data_messages, csv_data_attachments, channel, metrics
+            )
+            return csv_data_attachments
+
+        pipeline = Pipeline(
+            read,
+            generate,
+            write,
+            lambda csv_data_attachments: self._download_attachments(
+                csv_data_attachments, channel
+            ),
+            queue_size=self._PIPELINE_QUEUE_SIZE,
+        )
+        download_results = pipeline.run(_pair_with_next(message_files))
+
+        metrics.downloads = sum(download_results, DownloadResult())
+        self._log_download_result(metrics.downloads, channel)
+
+    def _convert_channel_incremental(
+        self, message_files: List[ExportPath], channel: str, metrics: ConversionMetrics
+    ) -> ManifestEntries:
+        save_location = self._export_dir.get_csv_channel_path(channel)
+        entries = cast(Manifest, self._manifest).get_channel(channel)
+        if not (
+            self._file_io.csv_exists(save_location / self._get_csv_file_name("messages"))
+            and self._file_io.csv_exists(
+                save_location / self._get_csv_file_name("attachments")
+            )
+        ):
+            entries = {}
+
+        # rows in csv files are kept in the order of message file names,
+        # so that the rows of each file can be located from the row counts alone
+        message_files = sorted(message_files, key=lambda message_file: message_file.name)
+        (new_entries, changed_files) = Manifest.find_changes(
+            self._file_io, message_files, entries
+        )
+
+        if not changed_files and new_entries.keys() == entries.keys():
+            logging.info(f"チャンネル #{str(channel)} に変更はありません")
+            return new_entries
+
+        logging.info(f"チャンネル #{str(channel)} の {len(changed_files)}件のファイルを変換します")
+        self._splice_csv_data(entries, new_entries, changed_files, channel, metrics)
+
+        return new_entries
+
+    def _splice_csv_data(
+        self,
+        entries: ManifestEntries,
+        new_entries: ManifestEntries,
+        changed_files: List[ExportPath],
+        channel: str,
+        metrics: ConversionMetrics,
+    ) -> None:
+        save_location = self._export_dir.get_csv_channel_path(channel)
+        outputs = {
+            "messages": (
+                save_location / self._get_csv_file_name("messages"),
+                self._csv_data_generator.get_message_fields(),
+            ),
+            "attachments": (
+                save_location / self._get_csv_file_name("attachments"),
+                self._csv_data_generator.get_attachment_fields(),
+            ),
+        }
+        spliced_paths = {
+            name: path.with_name(path.name + ".tmp")
+            for (name, (path, _)) in outputs.items()
+        }
+        changed_files_by_name = {file.name: file for file in changed_files}
 
-    def _gather_data(self, message_files: List[Path]) -> Tuple[CSVData, CSVData]:
+        with ExitStack() as stack:
+            # rows of the previous run are read side by side with the rows written
+            previous_rows: Dict[str, Iterator[Dict[str, str]]] = {
+                name: stack.enter_context(closing(self._file_io.csv_read(path)))
+                if entries
+                else iter(())
+                for (name, (path, _)) in outputs.items()
+            }
+            for name, (_, fields) in outputs.items():
+                self._csv_write(spliced_paths[name], fields, [], metrics)
+
+            for file_name in sorted(entries.keys() | new_entries.keys()):
+                entry = entries.get(file_name)
+                rows = {
+                    name: list(islice(previous_rows[name], entry[name] if entry else 0))
+                    for name in outputs.keys()
+                }
+
+                if file_name in changed_files_by_name:
+                    message_file = changed_files_by_name[file_name]
+                    (rows["messages"], rows["attachments"]) = self._gather_data(
+                        [message_file], metrics
+                    )
+                    new_entries[file_name]["messages"] = len(rows["messages"])
+                    new_entries[file_name]["attachments"] = len(rows["attachments"])
+                    metrics.downloads += self._download_attachments(
+                        rows["attachments"], channel
+                    )
+                elif file_name not in new_entries:
+                    # message file was removed from the export
+                    continue
+
+                for name, (_, fields) in outputs.items():
+                    self._csv_write(
+                        spliced_paths[name], fields, rows[name], metrics, append=True
+                    )
+
+        for name, (path, _) in outputs.items():
+            self._file_io.move(spliced_paths[name], path)
+
+        self._log_download_result(metrics.downloads, channel)
+
+    def _convert_channels_parallel(
+        self, channels: List[str], report: ConversionReport
+    ) -> None:
+        # records emitted inside worker processes are funneled back through a queue
+        # so they reach the handlers configured in this process
+        log_queue = multiprocessing.Queue()
+        log_listener = QueueListener(
+            log_queue, *logging.getLogger().handlers, respect_handler_level=True
+        )
+        log_listener.start()
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_worker,
+                initargs=(self, log_queue),
+            ) as executor:
+                futures = {
+                    executor.submit(_convert_channel_in_worker, channel): channel
+                    for channel in channels
+                }
+
+                for future in as_completed(futures):
+                    channel = futures[future]
+                    try:
+                        self._record_channel_result(channel, future.result(), report)
+                    except Exception as e:
+                        logging.error(f"チャンネル #{str(channel)} の変換に失敗しました: {e}")
+                        report.failed_channels.append(channel)
+        finally:
+            log_listener.stop()
+
+        if report.failed_channels:
+            raise ConverterException(
+                f"{len(report.failed_channels)}件のチャンネルの変換に失敗しました: "
+                + ", ".join(f"#{channel}" for channel in report.failed_channels)
+            )
+
+    def _gather_data(
+        self, message_files: List[ExportPath], metrics: ConversionMetrics
+    ) -> Tuple[CSVData, CSVData]:
         csv_data_messages = []
         csv_data_attachments = []
 
-        for message_file in message_files:
-            file_content = cast(ExportFileContent, self._file_io.read_json(message_file))
+        merger = MessageMerger()
+        for (message_file, next_file) in _pair_with_next(message_files):
+            elements = self._read_message_file(message_file, metrics)
+            (messages, attachments) = self._merge_rows(
+                merger, list(elements), next_file, elements.elapsed, metrics
+            )
+            csv_data_messages.extend(messages)
+            csv_data_attachments.extend(attachments)
 
-            csv_data = self._csv_data_generator.generate_messages(file_content)
-            csv_data_messages.extend(csv_data)
+        return (csv_data_messages, csv_data_attachments)
 
-            csv_data = self._csv_data_generator.generate_attachments(file_content)
-            csv_data_attachments.extend(csv_data)
+    def _merge_rows(
+        self,
+        merger: MessageMerger,
+        elements: List[ExportFileElement],
+        next_file: Optional[ExportPath],
+        decode_seconds: float,
+        metrics: ConversionMetrics,
+    ) -> Tuple[CSVData, CSVData]:
+        """Generates rows of messages no file after the one read may precede
 
-        return (csv_data_messages, csv_data_attachments)
+        Args:
+            merger: merger of message files of the channel read so far
+            elements: elements of the message file read
+            next_file: message file to be read next, None after the last file
+            decode_seconds: time taken to decode the message file read
+            metrics: measurements of the channel
+
+        Returns:
+            Rows of messages and attachments, in the order messages were posted in
+        """
+        start = time.perf_counter()
+        with self._profile("generate"):
+            merger.add(elements)
+            messages = merger.pop_ready(next_file.name if next_file is not None else None)
+            rows = self._csv_data_generator.generate_rows(messages)
+        self._record_file_times(metrics, decode_seconds, time.perf_counter() - start)
+        return rows
+
+    def _read_message_file(
+        self, message_file: ExportPath, metrics: ConversionMetrics
+    ) -> _TimedIterator:
+        (size, _) = self._file_io.get_file_stat(message_file)
+        metrics.files_read += 1
+        metrics.bytes_read += size
+        projecting = self._projected_keys is not None
+        json_backend = self._file_io.get_json_backend(projecting, file_size=size)
+        metrics.json_backends[json_backend] = (
+            metrics.json_backends.get(json_backend, 0) + 1
+        )
+        if json_backend != self._file_io.get_json_backend(projecting):
+            # files too large to be decoded at once are parsed as they are read
+            logging.info(f"{str(message_file)} は {json_backend} で読み込みます")
+
+        elements = self._file_io.iter_json_array(message_file, keys=self._projected_keys)
+        selection = self._export_dir.get_selection()
+        if selection is not None and selection.filters_messages(message_file.name):
+            elements = filter(selection.includes_message, elements)
+        if self._profiler is not None:
+            elements = self._profiler.iterate("decode", elements)
+
+        # time taken to decode elements is accumulated as they are consumed
+        return _TimedIterator(elements)
+
+    def _record_file_times(
+        self, metrics: ConversionMetrics, decode_seconds: float, generate_seconds: float
+    ) -> None:
+        metrics.decode_seconds += decode_seconds
+        metrics.generate_seconds += generate_seconds
+        metrics.file_latencies.append(decode_seconds + generate_seconds)
 
     def _write_csv_data(
-        self, csv_data_messages: CSVData, csv_data_attachments: CSVData, channel: str
+        self,
+        csv_data_messages: CSVData,
+        csv_data_attachments: CSVData,
+        channel: str,
+        metrics: ConversionMetrics,
     ) -> None:
         save_location = self._export_dir.get_csv_channel_path(channel)
 
-        self._file_io.csv_write(
-            save_location / "messages.csv",
+        self._csv_write(
+            save_location / self._get_csv_file_name("messages"),
             self._csv_data_generator.get_message_fields(),
             csv_data_messages,
+            metrics,
         )
-        self._file_io.csv_write(
-            save_location / "attachments.csv",
+        self._csv_write(
+            save_location / self._get_csv_file_name("attachments"),
             self._csv_data_generator.get_attachment_fields(),
             csv_data_attachments,
+            metrics,
+        )
+        self._write_database_rows(
+            csv_data_messages, csv_data_attachments, channel, metrics
         )
 
-    def _download_attachments(self, csv_data_attachments: CSVData, channel: str) -> None:
+    def _append_csv_data(
+        self,
+        csv_data_messages: CSVData,
+        csv_data_attachments: CSVData,
+        channel: str,
+        metrics: ConversionMetrics,
+    ) -> None:
+        save_location = self._export_dir.get_csv_channel_path(channel)
+
+        self._csv_write(
+            save_location / self._get_csv_file_name("messages"),
+            self._csv_data_generator.get_message_fields(),
+            csv_data_messages,
+            metrics,
+            append=True,
+        )
+        self._csv_write(
+            save_location / self._get_csv_file_name("attachments"),
+            self._csv_data_generator.get_attachment_fields(),
+            csv_data_attachments,
+            metrics,
+            append=True,
+        )
+        self._write_database_rows(
+            csv_data_messages, csv_data_attachments, channel, metrics
+        )
+
+    def _get_csv_file_name(self, name: str) -> str:
+        # suffix tells how the file is compressed, if it is
+        return name + self._file_io.get_csv_suffix()
+
+    def _csv_write(
+        self,
+        file_path: Path,
+        fields: CSVFields,
+        rows: CSVData,
+        metrics: ConversionMetrics,
+        **kwargs: Any,
+    ) -> None:
+        start = time.perf_counter()
+        with self._profile("write"):
+            self._file_io.csv_write(file_path, fields, rows, **kwargs)
+        metrics.write_seconds += time.perf_counter() - start
+        metrics.rows_written += len(rows)
+
+    def _write_database_rows(
+        self,
+        csv_data_messages: CSVData,
+        csv_data_attachments: CSVData,
+        channel: str,
+        metrics: ConversionMetrics,
+    ) -> None:
+        if not self._databases or not (csv_data_messages or csv_data_attachments):
+            return
+
+        start = time.perf_counter()
+        with self._profile("write"):
+            for database in self._databases:
+                database.write_rows(channel, csv_data_messages, csv_data_attachments)
+        metrics.write_seconds += time.perf_counter() - start
+
+    def _download_attachments(
+        self, csv_data_attachments: CSVData, channel: str
+    ) -> DownloadResult:
         save_location = self._export_dir.get_attachments_path(channel)
 
-        for attachment in csv_data_attachments:
-            url = attachment["url"]
-            file_path = save_location / attachment["ファイル名"]
+        with self._profile("download"):
+            if self._attachment_store is not None:
+                return self._attachment_store.store_all(
+                    self._downloader,
+                    (
+                        (
+                            attachment["url"],
+                            attachment[AttachmentStore.FIELD],
+                            save_location / attachment["ファイル名"],
+                        )
+                        for attachment in csv_data_attachments
+                    ),
+                )
+
+            return self._downloader.download_all(
+                (attachment["url"], save_location / attachment["ファイル名"])
+                for attachment in csv_data_attachments
+            )
+
+    def _profile(self, stage: str) -> ContextManager[None]:
+        if self._profiler is None:
+            return self._UNPROFILED
+        return self._profiler.stage(stage)
+
+    def _log_download_result(self, result: DownloadResult, channel: str) -> None:
+        logging.info(
+            f"チャンネル #{str(channel)} の添付ファイル: "
+            f"ダウンロード {result.downloaded}件, "
+            f"スキップ {result.skipped}件, 失敗 {result.failed}件"
+        )
+
+
+# state of a worker process spawned by Converter._convert_channels_parallel()
+# the converter, and with it the users mapping of CSVDataGenerator,
+# is handed over once per process instead of once per channel
+_worker_converter: Optional[Converter] = None
+
+
+def _pair_with_next(
+    message_files: List[ExportPath],
+) -> List[Tuple[ExportPath, Optional[ExportPath]]]:
+    # each message file along with the one after it
+    return list(zip(message_files, [*message_files[1:], None]))
+
+
+def _init_worker(converter: Converter, log_queue: multiprocessing.Queue) -> None:
+    global _worker_converter
+    _worker_converter = converter
+
+    logger = logging.getLogger()
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.DEBUG)
+
 
-            try:
-                self._file_io.download(url, file_path)
-            except Exception:
-                # even if download fails just continue with rest of downloads
-                continue
+def _convert_channel_in_worker(channel: str) -> ChannelResult:
+    return cast(Converter, _worker_converter)._convert_channel(channel)
@@ -1,10 +1,19 @@
 # -*- coding: utf-8 -*-
-from typing import Union, Optional
-from datetime import datetime
-from re import sub, compile, Match
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from datetime import tzinfo
 import urllib.parse
 
-from .types import ExportFileContent, ExportFileElement, CSVData, CSVFields
+from .attachment_store import AttachmentStore
+from .exceptions import ConverterException
+from .markup import MarkupRewriter
+from .timestamp_formatter import TimestampFormatter
+from .user_index import UserIndex
+from .types import ExportFileElement, CSVData, CSVFields
+
+# computes value of a field from a message
+MessageExtractor = Callable[[ExportFileElement], str]
+# computes value of a field from a message and one of its attached files
+AttachmentExtractor = Callable[[ExportFileElement, ExportFileElement], str]
 
 
 class CSVDataGenerator:
@@ -12,12 +21,70 @@ class CSVDataGenerator:
     This class is responsible for generating csv data from exported slack message files.
     Knowledge of how to parse/interpret the export files is localized in this class to
     promote decoupling.
+
+    Which fields are generated, and how each of them is computed, is worked out once
+    on construction and reused for every row.
     """
 
-    def __init__(self, users_data: ExportFileContent) -> None:
-        self._userid_name_mapping = {
-            user["id"]: user["profile"]["real_name"] for user in users_data
-        }
+    _DEFAULT_MESSAGE_FIELDS = ["ts", "投稿日時", "ユーザー", "テキスト", "thread_ts"]
+    _DEFAULT_ATTACHMENT_FIELDS = ["ファイル名", "アップロード日時", "ユーザー", "message_ts", "url"]
+    # attachment fields holding the same value as a field of message they belong to
+    _SHARED_ATTACHMENT_FIELDS = {"ユーザー": "ユーザー", "message_ts": "ts"}
+    # keys of messages and of their files that each field is computed from
+    _MESSAGE_FIELD_KEYS = {
+        "ts": ["ts"],
+        "投稿日時": ["ts"],
+        "ユーザー": ["user"],
+        "テキスト": ["text"],
+        "thread_ts": ["thread_ts"],
+    }
+    _ATTACHMENT_FIELD_KEYS = {
+        "ファイル名": ["created", "size", "name", "url_private"],
+        "アップロード日時": ["created"],
+        "ユーザー": ["user"],
+        "message_ts": ["ts"],
+        "url": ["url_private"],
+        AttachmentStore.FIELD: ["id", "created", "size", "name", "url_private"],
+    }
+    # keys needed regardless of fields, to pick out messages and their files
+    _REQUIRED_KEYS = ["type", "files", "url_private"]
+
+    def __init__(
+        self,
+        users_data: Union[Iterable[ExportFileElement], UserIndex],
+        message_fields: Optional[CSVFields] = None,
+        attachment_fields: Optional[CSVFields] = None,
+        timezone: Optional[tzinfo] = None,
+    ) -> None:
+        self._timestamp_formatter = TimestampFormatter(timezone)
+        self._userid_name_mapping: Union[Dict[str, str], UserIndex]
+        if isinstance(users_data, UserIndex):
+            self._userid_name_mapping = users_data
+        else:
+            self._userid_name_mapping = {
+                user["id"]: user["profile"]["real_name"] for user in users_data
+            }
+        self._markup_rewriter = MarkupRewriter(self._userid_name_mapping)
+        self._message_plan = self._compile_plan(
+            message_fields or self._DEFAULT_MESSAGE_FIELDS, self._message_extractors()
+        )
+        self._attachment_plan = self._compile_plan(
+            attachment_fields or self._DEFAULT_ATTACHMENT_FIELDS,
+            self._attachment_extractors(),
+        )
+        (
+            self._attachment_shared_plan,
+            self._attachment_own_plan,
+        ) = self._split_attachment_plan(self.get_message_fields())
+
+    @classmethod
+    def get_default_attachment_fields(cls) -> CSVFields:
+        """Get list of fields attachment csv file has unless specified otherwise
+
+        Returns:
+            List of fields
+        """
+        return list(cls._DEFAULT_ATTACHMENT_FIELDS)
 
     def get_message_fields(self) -> CSVFields:
         """Get list of fields message csv file should have
@@ -25,9 +92,24 @@ class CSVDataGenerator:
         Returns:
             List of fields
         """
-        return ["ts", "投稿日時", "ユーザー", "テキスト", "thread_ts"]
+        return [field for (field, _) in self._message_plan]
+
+    def get_used_keys(self) -> Set[str]:
+        """Get keys of messages, and of files attached to them, that generated rows
+        are computed from
+
+        Returns:
+            Set of keys, any other key of the export can be left out
+        """
+        used_keys = set(self._REQUIRED_KEYS)
+        for (field, _) in self._message_plan:
+            used_keys.update(self._MESSAGE_FIELD_KEYS[field])
+        for (field, _) in self._attachment_plan:
+            used_keys.update(self._ATTACHMENT_FIELD_KEYS[field])
+
+        return used_keys
 
-    def generate_messages(self, messages_data: ExportFileContent) -> CSVData:
+    def generate_messages(self, messages_data: Iterable[ExportFileElement]) -> CSVData:
         """Generates csv data from slack export message file
 
         Args:
@@ -36,20 +118,7 @@ class CSVDataGenerator:
         Returns:
             List of row data
         """
-        # logging.warning(str(messages-data))
-        generated_messages = []
-        fields = self.get_message_fields()
-
-        for message in messages_data:
-            if not message["type"] == "message":
-                continue
-
-            generated_message = {
-                field: self._convert_field(field, message) for field in fields
-            }
-
-            generated_messages.append(generated_message)
-
+        (generated_messages, _) = self.generate_rows(messages_data)
         return generated_messages
 
     def get_attachment_fields(self) -> CSVFields:
@@ -58,9 +127,9 @@ class CSVDataGenerator:
         Returns:
             List of fields
         """
-        return ["ファイル名", "アップロード日時", "ユーザー", "message_ts", "url"]
+        return [field for (field, _) in self._attachment_plan]
 
-    def generate_attachments(self, messages_data: ExportFileContent) -> CSVData:
+    def generate_attachments(self, messages_data: Iterable[ExportFileElement]) -> CSVData:
         """Generates csv data for attachment files from slack export message file
 
         Args:
@@ -69,10 +138,40 @@ class CSVDataGenerator:
         Returns:
             List of row data
         """
+        (_, generated_attachments) = self.generate_rows(messages_data)
+        return generated_attachments
+
+    def generate_rows(
+        self, messages_data: Iterable[ExportFileElement]
+    ) -> Tuple[CSVData, CSVData]:
+        """Generates csv data of messages and of their attachment files in one pass
+        over slack export message file
+
+        Values attachment rows share with the row of their message,
+        such as name of the user, are computed once per message.
+
+        Args:
+            messages_data: data retrieved from slack export messages file,
+                which may be an iterator parsing the file as it is consumed
+
+        Returns:
+            List of message row data and list of attachment row data
+        """
+        generated_messages = []
         generated_attachments = []
-        fields = self.get_attachment_fields()
+        message_plan = self._message_plan
+        attachment_plan = self._attachment_plan
+        shared_plan = self._attachment_shared_plan
+        own_plan = self._attachment_own_plan
 
         for message in messages_data:
+            generated_message = None
+            if message.get("type") == "message":
+                generated_message = {
+                    field: extract(message) for (field, extract) in message_plan
+                }
+                generated_messages.append(generated_message)
+
             files = message.get("files")
             if not files:
                 continue
@@ -81,54 +180,131 @@ class CSVDataGenerator:
                 if not attachment.get("url_private"):
                     continue
 
-                generated_attachment = {
-                    field: self._convert_field(field, message, attachment)
-                    for field in fields
-                }
+                if generated_message is None:
+                    generated_attachment = {
+                        field: extract(message, attachment)
+                        for (field, extract) in attachment_plan
+                    }
+                else:
+                    generated_attachment = {
+                        field: generated_message[message_field]
+                        for (field, message_field) in shared_plan
+                    }
+                    for (field, extract) in own_plan:
+                        generated_attachment[field] = extract(message, attachment)
 
                 generated_attachments.append(generated_attachment)
 
-        return generated_attachments
+        return (generated_messages, generated_attachments)
 
-    def _convert_field(
-        self,
-        field_name: str,
-        message: ExportFileElement,
-        attachment: Optional[ExportFileElement] = None,
+    # extraction plan
+    @staticmethod
+    def _compile_plan(
+        fields: CSVFields, extractors: Dict[str, Callable]
+    ) -> List[Tuple[str, Callable]]:
+        plan = []
+        for field in fields:
+            extractor = extractors.get(field)
+            if extractor is None:
+                raise ConverterException(f"列名 {field} は指定できません")
+            plan.append((field, extractor))
+
+        return plan
+
+    def _split_attachment_plan(
+        self, message_fields: CSVFields
+    ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, Callable]]]:
+        # attachment fields that can be copied from row of the message
+        # are separated from those that have to be extracted
+        shared_plan = []
+        own_plan = []
+        for (field, extractor) in self._attachment_plan:
+            message_field = self._SHARED_ATTACHMENT_FIELDS.get(field)
+            if message_field in message_fields:
+                shared_plan.append((field, message_field))
+            else:
+                own_plan.append((field, extractor))
+
+        return (shared_plan, own_plan)
+
+    def _message_extractors(self) -> Dict[str, MessageExtractor]:
+        return {
+            "ts": self._extract_ts,
+            "投稿日時": self._extract_datetime,
+            "ユーザー": self._extract_username,
+            "テキスト": self._extract_text,
+            "thread_ts": self._extract_thread_ts,
+        }
+
+    def _attachment_extractors(self) -> Dict[str, AttachmentExtractor]:
+        return {
+            "ファイル名": self._extract_filename,
+            "アップロード日時": self._extract_upload_datetime,
+            "ユーザー": self._extract_uploader_name,
+            "message_ts": self._extract_message_ts,
+            "url": self._extract_url,
+            AttachmentStore.FIELD: self._extract_canonical_path,
+        }
+
+    # extraction methods
+    @staticmethod
+    def _extract_ts(message: ExportFileElement) -> str:
+        return message["ts"]
+
+    def _extract_datetime(self, message: ExportFileElement) -> str:
+        return self._convert_ts(message["ts"])
+
+    def _extract_username(self, message: ExportFileElement) -> str:
+        return self._convert_userid(message.get("user", ""))
+
+    def _extract_text(self, message: ExportFileElement) -> str:
+        return self._convert_textcontent(message["text"])
+
+    @staticmethod
+    def _extract_thread_ts(message: ExportFileElement) -> str:
+        return message.get("thread_ts", "")
+
+    def _extract_filename(
+        self, message: ExportFileElement, attachment: ExportFileElement
     ) -> str:
-        if field_name == "ts":
-            field_value = message["ts"]
-        elif field_name == "投稿日時":
-            field_value = self._convert_ts(message["ts"])
-        elif field_name == "ユーザー":
-            field_value = self._convert_userid(message.get("user", ""))
-        elif field_name == "テキスト":
-            field_value = self._convert_textcontent(message["text"])
-        elif field_name == "thread_ts":
-            field_value = message.get("thread_ts", "")
-        elif field_name == "アップロード日時" and attachment is not None:
-            field_value = self._convert_ts(attachment["created"])
-        elif field_name == "message_ts":
-            field_value = message["ts"]
-        elif field_name == "url" and attachment is not None:
-            field_value = attachment["url_private"]
-        elif field_name == "ファイル名" and attachment is not None:
-            field_value = self._convert_filename(attachment)
-        else:
-            field_value = ""
+        return self._convert_filename(attachment)
 
-        return field_value
+    def _extract_upload_datetime(
+        self, message: ExportFileElement, attachment: ExportFileElement
+    ) -> str:
+        return self._convert_ts(attachment["created"])
+
+    def _extract_uploader_name(
+        self, message: ExportFileElement, attachment: ExportFileElement
+    ) -> str:
+        return self._convert_userid(message.get("user", ""))
 
-    # conversion methods
     @staticmethod
-    def _convert_ts(ts: Union[str, int]) -> str:
-        return str(datetime.fromtimestamp(float(ts)))
+    def _extract_message_ts(
+        message: ExportFileElement, attachment: ExportFileElement
+    ) -> str:
+        return message["ts"]
+
+    @staticmethod
+    def _extract_url(message: ExportFileElement, attachment: ExportFileElement) -> str:
+        return attachment["url_private"]
+
+    def _extract_canonical_path(
+        self, message: ExportFileElement, attachment: ExportFileElement
+    ) -> str:
+        return AttachmentStore.get_canonical_path(
+            attachment, self._convert_filename(attachment)
+        )
+
+    # conversion methods
+    def _convert_ts(self, ts: Union[str, int]) -> str:
+        return self._timestamp_formatter.format(ts)
 
     def _convert_userid(self, userid: str) -> str:
         return self._userid_name_mapping.get(userid, "Not available")
 
     def _convert_filename(self, attachment: ExportFileElement) -> str:
-        date = sub("[- :]", "", self._convert_ts(attachment["created"]))
+        date = self._timestamp_formatter.format_compact(attachment["created"])
         size = attachment["size"]
         name = attachment.get("name")
         if not name:
@@ -137,16 +313,4 @@ class CSVDataGenerator:
         return f"{date}_{size}_{name}"
 
     def _convert_textcontent(self, text: str) -> str:
-        return self._escape_newlines(self._convert_user_mentions(text))
-
-    def _convert_user_mentions(self, text: str) -> str:
-        mention_pattern = compile("<@(.*?)>")
-
-        def convert_match_to_username(match: Match) -> str:
-            return f"@{self._convert_userid(match.group(1))}"
-
-        return sub(mention_pattern, convert_match_to_username, text)
-
-    @staticmethod
-    def _escape_newlines(text: str) -> str:
-        return text.replace("\n", "\\n")
+        return self._markup_rewriter.rewrite(text)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .exceptions import ConverterException
+from .file_io import FileIO
+
+
+@dataclass
+class DownloadResult:
+    """
+    Tally of what happened to each file handed to Downloader.download_all().
+    """
+
+    downloaded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    downloaded_bytes: int = 0
+    # seconds taken by each download, which vary from run to run
+    latencies: List[float] = field(default_factory=list, compare=False)
+
+    def __add__(self, other: "DownloadResult") -> "DownloadResult":
+        return DownloadResult(
+            downloaded=self.downloaded + other.downloaded,
+            skipped=self.skipped + other.skipped,
+            failed=self.failed + other.failed,
+            downloaded_bytes=self.downloaded_bytes + other.downloaded_bytes,
+            latencies=self.latencies + other.latencies,
+        )
+
+
+class Downloader:
+    """
+    Downloads many files at once while keeping the number of in-flight
+    downloads bounded.
+    The actual transfer of each file is delegated to FileIO.download().
+    """
+
+    _DOWNLOADED = "downloaded"
+    _SKIPPED = "skipped"
+    _FAILED = "failed"
+
+    def __init__(self, file_io: FileIO, max_workers: int = 1) -> None:
+        if max_workers < 1:
+            raise ConverterException("同時ダウンロード数には1以上の値を指定してください。")
+
+        self._file_io = file_io
+        self._max_workers = max_workers
+
+    def download_all(self, downloads: Iterable[Tuple[str, Path]]) -> DownloadResult:
+        """Downloads files concurrently
+
+        A failed download does not stop the rest of the downloads,
+        and files that already exist are skipped.
+        A path repeated in downloads is downloaded once and counted as skipped
+        the other times, so that no two downloads write the same file at once.
+
+        Args:
+            downloads: pairs of url to download from and path to save the file as
+
+        Returns:
+            Number of files downloaded, skipped and failed,
+            along with bytes and latencies of the downloads
+        """
+        # url of each path to save a file as, in the order they were given
+        unique_downloads: Dict[Path, str] = {}
+        repeated = 0
+        for (url, path) in downloads:
+            if path in unique_downloads:
+                repeated += 1
+            else:
+                unique_downloads[path] = url
+
+        if self._max_workers == 1:
+            outcomes = [
+                self._download_one(url, path) for (path, url) in unique_downloads.items()
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                outcomes = list(
+                    executor.map(
+                        lambda download: self._download_one(download[1], download[0]),
+                        unique_downloads.items(),
+                    )
+                )
+
+        results = [outcome for (outcome, _, _) in outcomes]
+        return DownloadResult(
+            downloaded=results.count(self._DOWNLOADED),
+            skipped=results.count(self._SKIPPED) + repeated,
+            failed=results.count(self._FAILED),
+            downloaded_bytes=sum(size for (_, size, _) in outcomes if size is not None),
+            latencies=[
+                latency
+                for (outcome, _, latency) in outcomes
+                if outcome == self._DOWNLOADED
+            ],
+        )
+
+    def _download_one(
+        self, url: str, file_path: Path
+    ) -> Tuple[str, Optional[int], float]:
+        start = time.perf_counter()
+        try:
+            downloaded_size = self._file_io.download(url, file_path)
+        except Exception:
+            # even if download fails just continue with rest of downloads
+            return (self._FAILED, None, time.perf_counter() - start)
+
+        outcome = self._SKIPPED if downloaded_size is None else self._DOWNLOADED
+        return (outcome, downloaded_size, time.perf_counter() - start)
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
+import os
+import zipfile
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from slack_export_csv_converter.exceptions import ConverterException
+from slack_export_csv_converter.export_selection import ExportSelection
+from slack_export_csv_converter.types import ExportPath
 
 
 class ExportDir:
@@ -10,62 +14,171 @@ class ExportDir:
     A class that abstracts away directory structure of slack exports.
     The motivation is to free the burden of consumers of this class from worrying about
     how the exported files are laid out and where it is located.
+
+    The export can either be an extracted directory or the zip archive itself.
+    Files inside an archive are referred to by zipfile.Path and are never extracted.
+    With a selection, only channels and message files selected are returned.
     """
 
     _USERS_FILE_NAME = "users.json"
+    _MANIFEST_FILE_NAME = "manifest.json"
+    _USER_INDEX_FILE_NAME = "users.idx"
+    _METRICS_FILE_NAME = "metrics.json"
+    _DATABASE_FILE_NAME = "workspace.sqlite3"
+    _SEARCH_INDEX_FILE_NAME = "search.sqlite3"
+    # dotted so that it never collides with the directory of a channel
+    _PROFILE_DIR_NAME = "conversion.profile"
+    # directories that do not hold channels, such as ones added by macOS archivers
+    _IGNORED_DIR_NAMES = {"__MACOSX"}
 
-    def __init__(self, export_path: Path, save_path: Path) -> None:
+    def __init__(
+        self,
+        export_path: Path,
+        save_path: Path,
+        selection: Optional[ExportSelection] = None,
+    ) -> None:
         self._check_exists(export_path)
         self._check_exists(save_path)
         self._export_path = export_path
+        self._selection = selection
         self._csv_path = save_path / f"csv_converted_{str(export_path.stem)}"
+        self._archive: Optional[zipfile.ZipFile] = None
+        # process the archive was opened in, as forked processes would share
+        # the offset of its file and read one another's data
+        self._archive_pid: Optional[int] = None
+        self._export_root = self._open_export_root()
         self._channel_paths = [
-            dir.stem for dir in self._export_path.iterdir() if dir.is_dir()
+            dir.stem if isinstance(dir, Path) else dir.name
+            for dir in self._get_export_root().iterdir()
+            if dir.is_dir() and dir.name not in self._IGNORED_DIR_NAMES
         ]
 
-    def get_users_file(self) -> Path:
+    def __getstate__(self) -> Dict[str, Any]:
+        # open archive cannot be pickled, it is opened again when unpickled
+        state = self.__dict__.copy()
+        del state["_archive"]
+        del state["_export_root"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._archive = None
+        self._archive_pid = None
+        self._export_root = self._open_export_root()
+
+    def _get_export_root(self) -> ExportPath:
+        if self._archive is not None and self._archive_pid != os.getpid():
+            # the archive opened by the parent is left for the parent to read from
+            self._export_root = self._open_export_root()
+
+        return self._export_root
+
+    def _open_export_root(self) -> ExportPath:
+        if not (self._export_path.is_file() and zipfile.is_zipfile(self._export_path)):
+            return self._export_path
+
+        self._archive = zipfile.ZipFile(self._export_path)
+        self._archive_pid = os.getpid()
+        root = zipfile.Path(self._archive)
+
+        # archives re-created from an extracted export wrap everything in a folder
+        entries = list(root.iterdir())
+        if (
+            not (root / self._USERS_FILE_NAME).exists()
+            and len(entries) == 1
+            and entries[0].is_dir()
+        ):
+            root = entries[0]
+
+        return root
+
+    def get_users_file(self) -> ExportPath:
         """Get path to a file containing user information from within slack export
 
         Returns:
             Path to a json file containing user information
         """
-        users_file = self._export_path / self._USERS_FILE_NAME
+        users_file = self._get_export_root() / self._USERS_FILE_NAME
         self._check_exists(users_file)
 
         return users_file
 
     def get_channels(self) -> List[str]:
-        """Get all existing channel in the export
+        """Get all existing channel in the export, or those selected
+
+        Returns:
+            List of channel names
+        """
+        if self._selection is None:
+            return self._channel_paths
+
+        return [
+            channel
+            for channel in self._channel_paths
+            if self._selection.includes_channel(channel)
+        ]
+
+    def get_all_channels(self) -> List[str]:
+        """Get all existing channels in the export, whether selected or not
 
         Returns:
             List of channel names
         """
         return self._channel_paths
 
-    def get_message_files(self, channel: str) -> List[Path]:
+    def get_selection(self) -> Optional[ExportSelection]:
+        """Get selection of parts of the export to convert
+
+        Returns:
+            Selection the export was opened with, None when everything is converted
+        """
+        return self._selection
+
+    def get_message_files(self, channel: str) -> List[ExportPath]:
         """Get paths to all message files belonging to a channel
 
+        With a selection, files that hold no messages selected are left out
+        by their names, without being opened.
+
         Args:
             channel: name of channel
 
         Returns:
-            path to message json files
+            path to message json files, in the order of days they are named after
         """
-        channel_path = self._export_path / channel
+        channel_path = self._get_export_root() / channel
         self._check_exists(channel_path, f"チャンネル名 {channel} は存在しません")
-        return [
+        message_files = [
             file
             for file in channel_path.iterdir()
-            if file.is_file() and file.suffix == ".json"
+            if file.is_file()
+            and file.name.endswith(".json")
+            and (
+                self._selection is None
+                or self._selection.includes_message_file(file.name)
+            )
         ]
+        # names of days such as 2023-01-01 sort in the order of the days
+        return sorted(message_files, key=lambda file: file.name)
 
-    def _check_exists(self, path: Path, fail_msg: Optional[str] = None) -> None:
+    def _check_exists(self, path: ExportPath, fail_msg: Optional[str] = None) -> None:
         if fail_msg is None:
             fail_msg = f"{str(path)} が見つかりません"
 
         if not path.exists():
             raise ConverterException(fail_msg)
 
+    def get_csv_path(self) -> Path:
+        """Retrieve path of the directory csv converted data is stored in.
+
+        In the process a new folder is created if not found.
+
+        Returns:
+            path to the directory of csv converted data
+        """
+        self._csv_path.mkdir(parents=True, exist_ok=True)
+        return self._csv_path
+
     def get_csv_channel_path(self, channel: str) -> Path:
         """Retrieve path to store csv converted data of specified channel.
 
@@ -101,3 +214,61 @@ class ExportDir:
         attachments_path = self._csv_path / channel / "attachments"
         attachments_path.mkdir(parents=True, exist_ok=True)
         return attachments_path
+
+    def get_manifest_file(self) -> Path:
+        """Retrieve path to the manifest of message files that were already converted.
+
+        Returns:
+            path to the manifest file
+        """
+        return self._get_output_path(self._MANIFEST_FILE_NAME)
+
+    def get_user_index_file(self) -> Path:
+        """Retrieve path to the index of users built from users file.
+
+        Returns:
+            path to the user index file
+        """
+        return self._get_output_path(self._USER_INDEX_FILE_NAME)
+
+    def get_metrics_file(self) -> Path:
+        """Retrieve path to the report of measurements taken during conversion.
+
+        Returns:
+            path to the metrics file
+        """
+        return self._get_output_path(self._METRICS_FILE_NAME)
+
+    def get_database_file(self) -> Path:
+        """Retrieve path to the sqlite database rows are written to.
+
+        Returns:
+            path to the database file
+        """
+        return self._get_output_path(self._DATABASE_FILE_NAME)
+
+    def get_search_index_file(self) -> Path:
+        """Retrieve path to the full text index text of messages is written to.
+
+        Returns:
+            path to the index file
+        """
+        return self._get_output_path(self._SEARCH_INDEX_FILE_NAME)
+
+    def get_profile_path(self) -> Path:
+        """Retrieve path to the directory profiling results are written to.
+
+        In the process the directory is created if not found.
+
+        Returns:
+            path to the profile directory
+        """
+        profile_path = self._get_output_path(self._PROFILE_DIR_NAME)
+        profile_path.mkdir(exist_ok=True)
+        return profile_path
+
+    def _get_output_path(self, name: str) -> Path:
+        # files of the whole conversion are kept alongside the csv converted data,
+        # whose folder is created if not found
+        self._csv_path.mkdir(parents=True, exist_ok=True)
+        return self._csv_path / name
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from datetime import date, datetime, time, timedelta, tzinfo
+from fnmatch import fnmatchcase
+from typing import List, Optional
+
+from .exceptions import ConverterException
+from .message_file_days import DAY_MARGIN, parse_day
+from .types import ExportFileElement
+
+
+class ExportSelection:
+    """
+    Selects part of an export to convert, channels whose names match patterns
+    and messages posted within a window of dates.
+
+    Message files are named after the day their messages were posted on,
+    which lets files outside the window be left out by their names alone,
+    before they are opened.
+    Days may be split in a timezone other than the one dates of the window are in,
+    so files of days next to the window may hold messages within it, and files of
+    the first and last days of the window may hold messages outside it.
+    Only messages of such files are selected one by one by their ts.
+    """
+
+    def __init__(
+        self,
+        include_channels: Optional[List[str]] = None,
+        exclude_channels: Optional[List[str]] = None,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        timezone: Optional[tzinfo] = None,
+    ) -> None:
+        """
+        Args:
+            include_channels: glob patterns of names of channels to convert,
+                every channel when omitted
+            exclude_channels: glob patterns of names of channels not to convert,
+                taking precedence over include_channels
+            since: first date of messages to convert
+            until: last date of messages to convert
+            timezone: timezone dates are in, that of the machine when omitted
+        """
+        if since is not None and until is not None and since > until:
+            raise ConverterException("開始日には終了日以前の日付を指定してください。")
+
+        self._include_channels = include_channels
+        self._exclude_channels = exclude_channels or []
+        self._since = since
+        self._until = until
+        # window of ts messages are selected by, the end excluded
+        self._start_ts = self._to_timestamp(since, timezone)
+        self._end_ts = self._to_timestamp(
+            until + timedelta(days=1) if until is not None else None, timezone
+        )
+
+    def has_date_window(self) -> bool:
+        """Tells whether messages are selected by dates they were posted on
+
+        Returns:
+            True if since or until was given
+        """
+        return self._since is not None or self._until is not None
+
+    def includes_channel(self, channel: str) -> bool:
+        """Tells whether a channel is selected
+
+        Args:
+            channel: name of channel
+
+        Returns:
+            True if the channel is to be converted
+        """
+        if any(fnmatchcase(channel, pattern) for pattern in self._exclude_channels):
+            return False
+
+        return self._include_channels is None or any(
+            fnmatchcase(channel, pattern) for pattern in self._include_channels
+        )
+
+    def includes_message_file(self, file_name: str) -> bool:
+        """Tells whether a message file may hold messages within the window,
+        from its name alone
+
+        Args:
+            file_name: name of message file, such as 2023-01-01.json
+
+        Returns:
+            False if the file can be left out without being opened
+        """
+        day = parse_day(file_name)
+        if day is None:
+            return True
+
+        return not (
+            (self._since is not None and day + DAY_MARGIN < self._since)
+            or (self._until is not None and day - DAY_MARGIN > self._until)
+        )
+
+    def filters_messages(self, file_name: str) -> bool:
+        """Tells whether messages of a message file have to be selected one by one,
+        as the file may hold messages both within the window and outside it
+
+        Args:
+            file_name: name of message file, such as 2023-01-01.json
+
+        Returns:
+            True if messages have to be passed to includes_message()
+        """
+        if not self.has_date_window():
+            return False
+
+        day = parse_day(file_name)
+        if day is None:
+            return True
+
+        return (self._since is not None and day - DAY_MARGIN < self._since) or (
+            self._until is not None and day + DAY_MARGIN > self._until
+        )
+
+    def includes_message(self, message: ExportFileElement) -> bool:
+        """Tells whether a message was posted within the window
+
+        Args:
+            message: message read from a message file
+
+        Returns:
+            True if the message is to be converted
+        """
+        if "ts" not in message:
+            return True
+
+        ts = float(message["ts"])
+        return (self._start_ts is None or ts >= self._start_ts) and (
+            self._end_ts is None or ts < self._end_ts
+        )
+
+    @staticmethod
+    def _to_timestamp(day: Optional[date], timezone: Optional[tzinfo]) -> Optional[float]:
+        if day is None:
+            return None
+
+        # start of the day, in local time of the machine when timezone is None
+        return datetime.combine(day, time.min, tzinfo=timezone).timestamp()
@@ -1,13 +1,38 @@
 # -*- coding: utf-8 -*-
+import bz2
+import calendar
+import gzip
+import hashlib
+import io
 import json
 import logging
-from csv import DictWriter, QUOTE_ALL
+import lzma
+import os
+import re
+import shutil
+import zipfile
+from csv import DictReader, DictWriter, QUOTE_ALL
 from pathlib import Path
-from typing import Any, Dict, Union
-from urllib.request import urlopen
+from typing import (
+    IO,
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+from urllib.error import HTTPError
+from urllib.request import Request
 
 from .exceptions import ConverterException
-from .types import CSVData, CSVFields, ExportFileContent
+from .http_client import HTTPClient
+from .json_decoder import JSONDecoder, create_projection_hook
+from .types import CSVData, CSVFields, ExportFileContent, ExportFileElement, ExportPath
 
 
 class FileIO:
@@ -26,15 +51,92 @@ class FileIO:
         "doublequote": False,
         "lineterminator": "\n",
     }
+    # codecs csv files may be compressed with, keyed by name, along with the suffix
+    # of compressed files and the range of compression levels with the default one
+    _CSV_CODECS: Dict[str, Tuple[str, range, int]] = {
+        "gzip": (".gz", range(0, 10), 6),
+        "bz2": (".bz2", range(1, 10), 9),
+        "lzma": (".xz", range(0, 10), 6),
+    }
+    # downloads are streamed to disk in pieces of this size
+    _DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    # suffix of the file a download is written to until it completes
+    _PARTIAL_DOWNLOAD_SUFFIX = ".part"
+    # suffix of the file next to a partial file holding the ETag or Last-Modified
+    # of the response it is written from, which a resumed download must match
+    _VALIDATOR_SUFFIX = ".validator"
+    # files are hashed in pieces of this size
+    _HASH_CHUNK_SIZE = 1024 * 1024
+    # json arrays are streamed from files in pieces of at least this many characters
+    _JSON_CHUNK_SIZE = 64 * 1024
+    # json arrays in files up to this size are decoded at once with the json decoder
+    _JSON_STREAMING_THRESHOLD = 16 * 1024 * 1024
+
+    def __init__(
+        self,
+        csv_encoding="utf-8",
+        json_decoder: Optional[JSONDecoder] = None,
+        http_client: Optional[HTTPClient] = None,
+        csv_compression: Optional[str] = None,
+        csv_compression_level: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            csv_encoding: encoding of csv files
+            json_decoder: decoder of json files, the default one when omitted
+            http_client: client attachment files are downloaded with
+            csv_compression: codec csv files are compressed with as they are written,
+                one of _CSV_CODECS, or None to write them uncompressed
+            csv_compression_level: level of compression, default of the codec
+                when omitted
+        """
+        if csv_compression is not None:
+            if csv_compression not in self._CSV_CODECS:
+                codecs = ", ".join(self._CSV_CODECS)
+                raise ConverterException(f"CSVの圧縮形式には {codecs} のいずれかを指定してください。")
+            (_, levels, default_level) = self._CSV_CODECS[csv_compression]
+            if csv_compression_level is None:
+                csv_compression_level = default_level
+            if csv_compression_level not in levels:
+                raise ConverterException(
+                    f"{csv_compression} の圧縮レベルには"
+                    f"{levels.start}から{levels.stop - 1}の値を指定してください。"
+                )
+        elif csv_compression_level is not None:
+            raise ConverterException("圧縮レベルはCSVの圧縮形式と共に指定してください。")
 
-    def __init__(self, csv_encoding="utf-8") -> None:
         self._csv_encoding = csv_encoding
+        self._csv_compression = csv_compression
+        self._csv_compression_level = csv_compression_level
+        self._json_decoder = json_decoder or JSONDecoder()
+        self._http_client = http_client or HTTPClient()
+
+    def get_json_backend(
+        self, projecting: bool = False, file_size: Optional[int] = None
+    ) -> str:
+        """Get name of library json files are decoded with
+
+        Args:
+            projecting: whether files are decoded with keys to project elements onto
+            file_size: size of the file read by iter_json_array(), which decodes files
+                larger than _JSON_STREAMING_THRESHOLD with the standard json module
+
+        Returns:
+            Name of library, such as "orjson", "json (projecting)" when projecting,
+            or "json (streaming)" when the file is parsed as it is read
+        """
+        if file_size is not None and file_size > self._JSON_STREAMING_THRESHOLD:
+            return "json (streaming)"
+
+        return self._json_decoder.get_backend(projecting)
 
-    def read_json(self, file_path: Path) -> Union[Dict[str, Any], ExportFileContent]:
+    def read_json(
+        self, file_path: ExportPath
+    ) -> Union[Dict[str, Any], ExportFileContent]:
         """Reads content of json file and returns its content
 
         Args:
-            file_path: path to the file to read
+            file_path: path to the file to read, which may be a member of a zip archive
 
         Returns:
             An object representation of json file
@@ -42,12 +144,299 @@ class FileIO:
         logging.debug(f"Reading file {str(file_path)}")
 
         try:
-            with file_path.open("r", encoding="utf-8") as fp:
-                return json.load(fp)
+            with self._open_binary(file_path) as fp:
+                return self._json_decoder.loads(fp.read())
+        except json.JSONDecodeError as e:
+            logging.warning(f"Failed to read from file {str(file_path)}")
+            raise ConverterException(str(e))
+
+    def iter_json_array(
+        self, file_path: ExportPath, keys: Optional[AbstractSet[str]] = None
+    ) -> Iterator[ExportFileElement]:
+        """Reads json file holding an array and yields its elements one at a time
+
+        Files larger than _JSON_STREAMING_THRESHOLD are parsed as they are read,
+        holding only the element being parsed in memory along with a bounded buffer,
+        so that memory needed is set by the largest element, not by the whole file.
+        Smaller files are decoded at once with the faster json decoder.
+
+        Args:
+            file_path: path to the file to read, which may be a member of a zip archive
+            keys: keys of objects to keep at any depth, other keys are dropped from
+                each object as soon as it is decoded, so that their values are not
+                held until the whole file is decoded
+
+        Returns:
+            Iterator of elements of the array
+        """
+        logging.debug(f"Reading file {str(file_path)}")
+
+        (size, _) = self.get_file_stat(file_path)
+        try:
+            with self._open_binary(file_path) as fp:
+                if size > self._JSON_STREAMING_THRESHOLD:
+                    yield from _JSONArrayReader(
+                        io.TextIOWrapper(fp, encoding="utf-8"),
+                        self._JSON_CHUNK_SIZE,
+                        create_projection_hook(keys) if keys is not None else None,
+                    )
+                    return
+
+                elements = self._json_decoder.loads(fp.read(), keys)
         except json.JSONDecodeError as e:
             logging.warning(f"Failed to read from file {str(file_path)}")
             raise ConverterException(str(e))
 
+        if not isinstance(elements, list):
+            logging.warning(f"Failed to read from file {str(file_path)}")
+            raise ConverterException(f"{str(file_path)} の内容が配列ではありません")
+        yield from elements
+
+    def write_json(self, file_path: Path, data: Any) -> None:
+        """Writes data to a file in json format
+
+        The file is replaced atomically so that a reader never sees it half written.
+
+        Args:
+            file_path: path of the file to be written to
+            data: object to be serialized
+
+        Returns:
+            None
+        """
+        logging.debug(f"Writing to file {str(file_path)}")
+
+        temporary_file_path = file_path.with_name(file_path.name + ".tmp")
+        try:
+            with temporary_file_path.open("w", encoding="utf-8") as fp:
+                json.dump(data, fp, ensure_ascii=False)
+            temporary_file_path.replace(file_path)
+        except Exception as e:
+            logging.warning(f"Failed to write to file {str(file_path)}")
+            raise ConverterException(str(e))
+
+    def write_bytes(self, file_path: Path, data: bytes) -> None:
+        """Writes bytes to a file as they are
+
+        Args:
+            file_path: path of the file to be written to
+            data: content of the file
+
+        Returns:
+            None
+        """
+        logging.debug(f"Writing to file {str(file_path)}")
+
+        try:
+            file_path.write_bytes(data)
+        except Exception as e:
+            logging.warning(f"Failed to write to file {str(file_path)}")
+            raise ConverterException(str(e))
+
+    def get_file_stat(self, file_path: ExportPath) -> Tuple[int, int]:
+        """Get size and modification time of a file
+
+        Args:
+            file_path: path of the file, which may be a member of a zip archive
+
+        Returns:
+            Size in bytes and modification time in nanoseconds
+        """
+        if isinstance(file_path, zipfile.Path):
+            info = file_path.root.getinfo(file_path.at)
+            return (info.file_size, calendar.timegm(info.date_time) * 1_000_000_000)
+
+        stat = file_path.stat()
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def hash_file(self, file_path: ExportPath) -> str:
+        """Computes hash of file content
+
+        Members of a zip archive are not read at all; the crc32 checksum recorded
+        in the archive is used instead.
+
+        Args:
+            file_path: path of the file, which may be a member of a zip archive
+
+        Returns:
+            Hex digest of hash of the file content
+        """
+        if isinstance(file_path, zipfile.Path):
+            info = file_path.root.getinfo(file_path.at)
+            return f"crc32:{info.CRC:08x}"
+
+        file_hash = hashlib.sha1()
+        with file_path.open("rb") as fp:
+            for chunk in iter(lambda: fp.read(self._HASH_CHUNK_SIZE), b""):
+                file_hash.update(chunk)
+
+        return file_hash.hexdigest()
+
+    def get_csv_suffix(self) -> str:
+        """Get suffix of csv files, which tells how they are compressed
+
+        Returns:
+            ".csv", followed by suffix of the codec when csv files are compressed
+        """
+        if self._csv_compression is None:
+            return ".csv"
+
+        (codec_suffix, _, _) = self._CSV_CODECS[self._csv_compression]
+        return ".csv" + codec_suffix
+
+    def csv_exists(self, file_path: Path) -> bool:
+        """Tells whether a csv file was written to the path
+
+        Args:
+            file_path: path of the csv file
+
+        Returns:
+            True if the file exists
+        """
+        return file_path.exists()
+
+    def csv_read(self, file_path: Path) -> Iterator[Dict[str, str]]:
+        """Reads rows of a csv file written by csv_write()
+
+        Rows are read lazily one at a time, and decompressed as they are read
+        when csv files are compressed.
+
+        Args:
+            file_path: path of the csv file
+
+        Returns:
+            Iterator of row dicts keyed by the fields found on the first row
+        """
+        logging.debug(f"Reading file {str(file_path)}")
+
+        try:
+            with self._open_csv(file_path, "r") as fp:
+                yield from DictReader(fp, **self._CSV_FORMAT)
+        except Exception as e:
+            logging.warning(f"Failed to read from file {str(file_path)}")
+            raise ConverterException(str(e))
+
+    def move(self, source_path: Path, destination_path: Path) -> None:
+        """Moves a file, replacing whatever is at the destination
+
+        Args:
+            source_path: path of file to move
+            destination_path: path to move the file to
+
+        Returns:
+            None
+        """
+        source_path.replace(destination_path)
+
+    def exists(self, file_path: Path) -> bool:
+        """Tells whether a file exists
+
+        Args:
+            file_path: path of the file
+
+        Returns:
+            True if the file exists
+        """
+        return file_path.exists()
+
+    def create_lock(self, lock_path: Path) -> bool:
+        """Creates a lock file unless it already exists, as a single atomic operation
+
+        The lock file holds the id of the process that created it.
+
+        Args:
+            lock_path: path of the lock file
+
+        Returns:
+            True if the lock file was created, False if it already existed
+        """
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with lock_path.open("x") as fp:
+                fp.write(str(os.getpid()))
+                return True
+        except FileExistsError:
+            return False
+
+    def is_lock_abandoned(self, lock_path: Path) -> bool:
+        """Tells whether the process that created a lock file is gone
+
+        Args:
+            lock_path: path of the lock file
+
+        Returns:
+            True if the lock file exists and its process has exited
+        """
+        try:
+            pid = int(lock_path.read_text())
+        except (FileNotFoundError, ValueError):
+            # released, or the process has not written its id yet
+            return False
+
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            # the process exists but belongs to another user
+            return False
+
+        return False
+
+    def link(self, source_path: Path, destination_path: Path, symbolic=False) -> None:
+        """Makes a file available at another path without copying its content
+
+        Whatever is at the destination is replaced.
+        The file is copied instead where the file system does not support links.
+
+        Args:
+            source_path: path of existing file
+            destination_path: path to make the file available at
+            symbolic: makes a symbolic link relative to the destination
+                instead of a hard link
+
+        Returns:
+            None
+        """
+        destination_path.parent.mkdir(parents=True, exist_ok=True)
+        # processes linking to the same destination at once do not collide
+        temporary_path = destination_path.with_name(
+            f"{destination_path.name}.{os.getpid()}.tmp"
+        )
+        self.remove(temporary_path)
+        try:
+            if symbolic:
+                temporary_path.symlink_to(
+                    os.path.relpath(source_path, destination_path.parent)
+                )
+            else:
+                os.link(source_path, temporary_path)
+        except OSError:
+            logging.debug(f"Copying file {str(source_path)} as it cannot be linked")
+            shutil.copyfile(source_path, temporary_path)
+        temporary_path.replace(destination_path)
+
+    def remove(self, file_path: Path) -> None:
+        """Removes a file if it exists
+
+        Args:
+            file_path: path of file to remove
+
+        Returns:
+            None
+        """
+        if file_path.exists() or file_path.is_symlink():
+            logging.debug(f"Removing file {str(file_path)}")
+            file_path.unlink()
+
+    @staticmethod
+    def _open_binary(file_path: ExportPath) -> IO[bytes]:
+        if isinstance(file_path, zipfile.Path):
+            # the member is decompressed as a stream instead of being extracted
+            return file_path.root.open(file_path.at)
+
+        return file_path.open("rb")
+
     def csv_write(
         self,
         file_path: Path,
@@ -57,6 +446,10 @@ class FileIO:
     ) -> None:
         """Writes data to a file in csv format.
 
+        When csv files are compressed, rows are compressed as they are written.
+        Rows appended to a compressed file are compressed separately from those
+        already in it, which readers of the format decompress as a whole.
+
         Args:
             file_path: path of the file to be written to
             fields: column names the csv file should have, placed on the first row
@@ -71,9 +464,7 @@ class FileIO:
 
         write_mode = "w" if append is False else "a"
         try:
-            with file_path.open(
-                write_mode, encoding=self._csv_encoding, newline=""
-            ) as fp:
+            with self._open_csv(file_path, write_mode) as fp:
                 writer = DictWriter(fp, fields, **self._CSV_FORMAT)
 
                 if append is False:
@@ -83,32 +474,260 @@ class FileIO:
             logging.warning(f"Failed to write to file {str(file_path)}")
             raise ConverterException(str(e))
 
-    def download(self, url: str, downloaded_file_path: Path) -> None:
+    def _open_csv(self, file_path: Path, mode: str) -> TextIO:
+        if self._csv_compression == "gzip":
+            return gzip.open(
+                file_path,
+                mode + "t",
+                compresslevel=self._csv_compression_level,
+                encoding=self._csv_encoding,
+                newline="",
+            )
+        if self._csv_compression == "bz2":
+            return bz2.open(
+                file_path,
+                mode + "t",
+                compresslevel=self._csv_compression_level,
+                encoding=self._csv_encoding,
+                newline="",
+            )
+        if self._csv_compression == "lzma":
+            return lzma.open(
+                file_path,
+                mode + "t",
+                # presets are only accepted when compressing
+                preset=self._csv_compression_level if mode != "r" else None,
+                encoding=self._csv_encoding,
+                newline="",
+            )
+
+        return file_path.open(mode, encoding=self._csv_encoding, newline="")
+
+    def download(self, url: str, downloaded_file_path: Path) -> Optional[int]:
         """Download a file from specified url
 
         Skips download if 'downloaded_file_path' already exists.
+        The response is streamed in chunks to a partial file next to
+        'downloaded_file_path', which is renamed once the download completes.
+        When a partial file is left over from an interrupted download,
+        the download is resumed from where it stopped as long as the file on
+        the server is unchanged according to its ETag or Last-Modified.
+        It is started over when the file changed, when the server sends a range
+        other than the one requested, or when the file has neither of them.
+        Connections are kept open by the http client and reused by later downloads.
 
         Args:
             url: Where to download the file from
             downloaded_file_path: The name/location of the downloaded file
 
         Returns:
-            None
+            Number of bytes downloaded, or None when the download was skipped
         """
         if downloaded_file_path.exists():
             logging.debug(
                 f"Skipping download of file {str(downloaded_file_path)} as it already exists"
             )
-            return
+            return None
 
         logging.debug(f"Downloading from {url} as {str(downloaded_file_path)}")
 
+        partial_file_path = downloaded_file_path.with_name(
+            downloaded_file_path.name + self._PARTIAL_DOWNLOAD_SUFFIX
+        )
+        validator_file_path = partial_file_path.with_name(
+            partial_file_path.name + self._VALIDATOR_SUFFIX
+        )
+        validator = (
+            validator_file_path.read_text() if validator_file_path.exists() else None
+        )
+        resume_from = (
+            partial_file_path.stat().st_size
+            if partial_file_path.exists() and validator
+            else 0
+        )
+
+        request = Request(url)
+        if resume_from > 0:
+            logging.debug(f"Resuming download of {url} from byte {resume_from}")
+            request.add_header("Range", f"bytes={resume_from}-")
+            # the whole file is sent instead when it changed since
+            request.add_header("If-Range", validator)
+
         try:
-            with urlopen(url) as f:
-                data = f.read()
+            with self._http_client.open(request) as response:
+                range_mismatched = (
+                    response.status == 206
+                    and resume_from > 0
+                    and self._get_range_start(response) != resume_from
+                )
+                if not range_mismatched:
+                    if response.status != 206:
+                        self._save_validator(response, validator_file_path)
+                    # servers that ignore the range request send the whole file again
+                    write_mode = "ab" if response.status == 206 else "wb"
+                    downloaded_size = self._stream_to_file(
+                        response, partial_file_path, write_mode
+                    )
+
+            if range_mismatched:
+                # appending a range other than the one requested would corrupt the file
+                logging.debug(f"Restarting download of {url} as another range was sent")
+                self._remove_partial_download(partial_file_path, validator_file_path)
+                return self.download(url, downloaded_file_path)
+
+            partial_file_path.replace(downloaded_file_path)
+            self.remove(validator_file_path)
+
+            return downloaded_size
+        except HTTPError as e:
+            if e.code == 416 and resume_from > 0:
+                # the partial file does not match the file on the server anymore
+                self._remove_partial_download(partial_file_path, validator_file_path)
+                return self.download(url, downloaded_file_path)
 
-            with downloaded_file_path.open("wb") as f:
-                f.write(data)
+            logging.warning(f"Failed to download from {url}")
+            raise ConverterException(str(e))
         except Exception as e:
             logging.warning(f"Failed to download from {url}")
             raise ConverterException(str(e))
+
+    def _save_validator(self, response: Any, validator_file_path: Path) -> None:
+        # weak ETags cannot be sent in If-Range, Last-Modified is used instead
+        etag = response.headers.get("ETag")
+        validator = (
+            etag
+            if etag and not etag.startswith("W/")
+            else response.headers.get("Last-Modified")
+        )
+        if validator:
+            validator_file_path.write_text(validator)
+        else:
+            # a download of a file with neither is started over when interrupted
+            self.remove(validator_file_path)
+
+    def _remove_partial_download(
+        self, partial_file_path: Path, validator_file_path: Path
+    ) -> None:
+        self.remove(partial_file_path)
+        self.remove(validator_file_path)
+
+    @staticmethod
+    def _get_range_start(response: Any) -> Optional[int]:
+        # Content-Range of a partial response, such as "bytes 100-199/200"
+        match = re.match(r"bytes (\d+)-", response.headers.get("Content-Range") or "")
+        return int(match.group(1)) if match else None
+
+    def _stream_to_file(self, response: Any, file_path: Path, write_mode: str) -> int:
+        written_size = 0
+        with file_path.open(write_mode) as f:
+            while True:
+                chunk = response.read(self._DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                f.write(chunk)
+                written_size += len(chunk)
+
+        return written_size
+
+
+class _JSONArrayReader:
+    """
+    Parses elements of a json array from a text stream one at a time,
+    reading the stream in chunks as elements are consumed.
+    """
+
+    _WHITESPACE = re.compile(r"[ \t\n\r]*")
+    # whitespace and separator following an element, along with whitespace after it
+    _SEPARATOR = re.compile(r"[ \t\n\r]*(?:([,\]])[ \t\n\r]*)?")
+    # characters that may still continue a number up to the end of the buffer
+    _NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+    def __init__(
+        self,
+        stream: TextIO,
+        chunk_size: int,
+        object_pairs_hook: Optional[Callable[[List[Tuple[str, Any]]], Any]] = None,
+    ) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._scan_once = json.JSONDecoder(object_pairs_hook=object_pairs_hook).scan_once
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            self._expect_end()
+            return
+
+        scan_once = self._scan_once
+        match_separator = self._SEPARATOR.match
+        match_number_tail = self._NUMBER_TAIL.match
+        while True:
+            buffer = self._buffer
+            try:
+                (element, end) = scan_once(buffer, self._pos)
+            except (StopIteration, json.JSONDecodeError):
+                # whitespace before the element may have been left unskipped
+                # at the start of a chunk, or element may continue in the next one
+                pos = self._pos
+                if self._peek() and self._pos != pos:
+                    continue
+                if self._eof:
+                    self._fail("要素を読み込めません")
+                self._read_more()
+                continue
+
+            separator = match_separator(buffer, end)
+            if separator.group(1) is None:
+                # separator may be in the next chunk, and a number cut at the end
+                # of the buffer, such as "12." of "12.5", is parsed again once
+                # the rest of it is read
+                if self._eof or not (
+                    separator.end() == len(buffer) or match_number_tail(buffer, end)
+                ):
+                    self._pos = separator.end()
+                    self._fail("',' または ']' がありません")
+                self._read_more()
+                continue
+
+            self._pos = separator.end()
+            yield element
+
+            if separator.group(1) == "]":
+                break
+
+        self._expect_end()
+
+    def _peek(self) -> str:
+        # skips whitespace and returns the next character, empty at the end
+        while True:
+            self._pos = self._WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or self._eof:
+                return self._buffer[self._pos : self._pos + 1]
+            self._read_more()
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            self._fail(f"'{char}' がありません")
+        self._pos += 1
+
+    def _expect_end(self) -> None:
+        if self._peek():
+            self._fail("配列の後に余分なデータがあります")
+
+    def _read_more(self) -> None:
+        # consumed part of the buffer is dropped, and at least as much as is left
+        # unconsumed is read so that retries of a large element stay linear
+        remaining = self._buffer[self._pos :]
+        chunk = self._stream.read(max(self._chunk_size, len(remaining)))
+        if not chunk:
+            self._eof = True
+        self._buffer = remaining + chunk
+        self._pos = 0
+
+    def _fail(self, reason: str) -> None:
+        raise json.JSONDecodeError(reason, self._buffer, self._pos)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+import base64
+import io
+import ssl
+import threading
+from collections import defaultdict
+from http.client import HTTPConnection, HTTPResponse, HTTPSConnection
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import Request, getproxies, proxy_bypass
+
+# scheme, host and port requests are sent to
+Origin = Tuple[str, str, int]
+
+
+class HTTPClient:
+    """
+    Sends GET requests over persistent connections, which are kept open after each
+    request and reused by later requests to the same host.
+    Can be shared among threads, each request taking a connection out of the pool
+    for as long as its response is being read.
+
+    Responses behave like those of urllib.request.urlopen: redirects are followed,
+    HTTPError is raised for responses that are not successful, and proxies are
+    taken from environment variables, along with credentials in their urls.
+    """
+
+    _REDIRECT_CODES = {301, 302, 303, 307, 308}
+    _MAX_REDIRECTS = 10
+    _DEFAULT_PORTS = {"http": 80, "https": 443}
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        timeout: float = 60.0,
+        max_idle_connections: int = 16,
+        cafile: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            token: sent as bearer token to the host of each requested url,
+                but not to hosts requests are redirected to
+            timeout: seconds to wait for connecting and for each read
+            max_idle_connections: number of connections kept open for each host
+            cafile: certificates to verify servers with, instead of those of the system
+        """
+        self._token = token
+        self._timeout = timeout
+        self._max_idle_connections = max_idle_connections
+        self._cafile = cafile
+        # loading certificates takes a while, so it is put off until it is needed
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self._proxies = getproxies()
+        self._idle_connections: Dict[Origin, List[HTTPConnection]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._opened_connections = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "token": self._token,
+            "timeout": self._timeout,
+            "max_idle_connections": self._max_idle_connections,
+            "cafile": self._cafile,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def get_opened_connections(self) -> int:
+        """Get number of connections opened so far
+
+        Returns:
+            Number of connections
+        """
+        return self._opened_connections
+
+    def open(self, request: Request) -> "PooledResponse":
+        """Sends GET request and receives headers of the response
+
+        The connection is returned to the pool when the response is closed after
+        its body has been read to the end, and closed otherwise.
+
+        Args:
+            request: url and headers to send
+
+        Returns:
+            Response whose body is yet to be read
+        """
+        url = request.full_url
+        origin = self._get_origin(url)
+        for _ in range(self._MAX_REDIRECTS + 1):
+            headers = dict(request.header_items())
+            if self._token is not None and self._get_origin(url) == origin:
+                headers["Authorization"] = f"Bearer {self._token}"
+
+            (connection, response) = self._send(url, headers)
+            pooled_response = PooledResponse(
+                self, self._get_origin(url), connection, response
+            )
+
+            location = response.getheader("Location")
+            if response.status in self._REDIRECT_CODES and location:
+                pooled_response.discard()
+                url = urljoin(url, location)
+                continue
+
+            if not 200 <= response.status < 300:
+                body = pooled_response.discard()
+                raise HTTPError(
+                    url, response.status, response.reason, response.headers, body
+                )
+
+            return pooled_response
+
+        raise HTTPError(
+            url, response.status, "Too many redirects", response.headers, None
+        )
+
+    def close(self) -> None:
+        """Closes connections kept open for reuse
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for connections in self._idle_connections.values():
+                for connection in connections:
+                    connection.close()
+            self._idle_connections.clear()
+
+    def _send(
+        self, url: str, headers: Dict[str, str]
+    ) -> Tuple[HTTPConnection, HTTPResponse]:
+        origin = self._get_origin(url)
+        parts = urlsplit(url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        if origin[0] == "http" and self._get_proxy(origin) is not None:
+            # plain http requests are sent to proxies with the whole url
+            target = url
+            headers = {**headers, **self._get_proxy_headers(origin)}
+        while True:
+            (connection, reused) = self._acquire(origin)
+            try:
+                connection.request("GET", target, headers=headers)
+                return (connection, connection.getresponse())
+            except ConnectionError:
+                connection.close()
+                # the server may have closed the connection while it was idle
+                if not reused:
+                    raise
+            except Exception:
+                connection.close()
+                raise
+
+    def _acquire(self, origin: Origin) -> Tuple[HTTPConnection, bool]:
+        with self._lock:
+            idle_connections = self._idle_connections[origin]
+            if idle_connections:
+                return (idle_connections.pop(), True)
+            self._opened_connections += 1
+
+        return (self._connect(origin), False)
+
+    def _release(self, origin: Origin, connection: HTTPConnection) -> None:
+        with self._lock:
+            idle_connections = self._idle_connections[origin]
+            if len(idle_connections) < self._max_idle_connections:
+                idle_connections.append(connection)
+                return
+
+        connection.close()
+
+    def _connect(self, origin: Origin) -> HTTPConnection:
+        (scheme, host, port) = origin
+        proxy = self._get_proxy(origin)
+        (_, connect_host, connect_port) = proxy or origin
+        if scheme == "http":
+            return HTTPConnection(connect_host, connect_port, timeout=self._timeout)
+
+        with self._lock:
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context(cafile=self._cafile)
+        connection = HTTPSConnection(
+            connect_host, connect_port, timeout=self._timeout, context=self._ssl_context
+        )
+        if proxy is not None:
+            connection.set_tunnel(host, port, headers=self._get_proxy_headers(origin))
+        return connection
+
+    def _get_proxy(self, origin: Origin) -> Optional[Origin]:
+        proxy_url = self._get_proxy_url(origin)
+        if proxy_url is None:
+            return None
+
+        return self._get_origin(proxy_url)
+
+    def _get_proxy_headers(self, origin: Origin) -> Dict[str, str]:
+        proxy_url = self._get_proxy_url(origin)
+        if proxy_url is None:
+            return {}
+
+        parts = urlsplit(proxy_url)
+        if parts.username is None:
+            return {}
+
+        # credentials are percent-encoded in urls, as urllib.request expects
+        credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+        token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+        return {"Proxy-Authorization": f"Basic {token}"}
+
+    def _get_proxy_url(self, origin: Origin) -> Optional[str]:
+        (scheme, host, _) = origin
+        proxy_url = self._proxies.get(scheme)
+        if proxy_url is None or proxy_bypass(host):
+            return None
+
+        return proxy_url
+
+    def _get_origin(self, url: str) -> Origin:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in self._DEFAULT_PORTS or not parts.hostname:
+            raise ValueError(f"unsupported url: {url}")
+
+        return (scheme, parts.hostname, parts.port or self._DEFAULT_PORTS[scheme])
+
+
+class PooledResponse:
+    """
+    Response of HTTPClient, holding on to the connection it is read from.
+    """
+
+    def __init__(
+        self,
+        client: HTTPClient,
+        origin: Origin,
+        connection: HTTPConnection,
+        response: HTTPResponse,
+    ) -> None:
+        self._client = client
+        self._origin = origin
+        self._connection: Optional[HTTPConnection] = connection
+        self._response = response
+        self.status = response.status
+        self.headers = response.headers
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def read(self, size: Optional[int] = None) -> bytes:
+        return self._response.read(size)
+
+    def discard(self) -> io.BytesIO:
+        """Reads the rest of body so that the connection can be reused, and closes
+
+        Returns:
+            Rest of body
+        """
+        try:
+            body = io.BytesIO(self._response.read())
+        finally:
+            self.close()
+
+        return body
+
+    def close(self) -> None:
+        connection = self._connection
+        if connection is None:
+            return
+        self._connection = None
+
+        if self._response.isclosed() and not self._response.will_close:
+            self._client._release(self._origin, connection)
+        else:
+            self._response.close()
+            connection.close()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import json
+from typing import AbstractSet, Any, Callable, Dict, List, Optional, Tuple
+
+from .exceptions import ConverterException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# functions decoding json from raw bytes, keyed by name of backend
+_BACKENDS: Dict[str, Callable[[bytes], Any]] = {"json": json.loads}
+if orjson is not None:
+    _BACKENDS["orjson"] = orjson.loads
+
+# backends in order of preference
+_PREFERRED_BACKENDS = ["orjson", "json"]
+
+
+class JSONDecoder:
+    """
+    Decodes json from raw bytes with the fastest library available.
+    orjson is used when it is installed, and the standard json module otherwise.
+    """
+
+    def __init__(self, backend: Optional[str] = None) -> None:
+        """
+        Args:
+            backend: name of backend to use, "orjson" or "json",
+                the fastest available one is picked when omitted
+        """
+        if backend is None:
+            backend = get_available_backends()[0]
+        if backend not in _BACKENDS:
+            raise ConverterException(f"JSONデコーダ {backend} は利用できません")
+
+        self._backend = backend
+        self._loads = _BACKENDS[backend]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"backend": self._backend}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["backend"])
+
+    def get_backend(self, projecting: bool = False) -> str:
+        """Get name of backend in use
+
+        Args:
+            projecting: whether objects are projected onto keys while being decoded
+
+        Returns:
+            Name of backend, such as "orjson", or "json (projecting)" when projecting
+            as projecting is done with the standard json module
+        """
+        if projecting:
+            return "json (projecting)"
+
+        return self._backend
+
+    def loads(self, data: bytes, keys: Optional[AbstractSet[str]] = None) -> Any:
+        """Decodes json
+
+        When keys are given, each object is projected onto them as soon as it is
+        decoded, so that values of other keys are let go of before the rest of the
+        json is decoded. This is done with the standard json module regardless of
+        the backend, as orjson has no hook called on each object.
+
+        Args:
+            data: utf-8 encoded json
+            keys: keys of objects to keep at any depth, all keys are kept when omitted
+
+        Returns:
+            An object representation of json
+        """
+        if keys is not None:
+            return json.loads(data, object_pairs_hook=create_projection_hook(keys))
+
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+        return self._loads(data)
+
+
+def get_available_backends() -> List[str]:
+    """Get names of json backends that can be used
+
+    Returns:
+        Names of backends in order of preference
+    """
+    return [name for name in _PREFERRED_BACKENDS if name in _BACKENDS]
+
+
+def create_projection_hook(
+    keys: AbstractSet[str],
+) -> Callable[[List[Tuple[str, Any]]], Dict[str, Any]]:
+    """Creates object_pairs_hook of json module that only keeps the given keys
+
+    Args:
+        keys: keys of objects to keep at any depth
+
+    Returns:
+        Function building an object from its key value pairs
+    """
+
+    def project(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        return {key: value for (key, value) in pairs if key in keys}
+
+    return project
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .file_io import FileIO
+from .types import CSVFields, ExportPath
+
+# manifest entries of a channel keyed by name of message file
+ManifestEntries = Dict[str, Dict[str, Any]]
+
+
+class Manifest:
+    """
+    Record of message files that were already converted, and of the rows they
+    produced in the csv files of their channel.
+    Lets a re-run of the conversion tell which message files are new or changed
+    since the last run.
+    """
+
+    _VERSION = 1
+
+    def __init__(self, message_fields: CSVFields, attachment_fields: CSVFields) -> None:
+        self._message_fields = message_fields
+        self._attachment_fields = attachment_fields
+        self._channels: Dict[str, ManifestEntries] = {}
+
+    @classmethod
+    def load(
+        cls,
+        file_io: FileIO,
+        manifest_file: Path,
+        message_fields: CSVFields,
+        attachment_fields: CSVFields,
+    ) -> "Manifest":
+        """Loads manifest saved by a previous run
+
+        The saved manifest is discarded when it was made by an incompatible version
+        or for csv files with different fields.
+
+        Args:
+            file_io: used to read the manifest file
+            manifest_file: path to the manifest file
+            message_fields: fields of the messages csv files
+            attachment_fields: fields of the attachments csv files
+
+        Returns:
+            Loaded manifest, or an empty one when there is nothing usable to load
+        """
+        manifest = cls(message_fields, attachment_fields)
+        if not manifest_file.exists():
+            return manifest
+
+        data = file_io.read_json(manifest_file)
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != cls._VERSION
+            or data.get("message_fields") != message_fields
+            or data.get("attachment_fields") != attachment_fields
+        ):
+            logging.info("以前の変換記録が利用できないため、全てのファイルを変換します")
+            return manifest
+
+        manifest._channels = data["channels"]
+        return manifest
+
+    def save(self, file_io: FileIO, manifest_file: Path) -> None:
+        """Saves manifest so that it can be loaded by a subsequent run
+
+        Args:
+            file_io: used to write the manifest file
+            manifest_file: path to the manifest file
+
+        Returns:
+            None
+        """
+        file_io.write_json(
+            manifest_file,
+            {
+                "version": self._VERSION,
+                "message_fields": self._message_fields,
+                "attachment_fields": self._attachment_fields,
+                "channels": self._channels,
+            },
+        )
+
+    def get_channel(self, channel: str) -> ManifestEntries:
+        """Get entries of message files recorded for a channel
+
+        Args:
+            channel: name of channel
+
+        Returns:
+            Entries keyed by name of message file, in the order they were converted
+        """
+        return self._channels.get(channel, {})
+
+    def set_channel(self, channel: str, entries: ManifestEntries) -> None:
+        """Replaces entries of message files recorded for a channel
+
+        Args:
+            channel: name of channel
+            entries: entries keyed by name of message file
+
+        Returns:
+            None
+        """
+        self._channels[channel] = entries
+
+    def remove_channels_except(self, channels: List[str]) -> None:
+        """Forgets channels that are no longer part of the export
+
+        Args:
+            channels: channels to keep
+
+        Returns:
+            None
+        """
+        kept_channels = set(channels)
+        self._channels = {
+            channel: entries
+            for (channel, entries) in self._channels.items()
+            if channel in kept_channels
+        }
+
+    @staticmethod
+    def find_changes(
+        file_io: FileIO, message_files: List[ExportPath], entries: ManifestEntries
+    ) -> Tuple[ManifestEntries, List[ExportPath]]:
+        """Compares message files against their recorded entries
+
+        Files are hashed only when their size or modification time differs
+        from what is recorded.
+
+        Args:
+            file_io: used to inspect message files
+            message_files: current message files of a channel
+            entries: entries recorded for the channel
+
+        Returns:
+            Entries for the current message files, with row counts left out for
+            files that have to be converted, and the list of those files
+        """
+        new_entries = {}
+        changed_files = []
+
+        for message_file in message_files:
+            (size, mtime) = file_io.get_file_stat(message_file)
+            entry = entries.get(message_file.name)
+
+            if entry is not None and entry["size"] == size and entry["mtime"] == mtime:
+                new_entries[message_file.name] = entry
+                continue
+
+            file_hash = file_io.hash_file(message_file)
+            if entry is not None and entry["hash"] == file_hash:
+                new_entries[message_file.name] = {**entry, "size": size, "mtime": mtime}
+                continue
+
+            new_entries[message_file.name] = {
+                "size": size,
+                "mtime": mtime,
+                "hash": file_hash,
+            }
+            changed_files.append(message_file)
+
+        return (new_entries, changed_files)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import re
+from typing import Dict, Match, Union
+
+from .user_index import UserIndex
+
+
+class MarkupRewriter:
+    """
+    Rewrites markup of slack message text into plain text, in a single scan.
+
+    Markup is rewritten as follows, and newlines are escaped along the way:
+        <@U0123>            -> @real name of the user
+        <#C0123|general>    -> #general
+        <!here>             -> @here
+        <!subteam^S0|@devs> -> @devs
+        &amp; &lt; &gt;     -> & < >
+
+    Links such as <https://example.com|example> are left as they are.
+    """
+
+    # markup this class rewrites, and newlines
+    _TOKEN = re.compile(r"\n|<([@#!])([^<>|]*)(?:\|([^<>]*))?>|&(?:amp|lt|gt);")
+    # tokens that are always rewritten the same way
+    _LITERALS = {"\n": "\\n", "&amp;": "&", "&lt;": "<", "&gt;": ">"}
+    # special mentions written as <!name>
+    _SPECIAL_MENTIONS = frozenset(["here", "channel", "everyone"])
+
+    def __init__(
+        self, users: Union[Dict[str, str], UserIndex], unknown_user: str = "Not available"
+    ) -> None:
+        """
+        Args:
+            users: maps ids of users to their real names
+            unknown_user: name of users that are not in users
+        """
+        self._users = users
+        self._unknown_user = unknown_user
+
+    def rewrite(self, text: str) -> str:
+        """Rewrites markup in text into plain text and escapes newlines
+
+        Args:
+            text: text of slack message
+
+        Returns:
+            Rewritten text
+        """
+        # most messages have no markup at all
+        if "<" not in text and "&" not in text and "\n" not in text:
+            return text
+
+        return self._TOKEN.sub(self._rewrite_token, text)
+
+    def _rewrite_token(self, match: Match) -> str:
+        (sigil, target, label) = match.groups()
+        if sigil == "@":
+            return "@" + self._users.get(target, label or self._unknown_user)
+        if sigil is None:
+            return self._LITERALS[match[0]]
+        if sigil == "#":
+            return f"#{label or target}"
+        if target in self._SPECIAL_MENTIONS or not label:
+            return f"@{target}"
+        return label
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import PurePath
+from typing import Optional
+
+# message files of a channel are named after the day their messages were posted on,
+# such as 2023-01-01.json, in a timezone the export does not tell.
+# days a message file may be apart from dates its messages were posted on in
+# another timezone, as timezones are less than a day apart from one another
+DAY_MARGIN = timedelta(days=1)
+
+
+def parse_day(file_name: str) -> Optional[date]:
+    """Get the day a message file is named after
+
+    Args:
+        file_name: name of message file, such as 2023-01-01.json
+
+    Returns:
+        Day of the file, None when the file is not named after a day
+    """
+    try:
+        return date.fromisoformat(PurePath(file_name).stem)
+    except ValueError:
+        return None
+
+
+def get_earliest_ts(file_name: str) -> Optional[float]:
+    """Get the earliest ts messages of a message file may have been posted at,
+    whichever timezone days of the export were split in
+
+    Args:
+        file_name: name of message file, such as 2023-01-01.json
+
+    Returns:
+        Timestamp in seconds, None when the file is not named after a day
+    """
+    day = parse_day(file_name)
+    if day is None:
+        return None
+
+    start = datetime.combine(day - DAY_MARGIN, time.min, tzinfo=timezone.utc)
+    return start.timestamp()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_left
+from heapq import merge
+from typing import List, Optional, Tuple
+
+from .message_file_days import get_earliest_ts
+from .types import ExportFileElement
+
+# messages of a file and their ts, both sorted by ts
+_Run = Tuple[List[float], List[ExportFileElement]]
+
+
+class MessageMerger:
+    """
+    Merges messages of message files of a channel into the order of their ts.
+
+    Files are added in the order of days they are named after.
+    Messages of a file are sorted on their own, and are held only until no file
+    left to be added may hold messages earlier than them.
+    As a file holds messages of its day in a timezone the export does not tell,
+    that is until files of days more than a day after theirs are added,
+    which keeps messages of a couple of files held at most.
+    Messages held are merged with a heap only when files overlap one another.
+    """
+
+    def __init__(self) -> None:
+        self._runs: List[_Run] = []
+
+    def add(self, messages: List[ExportFileElement]) -> None:
+        """Add messages of a message file
+
+        Args:
+            messages: messages read from the file
+        """
+        keys = [self._get_ts(message) for message in messages]
+        if any(key > next_key for (key, next_key) in zip(keys, keys[1:])):
+            # sorting indexes keeps messages of the same ts in the order of the file
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            keys = [keys[i] for i in order]
+            messages = [messages[i] for i in order]
+
+        if messages:
+            self._runs.append((keys, messages))
+
+    def pop_ready(self, next_file_name: Optional[str] = None) -> List[ExportFileElement]:
+        """Take messages no file left to be added may precede
+
+        Args:
+            next_file_name: name of the file to be added next, every message
+                held is taken when omitted
+
+        Returns:
+            Messages in the order of their ts
+        """
+        bound = get_earliest_ts(next_file_name) if next_file_name is not None else None
+        if next_file_name is not None and bound is None:
+            # files not named after days may hold messages of any time
+            return []
+
+        ready: List[_Run] = []
+        held: List[_Run] = []
+        for (keys, messages) in self._runs:
+            cut = len(keys) if bound is None else bisect_left(keys, bound)
+            if cut > 0:
+                ready.append((keys[:cut], messages[:cut]))
+            if cut < len(keys):
+                held.append((keys[cut:], messages[cut:]))
+        self._runs = held
+
+        return self._merge(ready)
+
+    @staticmethod
+    def _merge(runs: List[_Run]) -> List[ExportFileElement]:
+        overlapping = any(
+            keys[0] < previous_keys[-1]
+            for ((previous_keys, _), (keys, _)) in zip(runs, runs[1:])
+        )
+        if not overlapping:
+            return [message for (_, messages) in runs for message in messages]
+
+        # index of run breaks ties, keeping messages of earlier files first
+        merged = merge(
+            *(
+                zip(keys, [index] * len(keys), messages)
+                for (index, (keys, messages)) in enumerate(runs)
+            ),
+            key=lambda entry: entry[:2],
+        )
+        return [message for (_, _, message) in merged]
+
+    @staticmethod
+    def _get_ts(message: ExportFileElement) -> float:
+        # elements without ts are not messages, and are kept at the start
+        return float(message["ts"]) if "ts" in message else float("-inf")
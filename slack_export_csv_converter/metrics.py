@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from .downloader import DownloadResult
+
+
+@dataclass
+class ConversionMetrics:
+    """
+    Measurements of converting one or more channels.
+    Measurements of channels add up to those of a whole conversion with +.
+    """
+
+    files_read: int = 0
+    bytes_read: int = 0
+    decode_seconds: float = 0.0
+    generate_seconds: float = 0.0
+    write_seconds: float = 0.0
+    rows_written: int = 0
+    # seconds taken to decode each message file and generate rows from it
+    file_latencies: List[float] = field(default_factory=list)
+    # number of message files decoded with each json library
+    json_backends: Dict[str, int] = field(default_factory=dict)
+    downloads: DownloadResult = field(default_factory=DownloadResult)
+
+    def __add__(self, other: "ConversionMetrics") -> "ConversionMetrics":
+        return ConversionMetrics(
+            files_read=self.files_read + other.files_read,
+            bytes_read=self.bytes_read + other.bytes_read,
+            decode_seconds=self.decode_seconds + other.decode_seconds,
+            generate_seconds=self.generate_seconds + other.generate_seconds,
+            write_seconds=self.write_seconds + other.write_seconds,
+            rows_written=self.rows_written + other.rows_written,
+            file_latencies=self.file_latencies + other.file_latencies,
+            json_backends=dict(
+                Counter(self.json_backends) + Counter(other.json_backends)
+            ),
+            downloads=self.downloads + other.downloads,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get measurements in a form that can be serialized to json
+
+        Latencies are summarized into percentiles.
+
+        Returns:
+            Measurements keyed by their names
+        """
+        return {
+            "files_read": self.files_read,
+            "bytes_read": self.bytes_read,
+            "decode_seconds": self.decode_seconds,
+            "generate_seconds": self.generate_seconds,
+            "write_seconds": self.write_seconds,
+            "rows_written": self.rows_written,
+            "file_latency_seconds": summarize_latencies(self.file_latencies),
+            "json_backends": dict(sorted(self.json_backends.items())),
+            "downloads": {
+                "downloaded": self.downloads.downloaded,
+                "skipped": self.downloads.skipped,
+                "failed": self.downloads.failed,
+                "bytes": self.downloads.downloaded_bytes,
+                "latency_seconds": summarize_latencies(self.downloads.latencies),
+            },
+            "failures": self.downloads.failed,
+        }
+
+
+@dataclass
+class ConversionReport:
+    """
+    Measurements of a conversion, as returned by Converter.run().
+    """
+
+    # library message files are decoded with, other than files too large
+    # to be decoded at once which are counted in json_backends of each channel
+    json_backend: str
+    elapsed_seconds: float = 0.0
+    channels: Dict[str, ConversionMetrics] = field(default_factory=dict)
+    failed_channels: List[str] = field(default_factory=list)
+
+    def get_total(self) -> ConversionMetrics:
+        """Get measurements of all channels added up
+
+        Returns:
+            Measurements of the whole conversion
+        """
+        return sum(self.channels.values(), ConversionMetrics())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get report in a form that can be serialized to json
+
+        Returns:
+            Report with measurements in total and of each channel
+        """
+        return {
+            "json_backend": self.json_backend,
+            "elapsed_seconds": self.elapsed_seconds,
+            "total": self.get_total().to_dict(),
+            "channels": {
+                channel: metrics.to_dict()
+                for (channel, metrics) in sorted(self.channels.items())
+            },
+            "failed_channels": self.failed_channels,
+        }
+
+
+# percentiles latencies are summarized into
+_PERCENTILES = [50, 90, 99]
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """Summarizes latencies into percentiles and the maximum
+
+    Percentiles are those of the nearest rank.
+
+    Args:
+        latencies: latencies in seconds, in any order
+
+    Returns:
+        Latency of each percentile keyed like "p50", along with "max",
+        or an empty dict when there are no latencies
+    """
+    if not latencies:
+        return {}
+
+    ordered = sorted(latencies)
+    summary = {
+        f"p{percentile}": ordered[math.ceil(len(ordered) * percentile / 100) - 1]
+        for percentile in _PERCENTILES
+    }
+    summary["max"] = ordered[-1]
+
+    return summary
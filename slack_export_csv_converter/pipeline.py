@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List
+
+# passed down the queues after the last item
+_END = object()
+
+
+class Pipeline:
+    """
+    Passes items through a series of stages that run concurrently, each in a thread
+    of its own, so that a stage waiting on I/O overlaps with work of the others.
+
+    Stages are connected by bounded queues, which hold back a stage that runs ahead
+    of the next one once the queue in between is full.
+    When a stage raises, the other stages stop and the exception is raised by run().
+    """
+
+    # seconds between checks of whether another stage failed, while blocked on a queue
+    _POLL_INTERVAL = 0.1
+
+    def __init__(self, *stages: Callable[[Any], Any], queue_size: int = 2) -> None:
+        """
+        Args:
+            stages: functions each item is passed through in order,
+                the value returned by one stage is passed to the next
+            queue_size: number of items that may wait between two stages
+        """
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+
+        self._stages = stages
+        self._queue_size = queue_size
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """Passes items through the stages
+
+        The last stage runs in the calling thread.
+
+        Args:
+            items: items to pass to the first stage
+
+        Returns:
+            Values returned by the last stage, in the order of items
+        """
+        failed = threading.Event()
+        errors: List[BaseException] = []
+        threads = []
+
+        inputs: Iterator[Any] = iter(items)
+        for stage in self._stages[:-1]:
+            outputs: queue.Queue = queue.Queue(maxsize=self._queue_size)
+            thread = threading.Thread(
+                target=self._run_stage,
+                args=(stage, inputs, outputs, failed, errors),
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+            inputs = self._iter_queue(outputs, failed)
+
+        results = []
+        try:
+            for item in inputs:
+                results.append(self._stages[-1](item))
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+        return results
+
+    def _run_stage(
+        self,
+        stage: Callable[[Any], Any],
+        inputs: Iterator[Any],
+        outputs: queue.Queue,
+        failed: threading.Event,
+        errors: List[BaseException],
+    ) -> None:
+        try:
+            for item in inputs:
+                if not self._put(outputs, stage(item), failed):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+        finally:
+            self._put(outputs, _END, failed)
+
+    def _put(self, outputs: queue.Queue, item: Any, failed: threading.Event) -> bool:
+        while not failed.is_set():
+            try:
+                outputs.put(item, timeout=self._POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def _iter_queue(self, inputs: queue.Queue, failed: threading.Event) -> Iterator[Any]:
+        while True:
+            try:
+                item = inputs.get(timeout=self._POLL_INTERVAL)
+            except queue.Empty:
+                if failed.is_set():
+                    return
+                continue
+
+            if item is _END:
+                return
+            yield item
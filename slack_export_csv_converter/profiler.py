@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+from .file_io import FileIO
+
+
+@dataclass
+class ProfileResult:
+    """
+    Statistics collected by Profiler.collect().
+    Passed back to the main process when channels are converted in worker processes.
+    """
+
+    # raw statistics of cProfile, keyed by name of stage
+    stats: Dict[str, Dict[Any, Any]] = field(default_factory=dict)
+    # peak bytes traced by tracemalloc while converting each channel
+    memory_peaks: Dict[str, int] = field(default_factory=dict)
+
+
+class Profiler:
+    """
+    Profiles stages of conversion with cProfile, keeping separate statistics
+    for each stage, and optionally traces peak memory of each channel with tracemalloc.
+
+    A single stage is profiled at a time, so stages running in threads of their own
+    wait for one another while profiled.
+    A stage entered while another is being profiled, such as decoding of message files
+    consumed while rows are generated, is left out of the statistics of the other.
+    Only the thread that enters a stage is profiled.
+    """
+
+    STAGES = ["decode", "generate", "write", "download"]
+    # number of functions listed for each stage in the summary
+    _SUMMARY_FUNCTIONS = 20
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        """
+        Args:
+            trace_memory: whether to trace peak memory of each channel
+        """
+        self._trace_memory = trace_memory
+        self._lock = threading.RLock()
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        # profiles of stages entered, the innermost one last
+        self._active_profiles: List[cProfile.Profile] = []
+        self._memory_peaks: Dict[str, int] = {}
+        self._collected_stats: Dict[str, pstats.Stats] = {}
+        self._collected_memory_peaks: Dict[str, int] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"trace_memory": self._trace_memory}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Profiles code run within the context as part of a stage
+
+        Args:
+            name: name of the stage, one of STAGES
+
+        Returns:
+            Context manager
+        """
+        self._enter_stage(name)
+        try:
+            yield
+        finally:
+            self._exit_stage()
+
+    def iterate(self, name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        """Profiles producing each item of an iterable as part of a stage
+
+        Args:
+            name: name of the stage, one of STAGES
+            iterable: items of which are produced lazily, such as by a generator
+
+        Returns:
+            Iterator of the items
+        """
+        iterator = iter(iterable)
+        while True:
+            # entered without a context manager, which would show up in the statistics
+            # of the stage items are consumed in for every item
+            self._enter_stage(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit_stage()
+            yield item
+
+    def _enter_stage(self, name: str) -> None:
+        self._lock.acquire()
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        if self._active_profiles:
+            self._active_profiles[-1].disable()
+        self._active_profiles.append(profile)
+        profile.enable()
+
+    def _exit_stage(self) -> None:
+        self._active_profiles.pop().disable()
+        if self._active_profiles:
+            self._active_profiles[-1].enable()
+        self._lock.release()
+
+    @contextmanager
+    def channel(self, channel: str) -> Iterator[None]:
+        """Traces peak memory of conversion of a channel run within the context
+
+        Does nothing unless tracing of memory was requested.
+
+        Args:
+            channel: name of the channel
+
+        Returns:
+            Context manager
+        """
+        if not self._trace_memory:
+            yield
+            return
+
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            (_, peak) = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._memory_peaks[channel] = peak
+
+    def collect(self) -> ProfileResult:
+        """Takes statistics gathered so far, starting over for the next ones
+
+        Must not be called while a stage is being profiled.
+
+        Returns:
+            Statistics of each stage and peak memory of each channel
+        """
+        with self._lock:
+            result = ProfileResult(memory_peaks=self._memory_peaks)
+            for (name, profile) in self._profiles.items():
+                profile.create_stats()
+                result.stats[name] = profile.stats
+            self._profiles = {}
+            self._memory_peaks = {}
+
+        return result
+
+    def add(self, result: ProfileResult) -> None:
+        """Adds statistics collected by this or another profiler, such as one
+        in a worker process, to those written out by write()
+
+        Args:
+            result: statistics returned by collect()
+
+        Returns:
+            None
+        """
+        for (name, raw_stats) in result.stats.items():
+            stats = self._load_stats(raw_stats)
+            if name in self._collected_stats:
+                self._collected_stats[name].add(stats)
+            else:
+                self._collected_stats[name] = stats
+        self._collected_memory_peaks.update(result.memory_peaks)
+
+    def write(self, file_io: FileIO, profile_path: Path) -> None:
+        """Writes statistics of each stage as a pstats file, along with a summary
+        ranking stages and functions within them by time spent
+
+        Statistics not collected yet are added beforehand.
+
+        Args:
+            file_io: used to write the files
+            profile_path: directory to write the files to
+
+        Returns:
+            None
+        """
+        self.add(self.collect())
+
+        for (name, stats) in self._collected_stats.items():
+            file_io.write_bytes(
+                profile_path / f"{name}.pstats", marshal.dumps(stats.stats)
+            )
+        file_io.write_bytes(
+            profile_path / "summary.txt", self._summarize().encode("utf-8")
+        )
+
+    def _summarize(self) -> str:
+        ranked_stages = sorted(
+            self._collected_stats.items(),
+            key=lambda item: item[1].total_tt,
+            reverse=True,
+        )
+
+        summary = io.StringIO()
+        summary.write("Time spent in each stage\n")
+        for (name, stats) in ranked_stages:
+            summary.write(
+                f"  {name:<10} {stats.total_tt:10.3f}s "
+                f"{stats.total_calls:>12} calls\n"
+            )
+
+        if self._collected_memory_peaks:
+            summary.write("\nPeak memory of each channel\n")
+            for (channel, peak) in sorted(
+                self._collected_memory_peaks.items(),
+                key=lambda item: item[1],
+                reverse=True,
+            ):
+                summary.write(f"  {peak / 1024 / 1024:10.1f}MiB #{channel}\n")
+
+        for (name, stats) in ranked_stages:
+            summary.write(f"\nFunctions of stage {name}\n")
+            stats.stream = summary
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(self._SUMMARY_FUNCTIONS)
+
+        return summary.getvalue()
+
+    @staticmethod
+    def _load_stats(raw_stats: Dict[Any, Any]) -> pstats.Stats:
+        stats = pstats.Stats()
+        stats.stats = raw_stats
+        stats.get_top_level_stats()
+        return stats
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .exceptions import ConverterException
+from .sqlite_sink import SQLiteDatabase, quote_identifier
+from .types import CSVData, CSVFields
+
+# shortest term looked up in the index, shorter ones are scanned for
+_TRIGRAM_LENGTH = 3
+
+
+class SearchIndex(SQLiteDatabase):
+    """
+    Indexes text of messages for full text search with sqlite FTS5,
+    alongside the csv files.
+
+    Text is split into trigrams rather than into words, so that any part of it
+    can be searched for the way grep would, whatever language it is written in.
+    Terms shorter than a trigram are matched by scanning text of every message.
+    Rows are keyed by channel and ts, and hold the other fields of messages csv file
+    as they are, so that matching rows are returned without reading the csv files.
+    """
+
+    TABLE = "messages"
+    TEXT_FIELD = "テキスト"
+    # fields that must be present for rows to be indexed and told apart
+    REQUIRED_FIELDS = ["ts", TEXT_FIELD]
+
+    def __init__(
+        self, index_file: Path, message_fields: CSVFields, batch_size: int = 10_000
+    ) -> None:
+        """
+        Args:
+            index_file: path of the index, created if not found
+            message_fields: fields of messages csv file, which become columns
+            batch_size: number of rows inserted in each transaction
+        """
+        super().__init__(index_file, batch_size)
+        for field in self.REQUIRED_FIELDS:
+            if field not in message_fields:
+                raise ConverterException(f"全文検索には {field} 列が必要です。")
+
+        self._message_fields = message_fields
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "index_file": self._database_file,
+            "message_fields": self._message_fields,
+            "batch_size": self._batch_size,
+        }
+
+    def create_tables(self) -> None:
+        """Creates an empty index, replacing one written by a previous conversion
+
+        The connection is closed afterwards, so that it is not carried over into
+        worker processes forked after the index was created.
+
+        Returns:
+            None
+        """
+        logging.debug(f"Creating full text index {str(self._database_file)}")
+
+        columns = ", ".join(
+            [f"{quote_identifier(self.CHANNEL_COLUMN)} UNINDEXED"]
+            + [
+                quote_identifier(field)
+                if field == self.TEXT_FIELD
+                else f"{quote_identifier(field)} UNINDEXED"
+                for field in self._message_fields
+            ]
+        )
+        table = quote_identifier(self.TABLE)
+        connection = self._get_connection()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+                connection.execute(
+                    f"CREATE VIRTUAL TABLE {table} "
+                    f"USING fts5({columns}, tokenize='trigram')"
+                )
+                # segments written by each batch are merged once by create_indexes()
+                # rather than over and over while rows are loaded
+                connection.execute(
+                    f"INSERT INTO {table}({table}, rank) VALUES('automerge', 0)"
+                )
+        except sqlite3.OperationalError as e:
+            logging.warning(
+                f"Failed to create full text index {str(self._database_file)}"
+            )
+            raise ConverterException(
+                f"全文検索のインデックスを作成できません。sqlite {sqlite3.sqlite_version} が"
+                f"FTS5のtrigramトークナイザーに対応していない可能性があります: {str(e)}"
+            )
+        except sqlite3.Error as e:
+            logging.warning(
+                f"Failed to create full text index {str(self._database_file)}"
+            )
+            raise ConverterException(str(e))
+        finally:
+            self.close()
+
+    def write_rows(
+        self, channel: str, csv_data_messages: CSVData, csv_data_attachments: CSVData
+    ) -> None:
+        """Indexes rows of messages of a channel, committing every batch_size rows
+
+        Messages without text are left out, and rows of attachments are ignored.
+
+        Args:
+            channel: name of channel rows belong to
+            csv_data_messages: rows of messages csv file
+            csv_data_attachments: rows of attachments csv file
+
+        Returns:
+            None
+        """
+        connection = self._get_connection()
+        try:
+            (statement, values) = self._prepare_insert(
+                self.TABLE,
+                self._message_fields,
+                channel,
+                [row for row in csv_data_messages if row[self.TEXT_FIELD]],
+            )
+            self._insert_in_batches(connection, statement, values)
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to write to {str(self._database_file)}")
+            raise ConverterException(str(e))
+
+    def create_indexes(self) -> None:
+        """Merges the index written in batches into a single one, which is faster
+        to search, and folds the write ahead log into the index file
+
+        Returns:
+            None
+        """
+        logging.debug(f"Optimizing full text index {str(self._database_file)}")
+
+        table = quote_identifier(self.TABLE)
+        connection = self._get_connection()
+        try:
+            with connection:
+                connection.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logging.warning(
+                f"Failed to optimize full text index {str(self._database_file)}"
+            )
+            raise ConverterException(str(e))
+
+
+def search(
+    index_file: Path, query: str, channel: Optional[str] = None, limit: int = 100
+) -> CSVData:
+    """Finds messages whose text contains every term of a query in an index
+    written by SearchIndex
+
+    Terms are separated by whitespace and matched as they are,
+    ignoring case of ascii letters.
+
+    Args:
+        index_file: path of the index
+        query: terms to search for
+        channel: name of channel to search in, every channel when omitted
+        limit: largest number of rows returned
+
+    Returns:
+        Matching rows in the order they were indexed, each with the name of
+        channel it belongs to along with fields of messages csv file
+    """
+    terms = query.split()
+    if not terms:
+        raise ConverterException("検索語を指定してください。")
+    if not index_file.is_file():
+        raise ConverterException(f"全文検索のインデックスが見つかりません: {str(index_file)}")
+
+    table = quote_identifier(SearchIndex.TABLE)
+    conditions: List[str] = []
+    parameters: List[Any] = []
+    indexed_terms = [term for term in terms if len(term) >= _TRIGRAM_LENGTH]
+    if indexed_terms:
+        conditions.append(f"{table} MATCH ?")
+        # terms double quoted are matched as they are, rather than as query syntax
+        parameters.append(" ".join(quote_identifier(term) for term in indexed_terms))
+    for term in terms:
+        if len(term) < _TRIGRAM_LENGTH:
+            text_column = quote_identifier(SearchIndex.TEXT_FIELD)
+            conditions.append(f"{text_column} LIKE ? ESCAPE '\\'")
+            parameters.append(f"%{_escape_like(term)}%")
+    if channel is not None:
+        conditions.append(f"{quote_identifier(SearchIndex.CHANNEL_COLUMN)} = ?")
+        parameters.append(channel)
+    parameters.append(limit)
+
+    statement = (
+        f"SELECT * FROM {table} WHERE {' AND '.join(conditions)} "
+        "ORDER BY rowid LIMIT ?"
+    )
+    try:
+        connection = sqlite3.connect(f"{index_file.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            cursor = connection.execute(statement, parameters)
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, values)) for values in cursor]
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        logging.warning(f"Failed to search {str(index_file)}")
+        raise ConverterException(str(e))
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
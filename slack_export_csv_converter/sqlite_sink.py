@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .exceptions import ConverterException
+from .types import CSVData, CSVFields
+
+
+class SQLiteDatabase(ABC):
+    """
+    Base of sqlite databases rows are written into alongside the csv files.
+
+    Tables are created by create_tables() before channels are converted,
+    rows of each channel are written by write_rows(), and create_indexes()
+    finishes the database off once every channel has been written.
+    Each process writing rows opens a connection of its own.
+    """
+
+    # column naming the channel a row belongs to, preceding the columns of csv fields
+    CHANNEL_COLUMN = "channel"
+    # seconds a process waits for another one to finish writing
+    _BUSY_TIMEOUT = 60.0
+
+    def __init__(self, database_file: Path, batch_size: int = 10_000) -> None:
+        """
+        Args:
+            database_file: path of the database, created if not found
+            batch_size: number of rows inserted in each transaction
+        """
+        if batch_size < 1:
+            raise ConverterException("一度に書き込む行数には1以上の値を指定してください。")
+
+        self._database_file = database_file
+        self._batch_size = batch_size
+        self._connection: Optional[sqlite3.Connection] = None
+        # process the connection was opened in, which is not shared with forked ones
+        self._connection_pid: Optional[int] = None
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    @abstractmethod
+    def create_tables(self) -> None:
+        """Creates empty tables, replacing ones written by a previous conversion
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    def write_rows(
+        self, channel: str, csv_data_messages: CSVData, csv_data_attachments: CSVData
+    ) -> None:
+        """Inserts rows of a channel
+
+        Args:
+            channel: name of channel rows belong to
+            csv_data_messages: rows of messages csv file
+            csv_data_attachments: rows of attachments csv file
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    def create_indexes(self) -> None:
+        """Finishes the database off once every row has been written
+
+        Returns:
+            None
+        """
+
+    def close(self) -> None:
+        """Closes connection opened by this process
+
+        Returns:
+            None
+        """
+        if self._connection is not None and self._connection_pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+        self._connection_pid = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._connection_pid != os.getpid():
+            # rows may be written from a thread other than the one that connected,
+            # such as the writing stage of pipelined mode, but never two at once
+            self._connection = sqlite3.connect(
+                str(self._database_file),
+                timeout=self._BUSY_TIMEOUT,
+                check_same_thread=False,
+            )
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection_pid = os.getpid()
+
+        return self._connection
+
+    def _insert_in_batches(
+        self,
+        connection: sqlite3.Connection,
+        statement: str,
+        values: Iterator[Tuple[str, ...]],
+    ) -> None:
+        while True:
+            batch = list(islice(values, self._batch_size))
+            if not batch:
+                break
+            with connection:
+                connection.executemany(statement, batch)
+
+    def _prepare_insert(
+        self, table: str, fields: CSVFields, channel: str, rows: CSVData
+    ) -> Tuple[str, Iterator[Tuple[str, ...]]]:
+        columns = ", ".join(
+            quote_identifier(column) for column in [self.CHANNEL_COLUMN, *fields]
+        )
+        placeholders = ", ".join("?" * (len(fields) + 1))
+        statement = (
+            f"INSERT INTO {quote_identifier(table)} ({columns}) VALUES ({placeholders})"
+        )
+
+        # itemgetter returns the value itself rather than a tuple for a single field
+        get_values: Callable[[Dict[str, str]], Tuple[str, ...]] = (
+            itemgetter(*fields)
+            if len(fields) > 1
+            else lambda row: tuple(row[field] for field in fields)
+        )
+        values = ((channel, *get_values(row)) for row in rows)
+
+        return (statement, values)
+
+
+class SQLiteSink(SQLiteDatabase):
+    """
+    Writes rows of messages and of attachment files into a sqlite database,
+    a table for each with a column naming the channel rows belong to,
+    alongside the csv files.
+
+    Tables are created without indexes so that rows are loaded in bulk,
+    and indexes are built once every channel has been written.
+    """
+
+    MESSAGES_TABLE = "messages"
+    ATTACHMENTS_TABLE = "attachments"
+    # fields of each table indexed once rows are loaded, when the table has them
+    _INDEXED_FIELDS = {
+        MESSAGES_TABLE: ["ts", "thread_ts", "ユーザー"],
+        ATTACHMENTS_TABLE: ["message_ts", "ユーザー"],
+    }
+
+    def __init__(
+        self,
+        database_file: Path,
+        message_fields: CSVFields,
+        attachment_fields: CSVFields,
+        batch_size: int = 10_000,
+    ) -> None:
+        """
+        Args:
+            database_file: path of the database, created if not found
+            message_fields: fields of messages csv file, which become columns
+            attachment_fields: fields of attachments csv file, which become columns
+            batch_size: number of rows inserted in each transaction
+        """
+        super().__init__(database_file, batch_size)
+        self._fields = {
+            self.MESSAGES_TABLE: message_fields,
+            self.ATTACHMENTS_TABLE: attachment_fields,
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "database_file": self._database_file,
+            "message_fields": self._fields[self.MESSAGES_TABLE],
+            "attachment_fields": self._fields[self.ATTACHMENTS_TABLE],
+            "batch_size": self._batch_size,
+        }
+
+    def create_tables(self) -> None:
+        """Creates empty tables, replacing ones written by a previous conversion
+
+        The connection is closed afterwards, so that it is not carried over into
+        worker processes forked after the tables were created.
+
+        Returns:
+            None
+        """
+        logging.debug(f"Creating tables of {str(self._database_file)}")
+
+        connection = self._get_connection()
+        try:
+            # rows are written by a single process at a time while others read,
+            # which a write ahead log lets happen without blocking one another
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                for (table, fields) in self._fields.items():
+                    connection.execute(f"DROP TABLE IF EXISTS {quote_identifier(table)}")
+                    columns = ", ".join(
+                        [f"{quote_identifier(self.CHANNEL_COLUMN)} TEXT NOT NULL"]
+                        + [f"{quote_identifier(field)} TEXT" for field in fields]
+                    )
+                    connection.execute(
+                        f"CREATE TABLE {quote_identifier(table)} ({columns})"
+                    )
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to create tables of {str(self._database_file)}")
+            raise ConverterException(str(e))
+        finally:
+            self.close()
+
+    def write_rows(
+        self, channel: str, csv_data_messages: CSVData, csv_data_attachments: CSVData
+    ) -> None:
+        """Inserts rows of a channel, committing every batch_size rows
+
+        Args:
+            channel: name of channel rows belong to
+            csv_data_messages: rows of messages csv file
+            csv_data_attachments: rows of attachments csv file
+
+        Returns:
+            None
+        """
+        connection = self._get_connection()
+        try:
+            for (table, rows) in [
+                (self.MESSAGES_TABLE, csv_data_messages),
+                (self.ATTACHMENTS_TABLE, csv_data_attachments),
+            ]:
+                (statement, values) = self._prepare_insert(
+                    table, self._fields[table], channel, rows
+                )
+                self._insert_in_batches(connection, statement, values)
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to write to {str(self._database_file)}")
+            raise ConverterException(str(e))
+
+    def create_indexes(self) -> None:
+        """Builds indexes of the tables once every row has been written,
+        and folds the write ahead log into the database file
+
+        Returns:
+            None
+        """
+        logging.debug(f"Creating indexes of {str(self._database_file)}")
+
+        connection = self._get_connection()
+        try:
+            with connection:
+                for (table, fields) in self._fields.items():
+                    for field in self._INDEXED_FIELDS[table]:
+                        if field not in fields:
+                            continue
+                        connection.execute(
+                            f"CREATE INDEX {quote_identifier(f'{table}_{field}')} "
+                            f"ON {quote_identifier(table)} ({quote_identifier(field)})"
+                        )
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to create indexes of {str(self._database_file)}")
+            raise ConverterException(str(e))
+
+
+def quote_identifier(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import math
+import re
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, Optional, Tuple, Union
+
+from .exceptions import ConverterException
+
+_EPOCH = datetime(1970, 1, 1)
+_SECONDS_PER_HOUR = 3600
+_UTC_OFFSET_PATTERN = re.compile(r"^([+-])(\d{2}):?(\d{2})$")
+# removes separators from formatted timestamp to make it compact
+_COMPACT_TABLE = str.maketrans("", "", "- :")
+
+
+class TimestampFormatter:
+    """
+    Formats unix timestamps found in slack exports into local date time strings,
+    producing exactly what str(datetime.fromtimestamp(ts, tz)) would without tz info.
+
+    Timestamps of a message file share the same date and mostly the same hour,
+    so the date and hour part of the string, along with the utc offset in effect,
+    is cached and only minutes and seconds are formatted for each timestamp.
+    """
+
+    def __init__(self, timezone: Optional[tzinfo] = None) -> None:
+        """
+        Args:
+            timezone: timezone to format timestamps in,
+                local timezone of the host is used when omitted
+        """
+        self._timezone = timezone
+        # utc offset in seconds keyed by hours since epoch in utc,
+        # None when the offset changes within that hour
+        self._utc_offsets: Dict[int, Optional[int]] = {}
+        # formatted date and hour keyed by hours since epoch in local time
+        self._hour_prefixes: Dict[int, str] = {}
+
+    def format(self, ts: Union[str, int, float]) -> str:
+        """Formats timestamp as date and time
+
+        Args:
+            ts: unix timestamp
+
+        Returns:
+            Formatted timestamp, such as "2023-01-01 09:00:00" or
+            "2023-01-01 09:00:00.123456" when there is a fraction of a second
+        """
+        (seconds, microseconds) = self._split_timestamp(float(ts))
+
+        utc_hour = seconds // _SECONDS_PER_HOUR
+        if utc_hour in self._utc_offsets:
+            utc_offset = self._utc_offsets[utc_hour]
+        else:
+            utc_offset = self._find_utc_offset(utc_hour)
+            self._utc_offsets[utc_hour] = utc_offset
+
+        if utc_offset is None:
+            return str(
+                datetime.fromtimestamp(float(ts), self._timezone).replace(tzinfo=None)
+            )
+
+        local_seconds = seconds + utc_offset
+        (local_hour, seconds_in_hour) = divmod(local_seconds, _SECONDS_PER_HOUR)
+        prefix = self._hour_prefixes.get(local_hour)
+        if prefix is None:
+            prefix = self._format_hour(local_hour)
+            self._hour_prefixes[local_hour] = prefix
+
+        (minute, second) = divmod(seconds_in_hour, 60)
+        if microseconds:
+            return f"{prefix}:{minute:02d}:{second:02d}.{microseconds:06d}"
+        return f"{prefix}:{minute:02d}:{second:02d}"
+
+    def format_compact(self, ts: Union[str, int, float]) -> str:
+        """Formats timestamp as date and time without any separators
+
+        Args:
+            ts: unix timestamp
+
+        Returns:
+            Formatted timestamp, such as "20230101090000" or
+            "20230101090000.123456" when there is a fraction of a second
+        """
+        return self.format(ts).translate(_COMPACT_TABLE)
+
+    @staticmethod
+    def _split_timestamp(ts: float) -> Tuple[int, int]:
+        # rounds to microseconds the same way datetime.fromtimestamp() does
+        (fraction, whole) = math.modf(ts)
+        microseconds = round(fraction * 1e6)
+        seconds = int(whole)
+        if microseconds >= 1_000_000:
+            seconds += 1
+            microseconds -= 1_000_000
+        elif microseconds < 0:
+            seconds -= 1
+            microseconds += 1_000_000
+
+        return (seconds, microseconds)
+
+    def _find_utc_offset(self, utc_hour: int) -> Optional[int]:
+        start = utc_hour * _SECONDS_PER_HOUR
+        offset_at_start = self._utc_offset_at(start)
+        offset_at_end = self._utc_offset_at(start + _SECONDS_PER_HOUR - 1)
+
+        return offset_at_start if offset_at_start == offset_at_end else None
+
+    def _utc_offset_at(self, seconds: int) -> int:
+        local = datetime.fromtimestamp(seconds, self._timezone).replace(tzinfo=None)
+        return (local - _EPOCH) // timedelta(seconds=1) - seconds
+
+    @staticmethod
+    def _format_hour(local_hour: int) -> str:
+        hour = _EPOCH + timedelta(hours=local_hour)
+        return f"{hour.year:04d}-{hour.month:02d}-{hour.day:02d} {hour.hour:02d}"
+
+
+def parse_timezone(name: str) -> tzinfo:
+    """Parses name of timezone
+
+    Args:
+        name: "UTC", utc offset such as "+09:00", or IANA timezone name such as
+            "Asia/Tokyo" (requires python 3.9 or later)
+
+    Returns:
+        Timezone represented by the name
+    """
+    if name.upper() in ("UTC", "Z"):
+        return timezone.utc
+
+    match = _UTC_OFFSET_PATTERN.match(name)
+    if match:
+        (sign, hours, minutes) = match.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes))
+        return timezone(-offset if sign == "-" else offset)
+
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(name)
+    except Exception:
+        raise ConverterException(f"タイムゾーン {name} は利用できません")
@@ -2,10 +2,14 @@
 """
 Defining rather complex types here to improve readability
 """
-from typing import Dict, List, Any
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Any, Union
 
 # type aliases
 ExportFileElement = Dict[str, Any]
 ExportFileContent = List[ExportFileElement]
 CSVFields = List[str]
 CSVData = List[Dict[str, str]]
+# path of a file within a slack export, which may be a member of a zip archive
+ExportPath = Union[Path, zipfile.Path]
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import logging
+import mmap
+import struct
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .exceptions import ConverterException
+from .file_io import FileIO
+from .types import ExportFileElement, ExportPath
+
+
+class UserIndex:
+    """
+    Maps ids of users to their real names, backed by a file holding nothing but
+    the ids sorted alongside the names.
+    The file is memory mapped, so that processes converting channels in parallel
+    share a single copy of it through the page cache, and names are looked up
+    by binary search over it. Only a bounded number of names looked up recently
+    are kept in memory.
+
+    Layout of the file, all integers being little endian:
+        header: magic, version, length of fingerprint, fingerprint, number of users
+        records: offset and length of id, offset and length of name, sorted by id
+        strings: utf-8 encoded ids and names the records point to
+    """
+
+    _MAGIC = b"SECUIDX\0"
+    _VERSION = 1
+    _HEADER = struct.Struct("<8sII")
+    _COUNT = struct.Struct("<Q")
+    _RECORD = struct.Struct("<QIQI")
+    # keys of users.json that are needed to build the index
+    _USER_KEYS = frozenset(["id", "profile", "real_name"])
+    # number of names looked up recently that are kept, as few users post most messages
+    _CACHE_SIZE = 1024
+
+    def __init__(self, index_file: Path, cache_size: int = _CACHE_SIZE) -> None:
+        """Opens index file written by build()
+
+        Args:
+            index_file: path to the index file
+            cache_size: number of names looked up recently that are kept in memory
+        """
+        self._index_file = index_file
+        self._cache_size = cache_size
+        with index_file.open("rb") as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, fingerprint_length) = self._HEADER.unpack_from(self._map, 0)
+        if magic != self._MAGIC or version != self._VERSION:
+            raise ConverterException(f"ユーザー索引 {str(index_file)} が壊れています")
+
+        fingerprint_offset = self._HEADER.size
+        count_offset = fingerprint_offset + fingerprint_length
+        self._fingerprint = self._map[fingerprint_offset:count_offset].decode("utf-8")
+        (self._count,) = self._COUNT.unpack_from(self._map, count_offset)
+        self._records_offset = count_offset + self._COUNT.size
+        # names looked up recently, None for ids that are not in the index
+        self._lookup: Callable[[str], Optional[str]] = lru_cache(maxsize=cache_size)(
+            self._search
+        )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"index_file": self._index_file, "cache_size": self._cache_size}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @classmethod
+    def load_or_build(
+        cls, file_io: FileIO, users_file: ExportPath, index_file: Path
+    ) -> "UserIndex":
+        """Opens index built from users file by a previous run,
+        or builds it when there is none or users file changed since
+
+        Args:
+            file_io: used to inspect and read users file
+            users_file: path to users.json of the export
+            index_file: path to the index file
+
+        Returns:
+            Index of users in users file
+        """
+        fingerprint = cls._get_fingerprint(file_io, users_file)
+        if index_file.exists():
+            try:
+                user_index = cls(index_file)
+                if user_index.get_fingerprint() == fingerprint:
+                    logging.debug(f"Using user index {str(index_file)}")
+                    return user_index
+                user_index.close()
+            except (ConverterException, ValueError, struct.error):
+                pass
+
+        logging.info("ユーザー索引を作成しています...")
+        return cls.build(
+            file_io.iter_json_array(users_file, keys=cls._USER_KEYS),
+            index_file,
+            fingerprint,
+        )
+
+    @classmethod
+    def build(
+        cls, users_data: Iterable[ExportFileElement], index_file: Path, fingerprint: str
+    ) -> "UserIndex":
+        """Writes index of users to a file and opens it
+
+        The file is replaced atomically so that a reader never sees it half written.
+
+        Args:
+            users_data: data retrieved from slack export users file
+            index_file: path to the index file
+            fingerprint: identifies the users file the index is built from
+
+        Returns:
+            Index of users
+        """
+        names = {
+            user["id"].encode("utf-8"): user["profile"]["real_name"].encode("utf-8")
+            for user in users_data
+        }
+        entries = sorted(names.items())
+
+        fingerprint_bytes = fingerprint.encode("utf-8")
+        strings_offset = (
+            cls._HEADER.size
+            + len(fingerprint_bytes)
+            + cls._COUNT.size
+            + cls._RECORD.size * len(entries)
+        )
+        records: List[bytes] = []
+        strings: List[bytes] = []
+        offset = strings_offset
+        for (user_id, name) in entries:
+            records.append(
+                cls._RECORD.pack(offset, len(user_id), offset + len(user_id), len(name))
+            )
+            strings.extend([user_id, name])
+            offset += len(user_id) + len(name)
+
+        temporary_file = index_file.with_name(index_file.name + ".tmp")
+        with temporary_file.open("wb") as fp:
+            fp.write(cls._HEADER.pack(cls._MAGIC, cls._VERSION, len(fingerprint_bytes)))
+            fp.write(fingerprint_bytes)
+            fp.write(cls._COUNT.pack(len(entries)))
+            fp.writelines(records)
+            fp.writelines(strings)
+        temporary_file.replace(index_file)
+
+        return cls(index_file)
+
+    def get_fingerprint(self) -> str:
+        """Get fingerprint of the users file the index was built from
+
+        Returns:
+            Fingerprint
+        """
+        return self._fingerprint
+
+    def get(self, user_id: str, default: str) -> str:
+        """Looks up real name of a user
+
+        Args:
+            user_id: id of user
+            default: returned when there is no user of the id
+
+        Returns:
+            Real name of the user
+        """
+        name = self._lookup(user_id)
+        return default if name is None else name
+
+    def close(self) -> None:
+        """Closes the index file
+
+        Returns:
+            None
+        """
+        self._map.close()
+
+    def _search(self, user_id_text: str) -> Optional[str]:
+        user_id = user_id_text.encode("utf-8")
+        index_map = self._map
+        unpack_record = self._RECORD.unpack_from
+        low = 0
+        high = self._count
+        while low < high:
+            middle = (low + high) // 2
+            (id_offset, id_length, name_offset, name_length) = unpack_record(
+                index_map, self._records_offset + middle * self._RECORD.size
+            )
+            current_id = index_map[id_offset : id_offset + id_length]
+            if current_id < user_id:
+                low = middle + 1
+            elif current_id > user_id:
+                high = middle
+            else:
+                return index_map[name_offset : name_offset + name_length].decode("utf-8")
+
+        return None
+
+    @staticmethod
+    def _get_fingerprint(file_io: FileIO, users_file: ExportPath) -> str:
+        (size, mtime) = file_io.get_file_stat(users_file)
+        return f"{str(users_file)}:{size}:{mtime}"
@@ -0,0 +1,219 @@
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from unittest.mock import patch
+
+import pytest
+
+from slack_export_csv_converter.attachment_store import AttachmentStore
+from slack_export_csv_converter.downloader import Downloader, DownloadResult
+from slack_export_csv_converter.exceptions import ConverterException
+from slack_export_csv_converter.file_io import FileIO
+
+# content served for each url, urls missing here fail to download
+TEST_CONTENTS = {
+    "https://example.com/F1/a.png": b"content of a",
+    "https://example.com/F2/b.png": b"content of b",
+    "https://example.com/F3/copy_of_a.png": b"content of a",
+}
+
+
+@pytest.fixture
+def downloaded_urls() -> Iterator[Dict[str, int]]:
+    downloaded_urls: Dict[str, int] = {}
+
+    def download(self, url: str, file_path: Path) -> Optional[int]:
+        if file_path.exists():
+            return None
+        if url not in TEST_CONTENTS:
+            raise ConverterException(f"Failed to download from {url}")
+
+        downloaded_urls[url] = downloaded_urls.get(url, 0) + 1
+        file_path.write_bytes(TEST_CONTENTS[url])
+        return len(TEST_CONTENTS[url])
+
+    with patch.object(FileIO, "download", new=download):
+        yield downloaded_urls
+
+
+@pytest.fixture
+def downloader() -> Downloader:
+    return Downloader(FileIO())
+
+
+def create_attachment(file_id: str, name: str) -> tuple:
+    url = f"https://example.com/{file_id}/{name}"
+    canonical_path = AttachmentStore.get_canonical_path(
+        {"id": file_id, "url_private": url}, name
+    )
+    return (url, canonical_path)
+
+
+def store_in_channel(
+    store: AttachmentStore,
+    downloader: Downloader,
+    tmp_path: Path,
+    channel: str,
+    *attachments: tuple,
+) -> DownloadResult:
+    return store.store_all(
+        downloader,
+        [
+            (url, canonical_path, tmp_path / channel / Path(canonical_path).name)
+            for (url, canonical_path) in attachments
+        ],
+    )
+
+
+class TestAttachmentStoreGetCanonicalPath:
+    def shouldKeyFilesById(self):
+        canonical_path = AttachmentStore.get_canonical_path(
+            {"id": "F1", "url_private": "https://example.com/F1/a.png"}, "a.png"
+        )
+
+        assert canonical_path == "attachments.store/by-id/F1/a.png"
+
+    def shouldKeyFilesByUrlWhenTheyHaveNoId(self):
+        first = AttachmentStore.get_canonical_path(
+            {"url_private": "https://example.com/1/a.png"}, "a.png"
+        )
+        second = AttachmentStore.get_canonical_path(
+            {"url_private": "https://example.com/2/a.png"}, "a.png"
+        )
+
+        assert first.startswith("attachments.store/by-id/url-")
+        assert first != second
+
+
+class TestAttachmentStoreStoreAll:
+    def shouldDownloadFileOnceAndLinkItIntoEveryChannel(
+        self, tmp_path: Path, downloader: Downloader, downloaded_urls: Dict[str, int]
+    ):
+        store = AttachmentStore(FileIO(), tmp_path)
+        attachment = create_attachment("F1", "a.png")
+
+        first = store_in_channel(store, downloader, tmp_path, "general", attachment)
+        second = store_in_channel(
+            store, downloader, tmp_path, "random", attachment, attachment
+        )
+
+        assert downloaded_urls == {"https://example.com/F1/a.png": 1}
+        assert first == DownloadResult(downloaded=1, downloaded_bytes=12)
+        assert second == DownloadResult(skipped=2)
+        canonical_file = tmp_path / attachment[1]
+        for channel in ["general", "random"]:
+            channel_file = tmp_path / channel / "a.png"
+            assert channel_file.read_bytes() == b"content of a"
+            assert channel_file.stat().st_ino == canonical_file.stat().st_ino
+
+    def shouldLinkFilesSymbolicallyWhenConfigured(
+        self, tmp_path: Path, downloader: Downloader, downloaded_urls: Dict[str, int]
+    ):
+        store = AttachmentStore(FileIO(), tmp_path, link_mode="symlink")
+        attachment = create_attachment("F1", "a.png")
+
+        store_in_channel(store, downloader, tmp_path, "general", attachment)
+
+        channel_file = tmp_path / "general" / "a.png"
+        assert channel_file.is_symlink()
+        assert channel_file.resolve() == (tmp_path / attachment[1]).resolve()
+
+    def shouldShareContentOfFilesWithSameContent(
+        self, tmp_path: Path, downloader: Downloader, downloaded_urls: Dict[str, int]
+    ):
+        store = AttachmentStore(FileIO(), tmp_path)
+        attachments = [
+            create_attachment("F1", "a.png"),
+            create_attachment("F2", "b.png"),
+            create_attachment("F3", "copy_of_a.png"),
+        ]
+
+        store_in_channel(store, downloader, tmp_path, "general", *attachments)
+
+        inodes = [(tmp_path / path).stat().st_ino for (_, path) in attachments]
+        assert inodes[0] == inodes[2]
+        assert inodes[0] != inodes[1]
+
+    def shouldCountFailedDownloadsAndNotLinkThem(
+        self, tmp_path: Path, downloader: Downloader, downloaded_urls: Dict[str, int]
+    ):
+        store = AttachmentStore(FileIO(), tmp_path)
+        missing = create_attachment("F9", "missing.png")
+
+        result = store_in_channel(
+            store,
+            downloader,
+            tmp_path,
+            "general",
+            create_attachment("F1", "a.png"),
+            missing,
+        )
+
+        assert result == DownloadResult(downloaded=1, failed=1, downloaded_bytes=12)
+        assert not (tmp_path / "general" / "missing.png").exists()
+        assert not list((tmp_path / "attachments.store").rglob("*.lock"))
+
+    def shouldWaitForFileDownloadedByAnotherProcess(
+        self, tmp_path: Path, downloader: Downloader, downloaded_urls: Dict[str, int]
+    ):
+        store = AttachmentStore(FileIO(), tmp_path)
+        attachment = create_attachment("F1", "a.png")
+        canonical_file = tmp_path / attachment[1]
+        lock_path = canonical_file.with_name("a.png.lock")
+        FileIO().create_lock(lock_path)
+
+        def finish_download():
+            canonical_file.write_bytes(b"downloaded elsewhere")
+            lock_path.unlink()
+
+        timer = threading.Timer(0.2, finish_download)
+        timer.start()
+        result = store_in_channel(store, downloader, tmp_path, "general", attachment)
+        timer.join()
+
+        assert downloaded_urls == {}
+        assert result == DownloadResult(skipped=1)
+        assert (tmp_path / "general" / "a.png").read_bytes() == b"downloaded elsewhere"
+
+    def shouldCountFileAsFailedWhenProcessHoldingLockHasExited(
+        self, tmp_path: Path, downloader: Downloader, downloaded_urls: Dict[str, int]
+    ):
+        store = AttachmentStore(FileIO(), tmp_path)
+        attachment = create_attachment("F1", "a.png")
+        FileIO().create_lock((tmp_path / attachment[1]).with_name("a.png.lock"))
+
+        with patch.object(FileIO, "is_lock_abandoned", return_value=True):
+            result = store_in_channel(store, downloader, tmp_path, "general", attachment)
+
+        assert downloaded_urls == {}
+        assert result == DownloadResult(failed=1)
+
+    def shouldCountFileAsFailedWhenWaitingTimesOut(
+        self, tmp_path: Path, downloader: Downloader, downloaded_urls: Dict[str, int]
+    ):
+        store = AttachmentStore(FileIO(), tmp_path)
+        attachment = create_attachment("F1", "a.png")
+        # a lock held by this process, which is still running
+        FileIO().create_lock((tmp_path / attachment[1]).with_name("a.png.lock"))
+
+        with patch.object(AttachmentStore, "_LOCK_TIMEOUT", 0.2):
+            result = store_in_channel(store, downloader, tmp_path, "general", attachment)
+
+        assert downloaded_urls == {}
+        assert result == DownloadResult(failed=1)
+
+    def shouldRemoveLocksLeftOverByInterruptedConversion(
+        self, tmp_path: Path, downloader: Downloader, downloaded_urls: Dict[str, int]
+    ):
+        store = AttachmentStore(FileIO(), tmp_path)
+        attachment = create_attachment("F1", "a.png")
+        FileIO().create_lock((tmp_path / attachment[1]).with_name("a.png.lock"))
+
+        store.clear_locks()
+        result = store_in_channel(store, downloader, tmp_path, "general", attachment)
+
+        assert result == DownloadResult(downloaded=1, downloaded_bytes=12)
+
+    def shouldThrowWhenLinkModeIsUnknown(self, tmp_path: Path):
+        with pytest.raises(ConverterException):
+            AttachmentStore(FileIO(), tmp_path, link_mode="copy")
@@ -1,12 +1,26 @@
 import pytest
-from unittest.mock import MagicMock, create_autospec
+import csv
+import gzip
+import io
+import json
+import pstats
+import sqlite3
+import zipfile
+from unittest.mock import MagicMock, create_autospec, patch
+from datetime import date, timedelta, timezone
 from pathlib import Path
-from typing import List, Any
+from typing import Dict, List, Any, Optional
 
+from slack_export_csv_converter.attachment_store import AttachmentStore
 from slack_export_csv_converter.export_dir import ExportDir
+from slack_export_csv_converter.export_selection import ExportSelection
 from slack_export_csv_converter.file_io import FileIO
 from slack_export_csv_converter.csv_data_generator import CSVDataGenerator
+from slack_export_csv_converter.user_index import UserIndex
 from slack_export_csv_converter.converter import Converter
+from slack_export_csv_converter.profiler import Profiler
+from slack_export_csv_converter.search_index import SearchIndex, search
+from slack_export_csv_converter.sqlite_sink import SQLiteSink
 from slack_export_csv_converter.types import CSVData, ExportFileContent
 from slack_export_csv_converter.exceptions import ConverterException
 
@@ -14,24 +28,24 @@ from slack_export_csv_converter.exceptions import ConverterException
 # mocks
 TEST_DIR_STRUCTURE = {
     "hello": [
-        Path("/some/path/hello/messages1.json"),
-        Path("/some/path/hello/messages2.json"),
-        Path("/some/path/hello/messages3.json"),
+        Path("/some/path/hello/2023-01-01.json"),
+        Path("/some/path/hello/2023-01-02.json"),
+        Path("/some/path/hello/2023-01-03.json"),
     ],
     "world": [
-        Path("/some/path/world/messages1.json"),
-        Path("/some/path/world/messages2.json"),
-        Path("/some/path/world/messages3.json"),
+        Path("/some/path/world/2023-01-01.json"),
+        Path("/some/path/world/2023-01-02.json"),
+        Path("/some/path/world/2023-01-03.json"),
     ],
     "123": [
-        Path("/some/path/123/messages1.json"),
-        Path("/some/path/123/messages2.json"),
-        Path("/some/path/123/messages3.json"),
+        Path("/some/path/123/2023-01-01.json"),
+        Path("/some/path/123/2023-01-02.json"),
+        Path("/some/path/123/2023-01-03.json"),
     ],
     "こんにちは": [
-        Path("/some/path/こんにちは/messages1.json"),
-        Path("/some/path/こんにちは/messages2.json"),
-        Path("/some/path/こんにちは/messages3.json"),
+        Path("/some/path/こんにちは/2023-01-01.json"),
+        Path("/some/path/こんにちは/2023-01-02.json"),
+        Path("/some/path/こんにちは/2023-01-03.json"),
     ],
 }
 TEST_CHANNELS = list(TEST_DIR_STRUCTURE.keys())
@@ -44,10 +58,16 @@ for channel in TEST_CHANNELS:
 def export_dir() -> MagicMock:
     export_dir = create_autospec(ExportDir, instance=True)
     export_dir.get_channels.return_value = TEST_CHANNELS
+    export_dir.get_all_channels.return_value = TEST_CHANNELS
     # get_message_files() returns list of files
     export_dir.get_message_files.side_effect = lambda channel: TEST_DIR_STRUCTURE.get(
         channel
     )
+    export_dir.get_selection.return_value = None
+    # attachment files of each channel are saved into a directory of their own
+    export_dir.get_attachments_path.side_effect = lambda channel: Path(
+        f"/some/path/to/save/{channel}/attachments"
+    )
 
     return export_dir
 
@@ -55,13 +75,19 @@ def export_dir() -> MagicMock:
 @pytest.fixture(scope="function")
 def file_io() -> MagicMock:
     file_io = create_autospec(FileIO, instance=True)
-    # read_json() returns some differing data based on the argument it receives
-    file_io.read_json.side_effect = create_test_json_file_content
+    # iter_json_array() returns some differing data based on the argument it receives
+    file_io.iter_json_array.side_effect = create_test_json_file_content
+    # get_file_stat() returns size and modification time of message files
+    file_io.get_file_stat.return_value = (TEST_MESSAGE_FILE_SIZE, 0)
+    file_io.get_csv_suffix.return_value = ".csv"
 
     return file_io
 
 
-def create_test_json_file_content(path: Path) -> ExportFileContent:
+TEST_MESSAGE_FILE_SIZE = 100
+
+
+def create_test_json_file_content(path: Path, keys=None) -> ExportFileContent:
     return [{"json_content": path}]
 
 
@@ -76,6 +102,17 @@ def csv_data_generator() -> MagicMock:
     csv_data_generator.get_attachment_fields.return_value = TEST_MESSAGE_FIELDS
     csv_data_generator.generate_attachments.side_effect = TEST_CSV_DATA_ATTACHMENTS
 
+    # generate_rows() consumes elements of the file in a single pass
+    # and combines what the two methods above return
+    def generate_rows(file_content):
+        file_content = list(file_content)
+        return (
+            csv_data_generator.generate_messages(file_content),
+            csv_data_generator.generate_attachments(file_content),
+        )
+
+    csv_data_generator.generate_rows.side_effect = generate_rows
+
     return csv_data_generator
 
 
@@ -141,41 +178,26 @@ class TestConverterRun:
 
         converter.run()
 
-        assert file_io.read_json.call_count == len(TEST_MESSAGE_FILES)
+        assert file_io.iter_json_array.call_count == len(TEST_MESSAGE_FILES)
         for call, expected_arg in zip(
-            file_io.read_json.call_args_list, TEST_MESSAGE_FILES
+            file_io.iter_json_array.call_args_list, TEST_MESSAGE_FILES
         ):
             (args, _) = call
             assert args[0] == expected_arg
 
-    def shouldGenerateCSVMessagesDataForEachMessageFile(
+    def shouldGenerateRowsForEachMessageFileInSinglePass(
         self, converter: Converter, file_io: MagicMock, csv_data_generator: MagicMock
     ):
-        # read_json() returns some differing data based on the argument it receives
-        file_io.read_json.side_effect = create_test_json_file_content
+        # iter_json_array() returns some differing data based on the argument it receives
+        file_io.iter_json_array.side_effect = create_test_json_file_content
 
         converter.run()
 
-        assert csv_data_generator.generate_messages.call_count == len(TEST_MESSAGE_FILES)
+        assert csv_data_generator.generate_rows.call_count == len(TEST_MESSAGE_FILES)
         for message_file in TEST_MESSAGE_FILES:
             expected_file_content = create_test_json_file_content(message_file)
             csv_data_generator.generate_messages.assert_any_call(expected_file_content)
 
-    def shouldGenerateAttachmentsDataForEachMessageFile(
-        self, converter: Converter, file_io: MagicMock, csv_data_generator: MagicMock
-    ):
-        # read_json() returns some differing data based on the argument it receives
-        file_io.read_json.side_effect = create_test_json_file_content
-
-        converter.run()
-
-        assert csv_data_generator.generate_attachments.call_count == len(
-            TEST_MESSAGE_FILES
-        )
-        for message_file in TEST_MESSAGE_FILES:
-            expected_file_content = create_test_json_file_content(message_file)
-            csv_data_generator.generate_attachments.assert_any_call(expected_file_content)
-
     def shouldGatherGeneratedCSVMessagesDataOfChannelAndPassToWrite(
         self,
         converter: Converter,
@@ -299,6 +321,855 @@ class TestConverterRun:
         side_effect_with_errors[4] = ConverterException("Some error")
         file_io.download.side_effect = side_effect_with_errors
 
+        report = converter.run()
+
+        assert file_io.download.call_count == len(TEST_CSV_DATA_ATTACHMENTS)
+        assert report.get_total().downloads.failed == 2
+
+    def shouldReturnMeasurementsOfEachChannel(self, converter: Converter):
+        report = converter.run()
+
+        assert report.channels.keys() == set(TEST_CHANNELS)
+        for channel in TEST_CHANNELS:
+            metrics = report.channels[channel]
+            files = len(TEST_DIR_STRUCTURE[channel])
+            assert metrics.files_read == files
+            assert metrics.bytes_read == files * TEST_MESSAGE_FILE_SIZE
+            # a message row and an attachment row from each file
+            assert metrics.rows_written == files * 2
+            assert len(metrics.file_latencies) == files
+            assert metrics.downloads.downloaded == files
+        assert report.get_total().files_read == len(TEST_MESSAGE_FILES)
+        assert report.failed_channels == []
+
+    def shouldWriteMeasurementsToMetricsFile(
+        self, converter: Converter, export_dir: MagicMock, file_io: MagicMock
+    ):
+        metrics_file = Path("/some/path/to/save/metrics.json")
+        export_dir.get_metrics_file.return_value = metrics_file
+
+        report = converter.run()
+
+        file_io.write_json.assert_called_once_with(metrics_file, report.to_dict())
+
+
+class TestConverterRunStreaming:
+    @pytest.fixture(scope="function")
+    def converter(self, export_dir, file_io, csv_data_generator) -> Converter:
+        return Converter(export_dir, file_io, csv_data_generator, streaming=True)
+
+    def shouldWriteHeaderThenAppendRowsOfEachMessageFile(
+        self,
+        converter: Converter,
+        export_dir: MagicMock,
+        file_io: MagicMock,
+    ):
+        export_dir.get_csv_channel_path.side_effect = (
+            lambda channel: Path("/path/to") / channel
+        )
+
+        converter.run()
+
+        for channel in TEST_CHANNELS:
+            expected_file_path = Path("/path/to") / channel / "messages.csv"
+            calls = [
+                call
+                for call in file_io.csv_write.call_args_list
+                if call.args[0] == expected_file_path
+            ]
+
+            assert calls[0].args[2] == []
+            assert calls[0].kwargs.get("append", False) is False
+            assert len(calls) == len(TEST_DIR_STRUCTURE[channel]) + 1
+            for call, file_path in zip(calls[1:], TEST_DIR_STRUCTURE[channel]):
+                expected_data = create_test_csv_data_messages(
+                    create_test_json_file_content(file_path)
+                )
+                assert call.args[2] == expected_data
+                assert call.kwargs["append"] is True
+
+    def shouldAppendAttachmentsAndDownloadThemPerMessageFile(
+        self,
+        converter: Converter,
+        export_dir: MagicMock,
+        file_io: MagicMock,
+    ):
+        export_dir.get_csv_channel_path.side_effect = (
+            lambda channel: Path("/path/to") / channel
+        )
+        export_dir.get_attachments_path.side_effect = (
+            lambda channel: Path("/path/to") / channel / "attachments"
+        )
+
         converter.run()
 
+        for index, attachments in enumerate(TEST_CSV_DATA_ATTACHMENTS):
+            channel = TEST_CHANNELS[index // 3]
+            file_io.csv_write.assert_any_call(
+                Path("/path/to") / channel / "attachments.csv",
+                TEST_MESSAGE_FIELDS,
+                attachments,
+                append=True,
+            )
+            file_io.download.assert_any_call(
+                attachments[0]["url"],
+                Path("/path/to") / channel / "attachments" / attachments[0]["ファイル名"],
+            )
         assert file_io.download.call_count == len(TEST_CSV_DATA_ATTACHMENTS)
+
+    def shouldReadEachMessageFileOnce(self, converter: Converter, file_io: MagicMock):
+        converter.run()
+
+        assert file_io.iter_json_array.call_count == len(TEST_MESSAGE_FILES)
+
+
+class TestConverterRunModes:
+    TEST_CHANNEL_MESSAGES = {
+        "general": {
+            "2023-01-01.json": [
+                {
+                    "type": "message",
+                    "ts": "1672531200.000000",
+                    "user": "U1",
+                    "text": "hi",
+                },
+                {
+                    "type": "message",
+                    "ts": "1672531260.000000",
+                    "user": "U2",
+                    "text": "yo",
+                },
+            ],
+            "2023-01-02.json": [
+                {"type": "message", "ts": "1672617600.000000", "user": "U1", "text": "!"},
+            ],
+        },
+        "random": {
+            "2023-01-01.json": [
+                {"type": "message", "ts": "1672531300.000000", "user": "U2", "text": "a"},
+            ],
+        },
+        "チャンネル": {
+            "2023-01-03.json": [
+                {"type": "message", "ts": "1672704000.000000", "text": "<@U1>"},
+            ],
+        },
+    }
+    TEST_USERS = [
+        {"id": "U1", "profile": {"real_name": "John"}},
+        {"id": "U2", "profile": {"real_name": "Mary"}},
+    ]
+
+    @pytest.fixture(scope="function")
+    def export_path(self, tmp_path: Path) -> Path:
+        export_path = tmp_path / "export"
+        export_path.mkdir()
+        (export_path / "users.json").write_text(json.dumps(self.TEST_USERS))
+
+        for channel, files in self.TEST_CHANNEL_MESSAGES.items():
+            (export_path / channel).mkdir()
+            for file_name, messages in files.items():
+                (export_path / channel / file_name).write_text(json.dumps(messages))
+
+        return export_path
+
+    def create_converter(
+        self,
+        export_path: Path,
+        save_path: Path,
+        file_io: Optional[FileIO] = None,
+        selection: Optional[ExportSelection] = None,
+        **kwargs,
+    ) -> Converter:
+        save_path.mkdir(exist_ok=True)
+        export_dir = ExportDir(export_path, save_path, selection=selection)
+        file_io = file_io or FileIO()
+        csv_data_generator = CSVDataGenerator(self.TEST_USERS)
+
+        return Converter(export_dir, file_io, csv_data_generator, **kwargs)
+
+    def read_outputs(self, save_path: Path) -> Dict[str, str]:
+        return {
+            str(path.relative_to(save_path)): path.read_text(encoding="utf-8")
+            for path in sorted(save_path.rglob("*.csv"))
+        }
+
+    def read_metrics(self, save_path: Path) -> Dict[str, Any]:
+        metrics_file = save_path / "csv_converted_export" / "metrics.json"
+        return json.loads(metrics_file.read_text(encoding="utf-8"))
+
+    def shouldProduceSameOutputAsSerialRun(self, tmp_path: Path, export_path: Path):
+        serial_path = tmp_path / "serial"
+        parallel_path = tmp_path / "parallel"
+
+        self.create_converter(export_path, serial_path).run()
+        self.create_converter(export_path, parallel_path, workers=2).run()
+
+        serial_outputs = self.read_outputs(serial_path)
+        parallel_outputs = self.read_outputs(parallel_path)
+        assert len(parallel_outputs) == len(self.TEST_CHANNEL_MESSAGES) * 2
+        assert parallel_outputs == serial_outputs
+
+    def shouldConvertRemainingChannelsAndRaiseWhenSomeFail(
+        self, tmp_path: Path, export_path: Path
+    ):
+        (export_path / "random" / "2023-01-01.json").write_text("invalid json")
+        save_path = tmp_path / "parallel"
+        converter = self.create_converter(export_path, save_path, workers=2)
+
+        with pytest.raises(ConverterException) as e:
+            converter.run()
+
+        assert "#random" in str(e.value)
+        outputs = self.read_outputs(save_path)
+        assert "csv_converted_export/general/messages.csv" in outputs
+        assert "csv_converted_export/チャンネル/messages.csv" in outputs
+        metrics = self.read_metrics(save_path)
+        assert metrics["failed_channels"] == ["random"]
+        assert metrics["channels"].keys() == {"general", "チャンネル"}
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {},
+            {"workers": 2},
+            {"streaming": True},
+            {"pipelined": True},
+            {"incremental": True},
+            {"projecting": True},
+        ],
+    )
+    def shouldMeasureConversionInEveryMode(
+        self, tmp_path: Path, export_path: Path, options: Dict[str, Any]
+    ):
+        save_path = tmp_path / "measured"
+
+        report = self.create_converter(export_path, save_path, **options).run()
+
+        assert report.json_backend == FileIO().get_json_backend(
+            projecting=options.get("projecting", False)
+        )
+        assert report.channels.keys() == self.TEST_CHANNEL_MESSAGES.keys()
+        total = report.get_total()
+        assert total.files_read == 4
+        assert total.bytes_read == sum(
+            path.stat().st_size for path in export_path.glob("*/*.json")
+        )
+        assert total.rows_written == 5
+        assert len(total.file_latencies) == 4
+        assert total.json_backends == {report.json_backend: 4}
+        assert self.read_metrics(save_path) == report.to_dict()
+
+    def shouldCountMessageFilesStreamedInMetrics(self, tmp_path: Path, export_path: Path):
+        serial_path = tmp_path / "serial"
+        streamed_path = tmp_path / "streamed"
+
+        self.create_converter(export_path, serial_path).run()
+        with patch.object(FileIO, "_JSON_STREAMING_THRESHOLD", 0):
+            report = self.create_converter(export_path, streamed_path).run()
+
+        assert report.get_total().json_backends == {"json (streaming)": 4}
+        assert self.read_outputs(streamed_path) == self.read_outputs(serial_path)
+
+    def shouldProduceSameOutputInStreamingMode(self, tmp_path: Path, export_path: Path):
+        serial_path = tmp_path / "serial"
+        streaming_path = tmp_path / "streaming"
+
+        self.create_converter(export_path, serial_path).run()
+        self.create_converter(export_path, streaming_path, streaming=True).run()
+
+        assert self.read_outputs(streaming_path) == self.read_outputs(serial_path)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def shouldProduceSameOutputInPipelinedMode(
+        self, tmp_path: Path, export_path: Path, workers: int
+    ):
+        serial_path = tmp_path / "serial"
+        pipelined_path = tmp_path / "pipelined"
+
+        self.create_converter(export_path, serial_path).run()
+        self.create_converter(
+            export_path, pipelined_path, pipelined=True, workers=workers
+        ).run()
+
+        assert self.read_outputs(pipelined_path) == self.read_outputs(serial_path)
+
+    def shouldRaiseWhenMessageFileFailsInPipelinedMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        (export_path / "general" / "2023-01-02.json").write_text("invalid json")
+        converter = self.create_converter(
+            export_path, tmp_path / "pipelined", pipelined=True
+        )
+
+        with pytest.raises(ConverterException):
+            converter.run()
+
+        metrics = self.read_metrics(tmp_path / "pipelined")
+        assert metrics["failed_channels"] == ["general"]
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def shouldProduceSameOutputInProjectingMode(
+        self, tmp_path: Path, export_path: Path, streaming: bool
+    ):
+        message_with_metadata = {
+            "type": "message",
+            "ts": "1672790400.000000",
+            "thread_ts": "1672531200.000000",
+            "user": "U2",
+            "text": "see <@U1>",
+            "user_profile": {"real_name": "Someone else", "name": "x"},
+            "blocks": [
+                {"type": "rich_text", "elements": [{"type": "text", "text": "x"}]}
+            ],
+            "reactions": [{"name": "+1", "users": ["U1"], "count": 1}],
+            "files": [
+                {
+                    "id": "F1",
+                    "created": 1672790400,
+                    "name": "file.png",
+                    "size": 123,
+                    "user": "U1",
+                    "url_private": "https://example.com/F1/file.png",
+                    "thumb_64": "https://example.com/F1/thumb.png",
+                },
+                {"id": "F2", "mode": "tombstone"},
+            ],
+        }
+        (export_path / "general" / "2023-01-04.json").write_text(
+            json.dumps([message_with_metadata])
+        )
+        default_path = tmp_path / "default"
+        projecting_path = tmp_path / "projecting"
+
+        with patch.object(FileIO, "download", return_value=None):
+            self.create_converter(export_path, default_path, streaming=streaming).run()
+            self.create_converter(
+                export_path, projecting_path, streaming=streaming, projecting=True
+            ).run()
+
+        outputs = self.read_outputs(projecting_path)
+        assert outputs == self.read_outputs(default_path)
+        assert "file.png" in outputs["csv_converted_export/general/attachments.csv"]
+
+    def shouldProduceSameOutputWithUserIndexInWorkers(
+        self, tmp_path: Path, export_path: Path
+    ):
+        serial_path = tmp_path / "serial"
+        index_path = tmp_path / "index"
+        self.create_converter(export_path, serial_path).run()
+
+        index_path.mkdir()
+        export_dir = ExportDir(export_path, index_path)
+        user_index = UserIndex.load_or_build(
+            FileIO(), export_dir.get_users_file(), export_dir.get_user_index_file()
+        )
+        Converter(export_dir, FileIO(), CSVDataGenerator(user_index), workers=2).run()
+
+        assert self.read_outputs(index_path) == self.read_outputs(serial_path)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def shouldOnlyConvertChangedFilesInIncrementalMode(
+        self, tmp_path: Path, export_path: Path, workers: int
+    ):
+        save_path = tmp_path / "incremental"
+        converter = self.create_converter(
+            export_path, save_path, incremental=True, workers=workers
+        )
+        converter.run()
+        # change, add and remove message files
+        (export_path / "general" / "2023-01-02.json").write_text(
+            json.dumps([{"type": "message", "ts": "1672617601.000000", "text": "new"}])
+        )
+        (export_path / "general" / "2023-01-03.json").write_text(
+            json.dumps([{"type": "message", "ts": "1672704001.000000", "text": "3"}])
+        )
+        (export_path / "general" / "2023-01-01.json").unlink()
+
+        self.create_converter(
+            export_path, save_path, incremental=True, workers=workers
+        ).run()
+
+        fresh_path = tmp_path / "fresh"
+        self.create_converter(export_path, fresh_path, incremental=True).run()
+        outputs = self.read_outputs(save_path)
+        assert outputs == self.read_outputs(fresh_path)
+        messages = outputs["csv_converted_export/general/messages.csv"]
+        assert "new" in messages and "hi" not in messages
+
+    @pytest.mark.parametrize(
+        "options",
+        [{}, {"workers": 2}, {"pipelined": True}, {"streaming": True}],
+    )
+    def shouldWriteCompressedCSVFilesWithCompression(
+        self, tmp_path: Path, export_path: Path, options: Dict[str, Any]
+    ):
+        save_path = tmp_path / "compressed"
+        uncompressed_path = tmp_path / "uncompressed"
+        self.create_converter(export_path, uncompressed_path).run()
+
+        self.create_converter(
+            export_path, save_path, file_io=FileIO(csv_compression="gzip"), **options
+        ).run()
+
+        compressed_outputs = {
+            str(path.relative_to(save_path))[: -len(".gz")]: gzip.decompress(
+                path.read_bytes()
+            ).decode("utf-8")
+            for path in sorted(save_path.rglob("*.csv.gz"))
+        }
+        assert compressed_outputs == self.read_outputs(uncompressed_path)
+        assert self.read_outputs(save_path) == {}
+
+    def shouldSpliceCompressedCSVFilesInIncrementalMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        save_path = tmp_path / "incremental"
+        file_io = FileIO(csv_compression="bz2")
+        self.create_converter(
+            export_path, save_path, file_io=file_io, incremental=True
+        ).run()
+        (export_path / "general" / "2023-01-02.json").write_text(
+            json.dumps([{"type": "message", "ts": "1672617601.000000", "text": "new"}])
+        )
+
+        self.create_converter(
+            export_path, save_path, file_io=file_io, incremental=True
+        ).run()
+
+        fresh_path = tmp_path / "fresh"
+        self.create_converter(export_path, fresh_path).run()
+        messages_file = (
+            save_path / "csv_converted_export" / "general" / "messages.csv.bz2"
+        )
+        assert list(file_io.csv_read(messages_file)) == list(
+            FileIO().csv_read(
+                fresh_path / "csv_converted_export" / "general" / "messages.csv"
+            )
+        )
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {},
+            {"workers": 2},
+            {"pipelined": True},
+            {"streaming": True},
+            {"projecting": True},
+        ],
+    )
+    def shouldOnlyConvertSelectedChannelsAndDates(
+        self, tmp_path: Path, export_path: Path, options: Dict[str, Any]
+    ):
+        # files far outside the window are never opened
+        (export_path / "general" / "2022-12-01.json").write_text("invalid json")
+        save_path = tmp_path / "selected"
+        selection = ExportSelection(
+            exclude_channels=["random"],
+            since=date(2023, 1, 2),
+            until=date(2023, 1, 2),
+            timezone=timezone.utc,
+        )
+
+        self.create_converter(
+            export_path, save_path, selection=selection, **options
+        ).run()
+
+        csv_path = save_path / "csv_converted_export"
+        assert not (csv_path / "random").exists()
+        for (channel, expected_ts) in [
+            ("general", ["1672617600.000000"]),
+            ("チャンネル", []),
+        ]:
+            rows = list(FileIO().csv_read(csv_path / channel / "messages.csv"))
+            assert [row["ts"] for row in rows] == expected_ts
+        metrics = self.read_metrics(save_path)
+        # files of days next to the window are read, as they may hold messages within
+        assert metrics["total"]["files_read"] == 3
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {},
+            {"workers": 2},
+            {"streaming": True},
+            {"pipelined": True},
+            {"projecting": True},
+        ],
+    )
+    def shouldWriteRowsInOrderMessagesWerePosted(
+        self, tmp_path: Path, export_path: Path, options: Dict[str, Any]
+    ):
+        # messages out of order, and days split in a timezone ahead of UTC
+        # so that the file of a day holds messages of the day before in UTC
+        (export_path / "general" / "2023-01-02.json").write_text(
+            json.dumps(
+                [
+                    {"type": "message", "ts": "1672617600.000000", "text": "c"},
+                    {"type": "message", "ts": "1672531230.000000", "text": "b"},
+                    {"type": "message", "ts": "1672531230.000000", "text": "b2"},
+                ]
+            )
+        )
+        (export_path / "general" / "2023-01-05.json").write_text(
+            json.dumps([{"type": "message", "ts": "1672876800.000000", "text": "d"}])
+        )
+        save_path = tmp_path / "ordered"
+
+        self.create_converter(export_path, save_path, **options).run()
+
+        rows = list(
+            FileIO().csv_read(
+                save_path / "csv_converted_export" / "general" / "messages.csv"
+            )
+        )
+        assert [(row["ts"], row["テキスト"]) for row in rows] == [
+            ("1672531200.000000", "hi"),
+            ("1672531230.000000", "b"),
+            ("1672531230.000000", "b2"),
+            ("1672531260.000000", "yo"),
+            ("1672617600.000000", "c"),
+            ("1672876800.000000", "d"),
+        ]
+
+    def shouldOrderRowsWithinEachMessageFileInIncrementalMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        (export_path / "general" / "2023-01-02.json").write_text(
+            json.dumps(
+                [
+                    {"type": "message", "ts": "1672617660.000000", "text": "b"},
+                    {"type": "message", "ts": "1672617600.000000", "text": "a"},
+                ]
+            )
+        )
+        save_path = tmp_path / "incremental"
+
+        self.create_converter(export_path, save_path, incremental=True).run()
+
+        rows = list(
+            FileIO().csv_read(
+                save_path / "csv_converted_export" / "general" / "messages.csv"
+            )
+        )
+        assert [row["テキスト"] for row in rows] == ["hi", "yo", "a", "b"]
+
+    def shouldThrowWhenDatesAreSelectedInIncrementalMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        with pytest.raises(ConverterException):
+            self.create_converter(
+                export_path,
+                tmp_path / "out",
+                selection=ExportSelection(since=date(2023, 1, 2)),
+                incremental=True,
+            )
+
+        # channels alone can be selected
+        self.create_converter(
+            export_path,
+            tmp_path / "out",
+            selection=ExportSelection(include_channels=["general"]),
+            incremental=True,
+        ).run()
+
+    def shouldNotReadUnchangedFilesInIncrementalMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        save_path = tmp_path / "incremental"
+        self.create_converter(export_path, save_path, incremental=True).run()
+        outputs = self.read_outputs(save_path)
+        converter = self.create_converter(export_path, save_path, incremental=True)
+
+        with patch.object(converter._file_io, "iter_json_array") as iter_json_array:
+            converter.run()
+
+            iter_json_array.assert_not_called()
+
+        assert self.read_outputs(save_path) == outputs
+
+    def shouldKeepChannelsLeftOutBySelectionInIncrementalMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        save_path = tmp_path / "incremental"
+        self.create_converter(export_path, save_path, incremental=True).run()
+        outputs = self.read_outputs(save_path)
+        self.create_converter(
+            export_path,
+            save_path,
+            selection=ExportSelection(include_channels=["general"]),
+            incremental=True,
+        ).run()
+        converter = self.create_converter(export_path, save_path, incremental=True)
+
+        with patch.object(converter._file_io, "iter_json_array") as iter_json_array:
+            converter.run()
+
+            iter_json_array.assert_not_called()
+
+        assert self.read_outputs(save_path) == outputs
+
+    def shouldConvertEverythingWhenCSVFilesAreMissingInIncrementalMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        save_path = tmp_path / "incremental"
+        self.create_converter(export_path, save_path, incremental=True).run()
+        outputs = self.read_outputs(save_path)
+        (save_path / "csv_converted_export" / "random" / "messages.csv").unlink()
+
+        self.create_converter(export_path, save_path, incremental=True).run()
+
+        assert self.read_outputs(save_path) == outputs
+
+    def shouldRemoveManifestInFullConversion(self, tmp_path: Path, export_path: Path):
+        save_path = tmp_path / "incremental"
+        self.create_converter(export_path, save_path, incremental=True).run()
+        manifest_file = save_path / "csv_converted_export" / "manifest.json"
+        assert manifest_file.exists()
+
+        self.create_converter(export_path, save_path).run()
+
+        assert not manifest_file.exists()
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def shouldProduceSameOutputFromZipArchive(
+        self, tmp_path: Path, export_path: Path, workers: int
+    ):
+        # files large enough to be read in several chunks, which processes reading
+        # through a shared offset of the archive would interleave
+        for channel in self.TEST_CHANNEL_MESSAGES:
+            for day in range(10, 20):
+                messages = [
+                    {
+                        "type": "message",
+                        "ts": f"{1673308800 + (day - 10) * 86400 + x}.000000",
+                        "text": f"message {x} " * 20,
+                    }
+                    for x in range(300)
+                ]
+                (export_path / channel / f"2023-01-{day}.json").write_text(
+                    json.dumps(messages)
+                )
+        archive_path = tmp_path / "export.zip"
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for file in export_path.rglob("*"):
+                archive.write(file, file.relative_to(export_path).as_posix())
+        directory_path = tmp_path / "directory"
+        archive_save_path = tmp_path / "archive"
+
+        self.create_converter(export_path, directory_path, incremental=True).run()
+        self.create_converter(
+            archive_path, archive_save_path, incremental=True, workers=workers
+        ).run()
+
+        outputs = self.read_outputs(archive_save_path)
+        assert len(outputs) == len(self.TEST_CHANNEL_MESSAGES) * 2
+        assert outputs == self.read_outputs(directory_path)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def shouldDownloadFilesSharedByChannelsOnceWithAttachmentStore(
+        self, tmp_path: Path, export_path: Path, workers: int
+    ):
+        shared_file = {
+            "id": "F1",
+            "created": 1672531200,
+            "name": "shared.png",
+            "size": 5,
+            "url_private": "https://example.com/F1/shared.png",
+        }
+        for channel in ["general", "random"]:
+            (export_path / channel / "2023-01-05.json").write_text(
+                json.dumps(
+                    [
+                        {
+                            "type": "message",
+                            "ts": "1672876800.000000",
+                            "text": "look",
+                            "files": [shared_file],
+                        }
+                    ]
+                )
+            )
+        # downloads are logged to a file, as they may happen in worker processes
+        download_log = tmp_path / "downloads.log"
+
+        def download(self, url: str, file_path: Path):
+            with download_log.open("a") as fp:
+                fp.write(f"{url}\n")
+            file_path.write_bytes(b"image")
+            return 5
+
+        save_path = tmp_path / "store"
+        save_path.mkdir()
+        export_dir = ExportDir(export_path, save_path)
+        file_io = FileIO()
+        # file names are prefixed with upload times in the timezone, JST here
+        csv_data_generator = CSVDataGenerator(
+            self.TEST_USERS,
+            attachment_fields=CSVDataGenerator.get_default_attachment_fields()
+            + [AttachmentStore.FIELD],
+            timezone=timezone(timedelta(hours=9)),
+        )
+        attachment_store = AttachmentStore(file_io, export_dir.get_csv_path())
+        converter = Converter(
+            export_dir,
+            file_io,
+            csv_data_generator,
+            workers=workers,
+            attachment_store=attachment_store,
+        )
+
+        with patch.object(FileIO, "download", new=download):
+            converter.run()
+
+        assert download_log.read_text().splitlines() == [shared_file["url_private"]]
+        csv_path = save_path / "csv_converted_export"
+        canonical_path = "attachments.store/by-id/F1/20230101090000_5_shared.png"
+        for channel in ["general", "random"]:
+            attachments = (csv_path / channel / "attachments.csv").read_text()
+            assert f'"{canonical_path}"' in attachments
+            channel_file = csv_path / channel / "attachments" / Path(canonical_path).name
+            assert channel_file.samefile(csv_path / canonical_path)
+
+    @pytest.mark.parametrize(
+        "options", [{}, {"workers": 2}, {"pipelined": True}, {"streaming": True}]
+    )
+    def shouldWriteProfileOfEachStageWithProfiler(
+        self, tmp_path: Path, export_path: Path, options: Dict[str, Any]
+    ):
+        save_path = tmp_path / "profiled"
+        unprofiled_path = tmp_path / "unprofiled"
+        self.create_converter(export_path, unprofiled_path).run()
+
+        self.create_converter(
+            export_path, save_path, profiler=Profiler(trace_memory=True), **options
+        ).run()
+
+        assert self.read_outputs(save_path) == self.read_outputs(unprofiled_path)
+        profile_path = save_path / "csv_converted_export" / "conversion.profile"
+        for stage in Profiler.STAGES:
+            assert pstats.Stats(str(profile_path / f"{stage}.pstats")).total_calls > 0
+        summary = (profile_path / "summary.txt").read_text(encoding="utf-8")
+        for channel in self.TEST_CHANNEL_MESSAGES.keys():
+            assert f"#{channel}" in summary
+
+    def shouldNotWriteProfileWithoutProfiler(self, tmp_path: Path, export_path: Path):
+        save_path = tmp_path / "unprofiled"
+
+        self.create_converter(export_path, save_path).run()
+
+        assert not (save_path / "csv_converted_export" / "conversion.profile").exists()
+
+    @pytest.mark.parametrize(
+        "options", [{}, {"workers": 2}, {"pipelined": True}, {"streaming": True}]
+    )
+    def shouldWriteRowsToDatabaseWithSQLiteSink(
+        self, tmp_path: Path, export_path: Path, options: Dict[str, Any]
+    ):
+        save_path = tmp_path / "database"
+        save_path.mkdir()
+        database_file = save_path / "workspace.sqlite3"
+        generator = CSVDataGenerator(self.TEST_USERS)
+        sqlite_sink = SQLiteSink(
+            database_file,
+            generator.get_message_fields(),
+            generator.get_attachment_fields(),
+        )
+
+        self.create_converter(
+            export_path, save_path, sqlite_sink=sqlite_sink, **options
+        ).run()
+
+        outputs = self.read_outputs(save_path)
+        with sqlite3.connect(str(database_file)) as connection:
+            for channel in self.TEST_CHANNEL_MESSAGES.keys():
+                rows = connection.execute(
+                    "SELECT * FROM messages WHERE channel = ? ORDER BY ts", [channel]
+                ).fetchall()
+                csv_rows = list(
+                    csv.reader(
+                        io.StringIO(
+                            outputs[f"csv_converted_export/{channel}/messages.csv"]
+                        ),
+                        escapechar="\\",
+                        doublequote=False,
+                    )
+                )[1:]
+                assert [list(row[1:]) for row in rows] == sorted(csv_rows)
+            indexes = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            ).fetchall()
+            assert ("messages_ts",) in indexes
+
+    def shouldThrowWhenSQLiteSinkIsUsedInIncrementalMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        sqlite_sink = SQLiteSink(tmp_path / "workspace.sqlite3", [], [])
+
+        with pytest.raises(ConverterException):
+            self.create_converter(
+                export_path, tmp_path / "out", incremental=True, sqlite_sink=sqlite_sink
+            )
+
+    @pytest.mark.parametrize(
+        "options", [{}, {"workers": 2}, {"pipelined": True}, {"streaming": True}]
+    )
+    def shouldIndexTextOfMessagesWithSearchIndex(
+        self, tmp_path: Path, export_path: Path, options: Dict[str, Any]
+    ):
+        save_path = tmp_path / "search"
+        save_path.mkdir()
+        index_file = save_path / "search.sqlite3"
+        generator = CSVDataGenerator(self.TEST_USERS)
+        search_index = SearchIndex(index_file, generator.get_message_fields())
+
+        self.create_converter(
+            export_path, save_path, search_index=search_index, **options
+        ).run()
+
+        outputs = self.read_outputs(save_path)
+        for channel in self.TEST_CHANNEL_MESSAGES.keys():
+            csv_rows = list(
+                csv.DictReader(
+                    io.StringIO(outputs[f"csv_converted_export/{channel}/messages.csv"]),
+                    escapechar="\\",
+                    doublequote=False,
+                )
+            )
+            for row in csv_rows:
+                assert {"channel": channel, **row} in search(
+                    index_file, row["テキスト"], channel=channel
+                )
+        assert [row["テキスト"] for row in search(index_file, "hi")] == ["hi"]
+
+    def shouldThrowWhenSearchIndexIsUsedInIncrementalMode(
+        self, tmp_path: Path, export_path: Path
+    ):
+        search_index = SearchIndex(tmp_path / "search.sqlite3", ["ts", "テキスト"])
+
+        with pytest.raises(ConverterException):
+            self.create_converter(
+                export_path,
+                tmp_path / "out",
+                incremental=True,
+                search_index=search_index,
+            )
+
+    def shouldThrowWhenAttachmentStoreHasNoColumnToPointToCopies(
+        self, tmp_path: Path, export_path: Path
+    ):
+        save_path = tmp_path / "store"
+        save_path.mkdir()
+        export_dir = ExportDir(export_path, save_path)
+
+        with pytest.raises(ConverterException):
+            Converter(
+                export_dir,
+                FileIO(),
+                CSVDataGenerator(self.TEST_USERS),
+                attachment_store=AttachmentStore(FileIO(), export_dir.get_csv_path()),
+            )
+
+    def shouldThrowWhenWorkersIsNotPositive(self, tmp_path: Path, export_path: Path):
+        with pytest.raises(ConverterException):
+            self.create_converter(export_path, tmp_path / "out", workers=0)
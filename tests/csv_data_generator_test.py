@@ -1,11 +1,13 @@
 import pytest
 from pathlib import Path
+from datetime import timezone
 import json
 
 # import logging
 
 from slack_export_csv_converter.csv_data_generator import CSVDataGenerator
 from slack_export_csv_converter.types import ExportFileContent, ExportFileElement
+from slack_export_csv_converter.exceptions import ConverterException
 
 
 # mocks
@@ -451,6 +453,175 @@ class TestGenerateAttachedFiles:
         assert len(data) == 0
 
 
+class TestCustomFields:
+    def shouldGenerateOnlyRequestedMessageFieldsInOrder(self):
+        csv_data_generator = CSVDataGenerator(
+            TEST_USERS_DATA, message_fields=["テキスト", "ts"]
+        )
+        test_messages_data = [
+            create_test_message_data(text="Some text 1", ts="1672531200.000000"),
+            create_test_message_data(text="Some text 2", ts="1672531201.000000"),
+        ]
+
+        data = csv_data_generator.generate_messages(test_messages_data)
+
+        assert csv_data_generator.get_message_fields() == ["テキスト", "ts"]
+        assert data == [
+            {"テキスト": "Some text 1", "ts": "1672531200.000000"},
+            {"テキスト": "Some text 2", "ts": "1672531201.000000"},
+        ]
+
+    def shouldGenerateOnlyRequestedAttachmentFieldsInOrder(self):
+        csv_data_generator = CSVDataGenerator(
+            TEST_USERS_DATA, attachment_fields=["url", "message_ts"]
+        )
+        test_files = create_test_files()
+        test_message_data = [
+            create_test_message_data(ts="1672531200.000000", files=test_files[0:1]),
+        ]
+
+        data = csv_data_generator.generate_attachments(test_message_data)
+
+        assert csv_data_generator.get_attachment_fields() == ["url", "message_ts"]
+        assert data == [
+            {"url": test_files[0]["url_private"], "message_ts": "1672531200.000000"}
+        ]
+
+    def shouldGenerateCanonicalPathOfAttachmentsWhenRequested(self):
+        csv_data_generator = CSVDataGenerator(
+            TEST_USERS_DATA,
+            attachment_fields=CSVDataGenerator.get_default_attachment_fields()
+            + ["canonical_path"],
+        )
+        test_files = create_test_files()[0:2]
+        test_files[0]["id"] = "F0123"
+        del test_files[1]["id"]
+        test_message_data = [create_test_message_data(files=test_files)]
+
+        data = csv_data_generator.generate_attachments(test_message_data)
+
+        assert data[0]["canonical_path"] == (
+            f"attachments.store/by-id/F0123/{data[0]['ファイル名']}"
+        )
+        assert data[1]["canonical_path"].startswith("attachments.store/by-id/url-")
+        assert "id" in csv_data_generator.get_used_keys()
+
+    def shouldKeepDefaultFieldsWhenNotSpecified(
+        self, csv_data_generator: CSVDataGenerator
+    ):
+        assert csv_data_generator.get_message_fields() == [
+            "ts",
+            "投稿日時",
+            "ユーザー",
+            "テキスト",
+            "thread_ts",
+        ]
+        assert csv_data_generator.get_attachment_fields() == [
+            "ファイル名",
+            "アップロード日時",
+            "ユーザー",
+            "message_ts",
+            "url",
+        ]
+
+    def shouldUseKeysOfRequestedFields(self):
+        csv_data_generator = CSVDataGenerator(
+            TEST_USERS_DATA, message_fields=["テキスト"], attachment_fields=["url"]
+        )
+
+        assert csv_data_generator.get_used_keys() == {
+            "type",
+            "files",
+            "url_private",
+            "text",
+        }
+
+    def shouldGenerateSameRowsFromMessagesLeftWithUsedKeysOnly(
+        self, csv_data_generator: CSVDataGenerator
+    ):
+        used_keys = csv_data_generator.get_used_keys()
+        test_messages_data = [
+            create_test_message_data(user="1234567890", files=create_test_files()),
+            create_test_message_data(type="channel_join", thread_ts="1672531200.000000"),
+        ]
+        projected_messages_data = [
+            {
+                key: (
+                    [
+                        {k: v for (k, v) in file.items() if k in used_keys}
+                        for file in value
+                    ]
+                    if key == "files"
+                    else value
+                )
+                for (key, value) in message.items()
+                if key in used_keys
+            }
+            for message in test_messages_data
+        ]
+
+        assert csv_data_generator.generate_rows(
+            projected_messages_data
+        ) == csv_data_generator.generate_rows(test_messages_data)
+
+    def shouldThrowWhenUnknownFieldIsRequested(self):
+        with pytest.raises(ConverterException):
+            CSVDataGenerator(TEST_USERS_DATA, message_fields=["ts", "unknown"])
+
+        with pytest.raises(ConverterException):
+            CSVDataGenerator(TEST_USERS_DATA, attachment_fields=["テキスト"])
+
+
+class TestGenerateRows:
+    def shouldGenerateSameRowsAsSeparateMethods(
+        self, csv_data_generator: CSVDataGenerator
+    ):
+        test_files = create_test_files()
+        test_messages_data = [
+            create_test_message_data(user="1234567890", files=test_files[0:2]),
+            create_test_message_data(user="2345678901"),
+            create_test_message_data(type="channel_join", files=test_files[2:3]),
+            create_test_message_data(user="unknown", files=test_files[3:]),
+        ]
+
+        (messages, attachments) = csv_data_generator.generate_rows(test_messages_data)
+
+        assert messages == csv_data_generator.generate_messages(test_messages_data)
+        assert attachments == csv_data_generator.generate_attachments(test_messages_data)
+        assert len(messages) == 3
+        assert len(attachments) == len(test_files)
+
+    def shouldExtractSharedValuesWhenMessageRowLacksThem(self):
+        csv_data_generator = CSVDataGenerator(TEST_USERS_DATA, message_fields=["テキスト"])
+        test_files = create_test_files()
+        test_messages_data = [
+            create_test_message_data(
+                user="1234567890", ts="1672531200.000000", files=test_files[0:1]
+            ),
+        ]
+
+        (_, attachments) = csv_data_generator.generate_rows(test_messages_data)
+
+        assert attachments[0]["ユーザー"] == "John"
+        assert attachments[0]["message_ts"] == "1672531200.000000"
+
+
+class TestTimezone:
+    def shouldConvertTimestampsInGivenTimezone(self):
+        csv_data_generator = CSVDataGenerator(TEST_USERS_DATA, timezone=timezone.utc)
+        test_files = create_test_files()
+        test_message_data = [
+            create_test_message_data(ts="1672531200.000000", files=test_files[0:1]),
+        ]
+
+        messages = csv_data_generator.generate_messages(test_message_data)
+        attachments = csv_data_generator.generate_attachments(test_message_data)
+
+        assert messages[0]["投稿日時"] == "2023-01-01 00:00:00"
+        assert attachments[0]["アップロード日時"] == "2023-01-01 00:00:00"
+        assert attachments[0]["ファイル名"].startswith("20230101000000_")
+
+
 # test data and creation functions
 def create_test_files() -> ExportFileContent:
     return [
@@ -0,0 +1,117 @@
+import pytest
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, create_autospec
+
+from slack_export_csv_converter.downloader import Downloader, DownloadResult
+from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.exceptions import ConverterException
+
+
+TEST_DOWNLOADS = [
+    (f"https://example.com/{x}.jpg", Path(f"/some/path/attachments/{x}.jpg"))
+    for x in range(20)
+]
+
+
+@pytest.fixture(scope="function")
+def file_io() -> MagicMock:
+    file_io = create_autospec(FileIO, instance=True)
+    file_io.download.return_value = 100
+
+    return file_io
+
+
+class TestDownloaderDownloadAll:
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def shouldDownloadEveryFile(self, file_io: MagicMock, max_workers: int):
+        downloader = Downloader(file_io, max_workers=max_workers)
+
+        result = downloader.download_all(TEST_DOWNLOADS)
+
+        assert file_io.download.call_count == len(TEST_DOWNLOADS)
+        for url, path in TEST_DOWNLOADS:
+            file_io.download.assert_any_call(url, path)
+        assert result == DownloadResult(
+            downloaded=len(TEST_DOWNLOADS), downloaded_bytes=100 * len(TEST_DOWNLOADS)
+        )
+        assert len(result.latencies) == len(TEST_DOWNLOADS)
+
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def shouldCountSkippedAndFailedDownloads(self, file_io: MagicMock, max_workers: int):
+        def download(url: str, path: Path):
+            index = int(path.stem)
+            if index % 5 == 0:
+                raise ConverterException("Some error")
+            if index % 2 == 0:
+                return None
+            return 100
+
+        file_io.download.side_effect = download
+        downloader = Downloader(file_io, max_workers=max_workers)
+
+        result = downloader.download_all(TEST_DOWNLOADS)
+
+        assert file_io.download.call_count == len(TEST_DOWNLOADS)
+        assert result == DownloadResult(
+            downloaded=8, skipped=8, failed=4, downloaded_bytes=800
+        )
+        # only files that were actually downloaded have their latency recorded
+        assert len(result.latencies) == 8
+
+    def shouldKeepInFlightDownloadsWithinMaxWorkers(self, file_io: MagicMock):
+        lock = threading.Lock()
+        in_flight = 0
+        max_in_flight = 0
+
+        def download(url: str, path: Path):
+            nonlocal in_flight, max_in_flight
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight -= 1
+            return 100
+
+        file_io.download.side_effect = download
+        downloader = Downloader(file_io, max_workers=3)
+
+        downloader.download_all(TEST_DOWNLOADS)
+
+        assert 1 < max_in_flight <= 3
+
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def shouldDownloadRepeatedPathOnce(self, file_io: MagicMock, max_workers: int):
+        lock = threading.Lock()
+        in_flight_paths = set()
+
+        def download(url: str, path: Path):
+            with lock:
+                assert path not in in_flight_paths
+                in_flight_paths.add(path)
+            time.sleep(0.01)
+            with lock:
+                in_flight_paths.remove(path)
+            return 100
+
+        file_io.download.side_effect = download
+        downloader = Downloader(file_io, max_workers=max_workers)
+
+        result = downloader.download_all(TEST_DOWNLOADS[:2] * 4)
+
+        assert file_io.download.call_count == 2
+        assert result == DownloadResult(downloaded=2, skipped=6, downloaded_bytes=200)
+
+    def shouldReturnEmptyResultWhenNothingToDownload(self, file_io: MagicMock):
+        downloader = Downloader(file_io, max_workers=4)
+
+        result = downloader.download_all([])
+
+        file_io.download.assert_not_called()
+        assert result == DownloadResult()
+
+    def shouldThrowWhenMaxWorkersIsNotPositive(self, file_io: MagicMock):
+        with pytest.raises(ConverterException):
+            Downloader(file_io, max_workers=0)
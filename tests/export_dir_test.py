@@ -1,8 +1,14 @@
 import pytest
+import os
+import pickle
+import zipfile
+from datetime import date
 from pathlib import Path
 from typing import List
+from unittest.mock import patch
 
 from slack_export_csv_converter.export_dir import ExportDir
+from slack_export_csv_converter.export_selection import ExportSelection
 from slack_export_csv_converter.exceptions import ConverterException
 
 
@@ -140,6 +146,36 @@ class TestExportDir:
         for file in messages:
             assert file in json_files
 
+    def shouldReturnChannelsAndMessageFilesOfSelection(
+        self, create_channels: List[Path], export_path: Path, save_path: Path
+    ):
+        for day in ["2023-01-01", "2023-01-05", "2023-01-09"]:
+            (create_channels[0] / f"{day}.json").touch()
+        selection = ExportSelection(
+            exclude_channels=["チャンネル*"], since=date(2023, 1, 3), until=date(2023, 1, 6)
+        )
+
+        export_dir = ExportDir(export_path, save_path, selection=selection)
+
+        assert export_dir.get_selection() is selection
+        assert sorted(export_dir.get_channels()) == ["channel 三", "channel1"]
+        assert sorted(export_dir.get_all_channels()) == sorted(self.TEST_CHANNELS)
+        messages = export_dir.get_message_files(create_channels[0].stem)
+        assert messages == [create_channels[0] / "2023-01-05.json"]
+        # channels left out are still known, such as for their csv files
+        assert export_dir.get_csv_channel_path("チャンネル2").exists()
+
+    def shouldReturnMessageFilesInOrderOfDays(
+        self, create_channels: List[Path], export_dir: ExportDir
+    ):
+        days = ["2023-01-10", "2022-12-31", "2023-01-02", "2023-01-01"]
+        for day in days:
+            (create_channels[0] / f"{day}.json").touch()
+
+        messages = export_dir.get_message_files(create_channels[0].stem)
+
+        assert messages == [create_channels[0] / f"{day}.json" for day in sorted(days)]
+
     def shouldReturnNoMessagesWhenChannelEmpty(
         self, create_channels: List[Path], export_dir: ExportDir
     ):
@@ -215,3 +251,131 @@ class TestExportDir:
     ):
         with pytest.raises(ConverterException):
             export_dir.get_attachments_path("NON_EXISTANT_CHANNEL")
+
+    @pytest.mark.parametrize(
+        "getter, name",
+        [
+            ("get_manifest_file", "manifest.json"),
+            ("get_user_index_file", "users.idx"),
+            ("get_metrics_file", "metrics.json"),
+            ("get_database_file", "workspace.sqlite3"),
+            ("get_search_index_file", "search.sqlite3"),
+            ("get_profile_path", "conversion.profile"),
+        ],
+    )
+    def shouldGetOutputPathInsideCSVPath(
+        self,
+        export_path: Path,
+        save_path: Path,
+        export_dir: ExportDir,
+        getter: str,
+        name: str,
+    ):
+        expected_csv_path = save_path / f"csv_converted_{str(export_path.stem)}"
+
+        output_path = getattr(export_dir, getter)()
+
+        assert output_path == expected_csv_path / name
+        assert expected_csv_path.exists()
+
+    def shouldCreateProfileDirectory(self, export_dir: ExportDir):
+        assert export_dir.get_profile_path().is_dir()
+
+    def shouldGetCSVPath(self, export_path: Path, save_path: Path, export_dir: ExportDir):
+        expected_csv_path = save_path / f"csv_converted_{str(export_path.stem)}"
+
+        csv_path = export_dir.get_csv_path()
+
+        assert csv_path == expected_csv_path
+        assert expected_csv_path.exists()
+
+
+class TestExportDirZipArchive:
+    TEST_FILES = {
+        "users.json": "[]",
+        "channels.json": "[]",
+        "channel1/2023-01-01.json": "[]",
+        "channel1/2023-01-02.json": "[]",
+        "チャンネル2/2023-01-01.json": "[]",
+        "チャンネル2/notes.txt": "",
+        "__MACOSX/channel1/._2023-01-01.json": "",
+    }
+
+    @pytest.fixture(scope="function")
+    def save_path(self, tmp_path: Path) -> Path:
+        path = tmp_path / "some" / "dir"
+        path.mkdir(parents=True)
+        return path
+
+    def create_archive(self, archive_path: Path, prefix: str = "") -> Path:
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            for name, content in self.TEST_FILES.items():
+                archive.writestr(prefix + name, content)
+
+        return archive_path
+
+    @pytest.fixture(scope="function")
+    def archive_path(self, tmp_path: Path) -> Path:
+        return self.create_archive(
+            tmp_path / "XXX Slack export Jan 1 2022 - Jan 1 2023.zip"
+        )
+
+    @pytest.fixture(scope="function")
+    def export_dir(self, archive_path: Path, save_path: Path) -> ExportDir:
+        return ExportDir(archive_path, save_path)
+
+    def shouldReturnChannelNamesFromArchive(self, export_dir: ExportDir):
+        assert sorted(export_dir.get_channels()) == ["channel1", "チャンネル2"]
+
+    def shouldReturnUsersFileInsideArchive(self, export_dir: ExportDir):
+        users_file = export_dir.get_users_file()
+
+        assert isinstance(users_file, zipfile.Path)
+        assert users_file.at == "users.json"
+
+    def shouldReturnJsonMessageFilesInsideArchive(self, export_dir: ExportDir):
+        messages = export_dir.get_message_files("channel1")
+
+        assert [file.at for file in messages] == [
+            "channel1/2023-01-01.json",
+            "channel1/2023-01-02.json",
+        ]
+
+        messages = export_dir.get_message_files("チャンネル2")
+
+        assert [file.at for file in messages] == ["チャンネル2/2023-01-01.json"]
+
+    def shouldThrowWhenChannelNotExistInArchive(self, export_dir: ExportDir):
+        with pytest.raises(ConverterException):
+            export_dir.get_message_files("NON_EXISTANT_CHANNEL")
+
+    def shouldUseArchiveNameForCSVPath(
+        self, archive_path: Path, save_path: Path, export_dir: ExportDir
+    ):
+        expected_path = save_path / f"csv_converted_{archive_path.stem}" / "channel1"
+
+        assert export_dir.get_csv_channel_path("channel1") == expected_path
+
+    def shouldLookInsideSingleWrappingFolder(self, tmp_path: Path, save_path: Path):
+        archive_path = self.create_archive(tmp_path / "export.zip", prefix="export/")
+
+        export_dir = ExportDir(archive_path, save_path)
+
+        assert sorted(export_dir.get_channels()) == ["channel1", "チャンネル2"]
+        assert export_dir.get_users_file().at == "export/users.json"
+
+    def shouldBePicklable(self, export_dir: ExportDir):
+        unpickled = pickle.loads(pickle.dumps(export_dir))
+
+        assert unpickled.get_channels() == export_dir.get_channels()
+        assert len(unpickled.get_message_files("channel1")) == 2
+
+    def shouldOpenArchiveAgainInForkedProcess(self, export_dir: ExportDir):
+        parent_file = export_dir.get_message_files("channel1")[0]
+
+        # a forked process inherits the archive along with the offset of its file
+        with patch("os.getpid", return_value=os.getpid() + 1):
+            child_file = export_dir.get_message_files("channel1")[0]
+
+        assert child_file.root is not parent_file.root
+        assert child_file.read_text() == parent_file.read_text() == "[]"
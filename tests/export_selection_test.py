@@ -0,0 +1,99 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+
+from slack_export_csv_converter.export_selection import ExportSelection
+from slack_export_csv_converter.exceptions import ConverterException
+
+JST = timezone(timedelta(hours=9))
+
+
+def ts_of(year: int, month: int, day: int, hour: int = 0, tz=JST) -> str:
+    return f"{datetime(year, month, day, hour, tzinfo=tz).timestamp():.6f}"
+
+
+class TestExportSelectionChannels:
+    def shouldIncludeEveryChannelByDefault(self):
+        selection = ExportSelection()
+
+        assert selection.includes_channel("general")
+        assert not selection.has_date_window()
+
+    def shouldIncludeChannelsMatchingPatterns(self):
+        selection = ExportSelection(include_channels=["general", "dev-*"])
+
+        assert selection.includes_channel("general")
+        assert selection.includes_channel("dev-backend")
+        assert not selection.includes_channel("random")
+        assert not selection.includes_channel("General")
+
+    def shouldExcludeChannelsMatchingPatternsOverIncludedOnes(self):
+        selection = ExportSelection(
+            include_channels=["dev-*"], exclude_channels=["*-bot", "dev-old?"]
+        )
+
+        assert selection.includes_channel("dev-backend")
+        assert not selection.includes_channel("dev-bot")
+        assert not selection.includes_channel("dev-old1")
+
+        assert not ExportSelection(exclude_channels=["random"]).includes_channel("random")
+
+
+class TestExportSelectionDates:
+    @pytest.fixture
+    def selection(self) -> ExportSelection:
+        return ExportSelection(
+            since=date(2023, 1, 10), until=date(2023, 1, 20), timezone=JST
+        )
+
+    @pytest.mark.parametrize(
+        "file_name, included, filtered",
+        [
+            ("2023-01-08.json", False, False),
+            ("2023-01-09.json", True, True),
+            ("2023-01-10.json", True, True),
+            ("2023-01-11.json", True, False),
+            ("2023-01-19.json", True, False),
+            ("2023-01-20.json", True, True),
+            ("2023-01-21.json", True, True),
+            ("2023-01-22.json", False, False),
+            ("canvas.json", True, True),
+        ],
+    )
+    def shouldSelectMessageFilesByNames(
+        self, selection: ExportSelection, file_name: str, included: bool, filtered: bool
+    ):
+        assert selection.includes_message_file(file_name) == included
+        if included:
+            assert selection.filters_messages(file_name) == filtered
+
+    def shouldSelectMessagesPostedWithinWindowInTimezone(
+        self, selection: ExportSelection
+    ):
+        # the window starts at midnight in JST, which is on the previous day in UTC
+        assert selection.includes_message({"ts": ts_of(2023, 1, 10)})
+        assert selection.includes_message({"ts": ts_of(2023, 1, 20, 23)})
+        assert not selection.includes_message({"ts": ts_of(2023, 1, 9, 23)})
+        assert not selection.includes_message({"ts": ts_of(2023, 1, 21)})
+        assert selection.includes_message({"type": "message"})
+
+    def shouldLeaveEitherEndOfWindowOpen(self):
+        since = ExportSelection(since=date(2023, 1, 10), timezone=JST)
+        until = ExportSelection(until=date(2023, 1, 10), timezone=JST)
+
+        assert since.has_date_window() and until.has_date_window()
+        assert since.includes_message_file("2030-01-01.json")
+        assert not since.filters_messages("2030-01-01.json")
+        assert not since.includes_message_file("2023-01-01.json")
+        assert until.includes_message_file("2000-01-01.json")
+        assert not until.filters_messages("2000-01-01.json")
+        assert not until.includes_message_file("2023-01-20.json")
+
+    def shouldNotFilterMessagesWithoutWindow(self):
+        selection = ExportSelection(include_channels=["general"])
+
+        assert selection.includes_message_file("2023-01-01.json")
+        assert not selection.filters_messages("2023-01-01.json")
+
+    def shouldThrowWhenWindowEndsBeforeItStarts(self):
+        with pytest.raises(ConverterException):
+            ExportSelection(since=date(2023, 1, 2), until=date(2023, 1, 1))
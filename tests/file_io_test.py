@@ -1,10 +1,20 @@
 import pytest
+import bz2
+import gzip
+import io
 import json
+import lzma
+import subprocess
+import sys
+import zipfile
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 from contextlib import contextmanager
+from typing import Iterator
+from urllib.error import HTTPError
 
 from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.http_client import HTTPClient
 from slack_export_csv_converter.exceptions import ConverterException
 
 
@@ -71,6 +81,15 @@ class TestFileIOReadJson:
         for data, expected_data in zip(data, test_json_data):
             assert data == expected_data
 
+    def shouldReadJsonFileInsideZipArchive(self, tmp_path: Path, file_io: FileIO):
+        archive_path = tmp_path / "export.zip"
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("channel/2023-01-01.json", '[{"text": "こんにちは"}]')
+
+        data = file_io.read_json(zipfile.Path(archive_path, "channel/2023-01-01.json"))
+
+        assert data == [{"text": "こんにちは"}]
+
     def shouldThrowWhenInvalidJsonFile(self, tmp_path: Path, file_io: FileIO):
         test_file = tmp_path / "test.json"
         test_file.touch()
@@ -81,6 +100,129 @@ class TestFileIOReadJson:
             file_io.read_json(test_file)
 
 
+class TestFileIOIterJsonArray:
+    TEST_JSON_ARRAY_STRING = """ [
+        {"type": "message", "text": "こんにちは\\n[1, 2]", "ts": "1672531200.000000"},
+        {"nested": {"list": [1, -2.5e3, true, false, null], "empty": {}}},
+        12345,
+        "a string with \\"quotes\\" and ] , chars",
+        [],
+        -0.125
+    ]
+    """
+
+    @pytest.fixture(autouse=True, params=["decoded at once", "streamed"])
+    def reading_mode(self, request) -> Iterator[str]:
+        threshold = FileIO._JSON_STREAMING_THRESHOLD
+        if request.param == "streamed":
+            threshold = -1
+
+        with patch.object(FileIO, "_JSON_STREAMING_THRESHOLD", threshold):
+            yield request.param
+
+    def shouldGetJsonBackendFileIsReadWith(self, file_io: FileIO, reading_mode: str):
+        backend = file_io.get_json_backend(file_size=1)
+
+        if reading_mode == "streamed":
+            assert backend == "json (streaming)"
+        else:
+            assert backend == file_io.get_json_backend()
+
+    def shouldYieldSameElementsAsReadJson(self, tmp_path: Path, file_io: FileIO):
+        test_file = tmp_path / "test.json"
+        test_file.write_text(self.TEST_JSON_ARRAY_STRING, encoding="utf-8")
+
+        elements = list(file_io.iter_json_array(test_file))
+
+        assert elements == file_io.read_json(test_file)
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16])
+    def shouldYieldSameElementsWhenElementsSpanChunks(
+        self, tmp_path: Path, file_io: FileIO, chunk_size: int
+    ):
+        test_file = tmp_path / "test.json"
+        test_file.write_text(self.TEST_JSON_ARRAY_STRING, encoding="utf-8")
+
+        with patch.object(FileIO, "_JSON_CHUNK_SIZE", chunk_size):
+            elements = list(file_io.iter_json_array(test_file))
+
+        assert elements == json.loads(self.TEST_JSON_ARRAY_STRING)
+
+    def shouldYieldElementsBeforeReadingWholeFileWhenStreamed(
+        self, tmp_path: Path, file_io: FileIO, reading_mode: str
+    ):
+        if reading_mode != "streamed":
+            pytest.skip("only streamed files are read as elements are consumed")
+        test_file = tmp_path / "test.json"
+        test_json_data = json.dumps([{"text": "x" * 100} for _ in range(1000)])
+        test_file.write_text(test_json_data, encoding="utf-8")
+        stream = io.BytesIO(test_json_data.encode("utf-8"))
+
+        with patch.object(FileIO, "_JSON_CHUNK_SIZE", 256), patch.object(
+            FileIO, "_open_binary", return_value=stream
+        ):
+            elements = file_io.iter_json_array(test_file)
+
+            assert next(elements) == {"text": "x" * 100}
+            assert stream.tell() < len(test_json_data)
+
+    def shouldOnlyKeepGivenKeysWhenKeysAreGiven(self, tmp_path: Path, file_io: FileIO):
+        test_file = tmp_path / "test.json"
+        test_file.write_text(self.TEST_JSON_ARRAY_STRING, encoding="utf-8")
+
+        elements = list(file_io.iter_json_array(test_file, keys={"type", "nested"}))
+
+        assert elements == [
+            {"type": "message"},
+            {"nested": {}},
+            12345,
+            'a string with "quotes" and ] , chars',
+            [],
+            -0.125,
+        ]
+
+    @pytest.mark.parametrize("test_json_data_string", ["[]", "  [ \n ]  "])
+    def shouldYieldNothingFromEmptyArray(
+        self, tmp_path: Path, file_io: FileIO, test_json_data_string: str
+    ):
+        test_file = tmp_path / "test.json"
+        test_file.write_text(test_json_data_string, encoding="utf-8")
+
+        assert list(file_io.iter_json_array(test_file)) == []
+
+    def shouldYieldElementsOfJsonFileInsideZipArchive(
+        self, tmp_path: Path, file_io: FileIO
+    ):
+        archive_path = tmp_path / "export.zip"
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("users.json", '[{"id": "U1"}, {"id": "U2"}]')
+
+        elements = file_io.iter_json_array(zipfile.Path(archive_path, "users.json"))
+
+        assert list(elements) == [{"id": "U1"}, {"id": "U2"}]
+
+    @pytest.mark.parametrize(
+        "test_json_data_string",
+        [
+            "invalid json content 123#!#(*!@#Y!@($*)",
+            '{"not": "an array"}',
+            '[{"text": "unterminated"}',
+            '[{"text": "missing comma"} {"text": "next"}]',
+            "[1, 2] trailing",
+            "[1, 2,]",
+            "",
+        ],
+    )
+    def shouldThrowWhenInvalidJsonArray(
+        self, tmp_path: Path, file_io: FileIO, test_json_data_string: str
+    ):
+        test_file = tmp_path / "test.json"
+        test_file.write_text(test_json_data_string, encoding="utf-8")
+
+        with pytest.raises(ConverterException):
+            list(file_io.iter_json_array(test_file))
+
+
 class TestFileIOWriteCSV:
     def shouldWriteToCSVFile(self, tmp_path: Path, file_io: FileIO):
         test_csv_data = [
@@ -218,17 +360,235 @@ class TestFileIOWriteCSV:
             assert file_content == expected_file_content
 
 
+class TestFileIOCompressCSV:
+    TEST_CSV_DATA = [
+        {"column1": "こんにちは！", "column2": '"quoted" \\'},
+        {"column1": "multi\nline", "column2": ""},
+    ]
+    TEST_CSV_FIELDS = ["column1", "column2"]
+    TEST_CSV_CONTENT = (
+        '"column1","column2"\n' '"こんにちは！","\\"quoted\\" \\\\"\n' '"multi\nline",""\n'
+    )
+    CODECS = [
+        ("gzip", gzip, ".csv.gz"),
+        ("bz2", bz2, ".csv.bz2"),
+        ("lzma", lzma, ".csv.xz"),
+    ]
+
+    @pytest.mark.parametrize("compression, module, suffix", CODECS)
+    def shouldWriteCSVFileCompressedWithCodec(
+        self, tmp_path: Path, compression, module, suffix
+    ):
+        file_io = FileIO(csv_compression=compression)
+        test_file = tmp_path / f"test{file_io.get_csv_suffix()}"
+
+        file_io.csv_write(test_file, self.TEST_CSV_FIELDS, self.TEST_CSV_DATA)
+
+        assert file_io.get_csv_suffix() == suffix
+        with module.open(test_file, "rt", encoding="utf-8", newline="") as fp:
+            assert fp.read() == self.TEST_CSV_CONTENT
+
+    @pytest.mark.parametrize("compression, module, suffix", CODECS)
+    def shouldAppendToCompressedCSVFile(
+        self, tmp_path: Path, compression, module, suffix
+    ):
+        file_io = FileIO(csv_compression=compression)
+        test_file = tmp_path / "test.csv"
+
+        file_io.csv_write(test_file, self.TEST_CSV_FIELDS, self.TEST_CSV_DATA[:1])
+        file_io.csv_write(
+            test_file, self.TEST_CSV_FIELDS, self.TEST_CSV_DATA[1:], append=True
+        )
+
+        with module.open(test_file, "rt", encoding="utf-8", newline="") as fp:
+            assert fp.read() == self.TEST_CSV_CONTENT
+        assert list(file_io.csv_read(test_file)) == self.TEST_CSV_DATA
+
+    def shouldCompressWithCompressionLevel(self, tmp_path: Path):
+        test_csv_data = [{"column1": f"row {x % 100}"} for x in range(10_000)]
+        sizes = []
+        for level in [0, 9]:
+            test_file = tmp_path / f"test_{level}.csv.gz"
+            file_io = FileIO(csv_compression="gzip", csv_compression_level=level)
+
+            file_io.csv_write(test_file, ["column1"], test_csv_data)
+
+            sizes.append(test_file.stat().st_size)
+        assert sizes[0] > sizes[1] * 10
+
+    def shouldNotCompressByDefault(self, tmp_path: Path, file_io: FileIO):
+        test_file = tmp_path / "test.csv"
+
+        file_io.csv_write(test_file, self.TEST_CSV_FIELDS, self.TEST_CSV_DATA)
+
+        assert file_io.get_csv_suffix() == ".csv"
+        assert test_file.read_text(encoding="utf-8") == self.TEST_CSV_CONTENT
+
+    @pytest.mark.parametrize(
+        "compression, level",
+        [("zip", None), ("gzip", 10), ("bz2", 0), ("lzma", -1), (None, 1)],
+    )
+    def shouldThrowWhenCompressionIsInvalid(self, compression, level):
+        with pytest.raises(ConverterException):
+            FileIO(csv_compression=compression, csv_compression_level=level)
+
+
+class TestFileIOReadCSV:
+    def shouldReadRowsWrittenByCSVWrite(self, tmp_path: Path, file_io: FileIO):
+        test_csv_data = [
+            {"column1": "hello\\nworld", "column2": '"quoted" \\'},
+            {"column1": "multi\nline", "column2": ""},
+        ]
+        test_file = tmp_path / "test.csv"
+        file_io.csv_write(test_file, ["column1", "column2"], test_csv_data)
+
+        data = list(file_io.csv_read(test_file))
+
+        assert data == test_csv_data
+
+    def shouldThrowWhenReadCSVFails(self, tmp_path: Path, file_io: FileIO):
+        with pytest.raises(ConverterException):
+            list(file_io.csv_read(tmp_path / "not_exist.csv"))
+
+
+class TestFileIOWriteJson:
+    def shouldWriteJsonReadableByReadJson(self, tmp_path: Path, file_io: FileIO):
+        test_data = {"hello": "世界", "array": [1, 2, 3]}
+        test_file = tmp_path / "test.json"
+
+        file_io.write_json(test_file, test_data)
+
+        assert file_io.read_json(test_file) == test_data
+        assert list(tmp_path.iterdir()) == [test_file]
+
+
+class TestFileIOWriteBytes:
+    def shouldWriteBytesAsTheyAre(self, tmp_path: Path, file_io: FileIO):
+        test_file = tmp_path / "test.bin"
+
+        file_io.write_bytes(test_file, b"\x00\xffbytes")
+
+        assert test_file.read_bytes() == b"\x00\xffbytes"
+
+    def shouldThrowWhenFileCannotBeWritten(self, tmp_path: Path, file_io: FileIO):
+        with pytest.raises(ConverterException):
+            file_io.write_bytes(tmp_path / "missing" / "test.bin", b"bytes")
+
+
+class TestFileIOFileInfo:
+    def shouldGetSizeAndModificationTime(self, tmp_path: Path, file_io: FileIO):
+        test_file = tmp_path / "test.json"
+        test_file.write_bytes(b"12345")
+
+        (size, mtime) = file_io.get_file_stat(test_file)
+
+        assert size == 5
+        assert mtime == test_file.stat().st_mtime_ns
+
+    def shouldHashFileContent(self, tmp_path: Path, file_io: FileIO):
+        test_file_1 = tmp_path / "test1.json"
+        test_file_2 = tmp_path / "test2.json"
+        test_file_1.write_bytes(b"12345")
+        test_file_2.write_bytes(b"12345")
+
+        assert file_io.hash_file(test_file_1) == file_io.hash_file(test_file_2)
+
+        test_file_2.write_bytes(b"12346")
+
+        assert file_io.hash_file(test_file_1) != file_io.hash_file(test_file_2)
+
+    def shouldGetFileInfoOfZipArchiveMemberFromArchive(
+        self, tmp_path: Path, file_io: FileIO
+    ):
+        archive_path = tmp_path / "export.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr(zipfile.ZipInfo("1.json", (2023, 1, 1, 0, 0, 0)), b"12345")
+            archive.writestr(zipfile.ZipInfo("2.json", (2023, 1, 1, 0, 0, 0)), b"12345")
+            archive.writestr(zipfile.ZipInfo("3.json", (2023, 1, 1, 0, 0, 0)), b"12346")
+        members = [zipfile.Path(archive_path, f"{x}.json") for x in range(1, 4)]
+
+        (size, mtime) = file_io.get_file_stat(members[0])
+
+        assert size == 5
+        assert mtime == 1672531200 * 1_000_000_000
+        assert file_io.hash_file(members[0]) == file_io.hash_file(members[1])
+        assert file_io.hash_file(members[0]) != file_io.hash_file(members[2])
+
+    def shouldRemoveAndMoveFiles(self, tmp_path: Path, file_io: FileIO):
+        test_file_1 = tmp_path / "test1.json"
+        test_file_2 = tmp_path / "test2.json"
+        test_file_1.write_bytes(b"1")
+        test_file_2.write_bytes(b"2")
+
+        file_io.move(test_file_1, test_file_2)
+
+        assert not test_file_1.exists()
+        assert test_file_2.read_bytes() == b"1"
+
+        file_io.remove(test_file_2)
+        file_io.remove(test_file_2)
+
+        assert not test_file_2.exists()
+
+    def shouldCreateLockOnlyOnce(self, tmp_path: Path, file_io: FileIO):
+        lock_path = tmp_path / "nested" / "file.lock"
+
+        assert file_io.create_lock(lock_path)
+        assert not file_io.create_lock(lock_path)
+        assert file_io.exists(lock_path)
+
+    def shouldTellWhetherProcessHoldingLockHasExited(
+        self, tmp_path: Path, file_io: FileIO
+    ):
+        lock_path = tmp_path / "file.lock"
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+
+        assert not file_io.is_lock_abandoned(lock_path)
+        file_io.create_lock(lock_path)
+        assert not file_io.is_lock_abandoned(lock_path)
+
+        lock_path.write_text(str(exited.pid))
+        assert file_io.is_lock_abandoned(lock_path)
+
+    @pytest.mark.parametrize("symbolic", [False, True])
+    def shouldLinkFileReplacingDestination(
+        self, tmp_path: Path, file_io: FileIO, symbolic: bool
+    ):
+        source_file = tmp_path / "source.png"
+        destination_file = tmp_path / "nested" / "destination.png"
+        source_file.write_bytes(b"12345")
+        destination_file.parent.mkdir()
+        destination_file.write_bytes(b"old")
+
+        file_io.link(source_file, destination_file, symbolic=symbolic)
+
+        assert destination_file.samefile(source_file)
+        assert destination_file.is_symlink() == symbolic
+        assert list(destination_file.parent.iterdir()) == [destination_file]
+
+    def shouldCopyFileWhenItCannotBeLinked(self, tmp_path: Path, file_io: FileIO):
+        source_file = tmp_path / "source.png"
+        destination_file = tmp_path / "destination.png"
+        source_file.write_bytes(b"12345")
+
+        with patch("os.link", side_effect=OSError("not supported")):
+            file_io.link(source_file, destination_file)
+
+        assert destination_file.read_bytes() == b"12345"
+        assert not destination_file.samefile(source_file)
+
+
 class TestFileIODownload:
     @contextmanager
-    def patch_urlopen(self):
+    def patch_http_client(self):
         mock = MagicMock()
-        with patch(
-            "slack_export_csv_converter.file_io.urlopen", new=mock
-        ) as urlopen_mock:
-            urlopen_mock.return_value.__enter__.return_value.read.return_value = (
-                b"Some bytes"
-            )
-            yield urlopen_mock
+        with patch.object(HTTPClient, "open", new=mock) as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            response.status = 200
+            response.headers = {}
+            response.read.side_effect = [b"Some bytes", b""]
+            yield open_mock
 
     @pytest.mark.skip()
     def shouldDownloadFile(self, tmp_path: Path, file_io: FileIO):
@@ -246,10 +606,21 @@ class TestFileIODownload:
         expected_file_path = tmp_path / "somge_img.jpg"
         expected_file_path.touch()
 
-        with self.patch_urlopen() as urlopen_mock:
-            file_io.download(image_url, expected_file_path)
+        with self.patch_http_client() as open_mock:
+            downloaded_size = file_io.download(image_url, expected_file_path)
+
+            open_mock.assert_not_called()
+            assert downloaded_size is None
 
-            urlopen_mock.assert_not_called()
+    def shouldReturnDownloadedSize(self, tmp_path: Path, file_io: FileIO):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+
+        with self.patch_http_client():
+            downloaded_size = file_io.download(image_url, expected_file_path)
+
+        assert downloaded_size == len(b"Some bytes")
+        assert expected_file_path.read_bytes() == b"Some bytes"
 
     def shouldRaiseConverterExceptioNWhenSomethingGoesWrong(
         self, tmp_path: Path, file_io: FileIO
@@ -258,18 +629,191 @@ class TestFileIODownload:
         expected_file_path = tmp_path / "somge_img.jpg"
         error = Exception("Some error")
 
-        with self.patch_urlopen() as urlopen_mock:
-            urlopen_mock.reset_mock(side_effect=True, return_value=True)
-            urlopen_mock.side_effect = error
+        with self.patch_http_client() as open_mock:
+            open_mock.reset_mock(side_effect=True, return_value=True)
+            open_mock.side_effect = error
 
             with pytest.raises(ConverterException):
                 file_io.download(image_url, expected_file_path)
 
-        with self.patch_urlopen() as urlopen_mock:
-            urlopen_mock.return_value.__enter__.return_value.read.reset_mock(
+        with self.patch_http_client() as open_mock:
+            open_mock.return_value.__enter__.return_value.read.reset_mock(
                 return_value=True
             )
-            urlopen_mock.return_value.__enter__.return_value.read.side_effect = error
+            open_mock.return_value.__enter__.return_value.read.side_effect = error
 
             with pytest.raises(ConverterException):
                 file_io.download(image_url, expected_file_path)
+
+    def shouldStreamResponseInChunks(self, tmp_path: Path, file_io: FileIO):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+        chunks = [b"first ", b"second ", b"third", b""]
+
+        with self.patch_http_client() as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            response.read.side_effect = chunks
+
+            downloaded_size = file_io.download(image_url, expected_file_path)
+
+            for call in response.read.call_args_list:
+                (args, _) = call
+                assert args[0] == FileIO._DOWNLOAD_CHUNK_SIZE
+
+        assert downloaded_size == len(b"first second third")
+        assert expected_file_path.read_bytes() == b"first second third"
+
+    def shouldLeavePartialFileWhenDownloadIsInterrupted(
+        self, tmp_path: Path, file_io: FileIO
+    ):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+        partial_file_path = tmp_path / "somge_img.jpg.part"
+
+        with self.patch_http_client() as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            response.read.side_effect = [b"first ", ConnectionResetError()]
+
+            with pytest.raises(ConverterException):
+                file_io.download(image_url, expected_file_path)
+
+        assert not expected_file_path.exists()
+        assert partial_file_path.read_bytes() == b"first "
+
+    def shouldResumeFromPartialFileWithRangeRequest(
+        self, tmp_path: Path, file_io: FileIO
+    ):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+        partial_file_path = tmp_path / "somge_img.jpg.part"
+        partial_file_path.write_bytes(b"first ")
+        validator_file_path = tmp_path / "somge_img.jpg.part.validator"
+        validator_file_path.write_text('"etag"')
+
+        with self.patch_http_client() as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            response.status = 206
+            response.headers = {"Content-Range": "bytes 6-11/12"}
+            response.read.side_effect = [b"second", b""]
+
+            downloaded_size = file_io.download(image_url, expected_file_path)
+
+            request = open_mock.call_args.args[0]
+            assert request.get_header("Range") == "bytes=6-"
+            assert request.get_header("If-range") == '"etag"'
+
+        assert downloaded_size == len(b"second")
+        assert expected_file_path.read_bytes() == b"first second"
+        assert not partial_file_path.exists()
+        assert not validator_file_path.exists()
+
+    @pytest.mark.parametrize(
+        "headers, validator",
+        [
+            ({"ETag": '"etag"', "Last-Modified": "Sun, 01 Jan 2023"}, '"etag"'),
+            (
+                {"ETag": 'W/"etag"', "Last-Modified": "Sun, 01 Jan 2023"},
+                "Sun, 01 Jan 2023",
+            ),
+            ({}, None),
+        ],
+    )
+    def shouldKeepValidatorOfInterruptedDownload(
+        self, tmp_path: Path, file_io: FileIO, headers, validator
+    ):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+        validator_file_path = tmp_path / "somge_img.jpg.part.validator"
+
+        with self.patch_http_client() as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            response.headers = headers
+            response.read.side_effect = [b"first ", ConnectionResetError()]
+
+            with pytest.raises(ConverterException):
+                file_io.download(image_url, expected_file_path)
+
+        if validator is None:
+            assert not validator_file_path.exists()
+        else:
+            assert validator_file_path.read_text() == validator
+
+    def shouldStartOverWithoutValidator(self, tmp_path: Path, file_io: FileIO):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+        (tmp_path / "somge_img.jpg.part").write_bytes(b"first ")
+
+        with self.patch_http_client() as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            response.read.side_effect = [b"whole file", b""]
+
+            file_io.download(image_url, expected_file_path)
+
+            assert open_mock.call_args.args[0].get_header("Range") is None
+
+        assert expected_file_path.read_bytes() == b"whole file"
+
+    def shouldRestartWhenServerIgnoresRangeRequest(self, tmp_path: Path, file_io: FileIO):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+        partial_file_path = tmp_path / "somge_img.jpg.part"
+        partial_file_path.write_bytes(b"stale ")
+        # servers send the whole file as well when it changed since
+        (tmp_path / "somge_img.jpg.part.validator").write_text('"old etag"')
+
+        with self.patch_http_client() as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            response.status = 200
+            response.headers = {"ETag": '"new etag"'}
+            response.read.side_effect = [b"whole file", b""]
+
+            file_io.download(image_url, expected_file_path)
+
+            assert open_mock.call_args.args[0].get_header("If-range") == '"old etag"'
+
+        assert expected_file_path.read_bytes() == b"whole file"
+        assert not partial_file_path.exists()
+
+    @pytest.mark.parametrize("content_range", ["bytes 0-11/12", None])
+    def shouldRestartWhenServerSendsAnotherRange(
+        self, tmp_path: Path, file_io: FileIO, content_range
+    ):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+        partial_file_path = tmp_path / "somge_img.jpg.part"
+        partial_file_path.write_bytes(b"first ")
+        (tmp_path / "somge_img.jpg.part.validator").write_text('"etag"')
+
+        with self.patch_http_client() as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            response.status = 206
+            response.headers = {"Content-Range": content_range}
+            response.read.side_effect = [b"first second", b""]
+
+            file_io.download(image_url, expected_file_path)
+
+            assert open_mock.call_count == 2
+            assert open_mock.call_args.args[0].get_header("Range") is None
+
+        assert expected_file_path.read_bytes() == b"first second"
+        assert not partial_file_path.exists()
+
+    def shouldRestartWhenRangeIsNotSatisfiable(self, tmp_path: Path, file_io: FileIO):
+        image_url = "https://picsum.photos/100"
+        expected_file_path = tmp_path / "somge_img.jpg"
+        partial_file_path = tmp_path / "somge_img.jpg.part"
+        partial_file_path.write_bytes(b"too long partial file")
+        (tmp_path / "somge_img.jpg.part.validator").write_text('"etag"')
+        not_satisfiable = HTTPError(image_url, 416, "Range Not Satisfiable", {}, None)
+
+        with self.patch_http_client() as open_mock:
+            response = open_mock.return_value.__enter__.return_value
+            open_mock.side_effect = [not_satisfiable, open_mock.return_value]
+            response.read.side_effect = [b"whole file", b""]
+
+            file_io.download(image_url, expected_file_path)
+
+            assert open_mock.call_count == 2
+            assert open_mock.call_args.args[0].get_header("Range") is None
+
+        assert expected_file_path.read_bytes() == b"whole file"
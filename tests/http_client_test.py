@@ -0,0 +1,216 @@
+import pickle
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import Request
+
+import pytest
+
+from slack_export_csv_converter.http_client import HTTPClient
+
+TEST_BODY = b"Some bytes"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        self.server.connections += 1
+        super().setup()
+
+    def do_CONNECT(self) -> None:
+        self.server.proxy_authorizations.append(self.headers.get("Proxy-Authorization"))
+        # tunnels are refused, as the stub does not speak TLS
+        self._respond(407, b"")
+        self.close_connection = True
+
+    def do_GET(self) -> None:
+        self.server.authorizations.append(self.headers.get("Authorization"))
+        self.server.proxy_authorizations.append(self.headers.get("Proxy-Authorization"))
+        self.server.paths.append(self.path)
+        if self.path == "/redirect":
+            self._respond(302, b"", Location="/file")
+        elif self.path == "/redirect-to-other-host":
+            self._respond(302, b"", Location=self.server.url("/file", "localhost"))
+        elif self.path == "/missing":
+            self._respond(404, b"Not found")
+        elif self.path == "/close":
+            self._respond(200, TEST_BODY, Connection="close")
+        elif self.path == "/drop":
+            # closes the connection without telling the client
+            self._respond(200, TEST_BODY)
+            self.close_connection = True
+        else:
+            self._respond(200, TEST_BODY)
+
+    def _respond(self, status: int, body: bytes, **headers: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Answers requests on a background thread, recording what it received.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.connections = 0
+        self.authorizations: List[str] = []
+        self.proxy_authorizations: List[str] = []
+        self.paths: List[str] = []
+        threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        ).start()
+
+    def url(self, path: str, host: str = "127.0.0.1", userinfo: str = "") -> str:
+        return f"http://{userinfo}{host}:{self.server_address[1]}{path}"
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+@pytest.fixture
+def server() -> Iterator[StubServer]:
+    server = StubServer()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def http_client() -> Iterator[HTTPClient]:
+    http_client = HTTPClient(token="xoxp-token")
+    yield http_client
+    http_client.close()
+
+
+def get(http_client: HTTPClient, url: str) -> bytes:
+    with http_client.open(Request(url)) as response:
+        return response.read()
+
+
+class TestHTTPClientOpen:
+    def shouldReuseConnectionForRequestsToSameHost(
+        self, server: StubServer, http_client: HTTPClient
+    ):
+        for _ in range(3):
+            assert get(http_client, server.url("/file")) == TEST_BODY
+
+        assert server.connections == 1
+        assert http_client.get_opened_connections() == 1
+
+    def shouldOpenNewConnectionWhenServerClosesIt(
+        self, server: StubServer, http_client: HTTPClient
+    ):
+        for _ in range(3):
+            assert get(http_client, server.url("/close")) == TEST_BODY
+
+        assert server.connections == 3
+
+    def shouldNotReuseConnectionWhenResponseIsNotReadToTheEnd(
+        self, server: StubServer, http_client: HTTPClient
+    ):
+        with http_client.open(Request(server.url("/file"))) as response:
+            response.read(1)
+        get(http_client, server.url("/file"))
+
+        assert server.connections == 2
+
+    def shouldRetryWhenIdleConnectionWasClosed(
+        self, server: StubServer, http_client: HTTPClient
+    ):
+        get(http_client, server.url("/drop"))
+
+        assert get(http_client, server.url("/file")) == TEST_BODY
+        assert server.connections == 2
+
+    def shouldSendHeadersOfRequestAndBearerToken(
+        self, server: StubServer, http_client: HTTPClient
+    ):
+        with http_client.open(
+            Request(server.url("/file"), headers={"Range": "bytes=1-"})
+        ) as response:
+            response.read()
+
+        assert server.authorizations == ["Bearer xoxp-token"]
+
+    def shouldFollowRedirects(self, server: StubServer, http_client: HTTPClient):
+        assert get(http_client, server.url("/redirect")) == TEST_BODY
+        assert server.authorizations == ["Bearer xoxp-token", "Bearer xoxp-token"]
+        assert server.connections == 1
+
+    def shouldNotSendTokenToOtherHostsWhenRedirected(
+        self, server: StubServer, http_client: HTTPClient
+    ):
+        assert get(http_client, server.url("/redirect-to-other-host")) == TEST_BODY
+        assert server.authorizations == ["Bearer xoxp-token", None]
+
+    def shouldRaiseHTTPErrorWhenResponseIsNotSuccessful(
+        self, server: StubServer, http_client: HTTPClient
+    ):
+        with pytest.raises(HTTPError) as error:
+            get(http_client, server.url("/missing"))
+
+        assert error.value.code == 404
+        assert error.value.read() == b"Not found"
+        # connection is still reused after the error
+        get(http_client, server.url("/file"))
+        assert server.connections == 1
+
+    def shouldKeepSettingsWhenPickled(self, server: StubServer, http_client: HTTPClient):
+        unpickled_http_client = pickle.loads(pickle.dumps(http_client))
+
+        get(unpickled_http_client, server.url("/file"))
+
+        assert server.authorizations == ["Bearer xoxp-token"]
+
+
+class TestHTTPClientProxy:
+    # "user:p@ss" percent-encoded
+    TEST_PROXY_USERINFO = "user:p%40ss@"
+    TEST_PROXY_AUTHORIZATION = "Basic dXNlcjpwQHNz"
+
+    def shouldSendCredentialsOfProxyWithPlainHTTPRequests(self, server: StubServer):
+        proxy_url = server.url("", userinfo=self.TEST_PROXY_USERINFO)
+        # proxies are taken only from the variables given
+        with patch.dict("os.environ", {"http_proxy": proxy_url}, clear=True):
+            http_client = HTTPClient()
+            try:
+                assert get(http_client, "http://example.invalid/file") == TEST_BODY
+            finally:
+                http_client.close()
+
+        assert server.paths == ["http://example.invalid/file"]
+        assert server.proxy_authorizations == [self.TEST_PROXY_AUTHORIZATION]
+
+    def shouldSendCredentialsOfProxyWhenOpeningTunnel(self, server: StubServer):
+        proxy_url = server.url("", userinfo=self.TEST_PROXY_USERINFO)
+        with patch.dict("os.environ", {"https_proxy": proxy_url}, clear=True):
+            http_client = HTTPClient()
+            with pytest.raises(OSError):
+                get(http_client, "https://example.invalid/file")
+
+        assert server.proxy_authorizations == [self.TEST_PROXY_AUTHORIZATION]
+
+    def shouldNotSendCredentialsWhenProxyHasNone(self, server: StubServer):
+        with patch.dict("os.environ", {"http_proxy": server.url("")}, clear=True):
+            http_client = HTTPClient()
+            try:
+                get(http_client, "http://example.invalid/file")
+            finally:
+                http_client.close()
+
+        assert server.proxy_authorizations == [None]
@@ -0,0 +1,81 @@
+import pytest
+import json
+import pickle
+from pathlib import Path
+
+from slack_export_csv_converter.json_decoder import (
+    JSONDecoder,
+    get_available_backends,
+)
+from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.exceptions import ConverterException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+requires_orjson = pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+
+TEST_JSON_DATA = b'[{"text": "\xe3\x81\x93\xe3\x82\x93\xe3\x81\xab\xe3\x81\xa1\xe3\x81\xaf", "ts": "1672531200.000000", "n": [1, -2.5, true, null]}]'
+
+
+class TestJSONDecoder:
+    @pytest.mark.parametrize("backend", get_available_backends())
+    def shouldDecodeSameObjectWithEveryBackend(self, backend: str):
+        json_decoder = JSONDecoder(backend)
+
+        assert json_decoder.get_backend() == backend
+        assert json_decoder.loads(TEST_JSON_DATA) == json.loads(TEST_JSON_DATA)
+
+    @pytest.mark.parametrize("backend", get_available_backends())
+    def shouldRaiseJSONDecodeErrorWithEveryBackend(self, backend: str):
+        with pytest.raises(json.JSONDecodeError):
+            JSONDecoder(backend).loads(b'[{"text": ')
+
+    @pytest.mark.parametrize("backend", get_available_backends())
+    def shouldOnlyKeepGivenKeysAtAnyDepthWhenKeysAreGiven(self, backend: str):
+        test_json_data = b"""[
+            {"type": "message", "text": "hi", "blocks": [{"type": "rich_text"}],
+             "files": [{"name": "a.png", "thumb_64": "https://example.com"}]},
+            {"type": "message", "user_profile": {"name": "x"}}
+        ]"""
+
+        data = JSONDecoder(backend).loads(
+            test_json_data, {"type", "text", "files", "name"}
+        )
+
+        assert data == [
+            {"type": "message", "text": "hi", "files": [{"name": "a.png"}]},
+            {"type": "message"},
+        ]
+        # projecting is done with the standard library whichever backend is in use
+        assert JSONDecoder(backend).get_backend(projecting=True) == "json (projecting)"
+
+    def shouldAlwaysHaveStandardLibraryBackend(self):
+        assert get_available_backends()[-1] == "json"
+
+    @requires_orjson
+    def shouldPreferOrjsonWhenInstalled(self):
+        assert JSONDecoder().get_backend() == "orjson"
+
+    def shouldThrowWhenBackendIsUnavailable(self):
+        with pytest.raises(ConverterException):
+            JSONDecoder("unknown")
+
+    @pytest.mark.parametrize("backend", get_available_backends())
+    def shouldBePicklable(self, backend: str):
+        json_decoder = pickle.loads(pickle.dumps(JSONDecoder(backend)))
+
+        assert json_decoder.get_backend() == backend
+        assert json_decoder.loads(TEST_JSON_DATA) == json.loads(TEST_JSON_DATA)
+
+    def shouldBeUsedByFileIO(self, tmp_path: Path):
+        test_file = tmp_path / "test.json"
+        test_file.write_bytes(TEST_JSON_DATA)
+        file_io = FileIO(json_decoder=JSONDecoder("json"))
+
+        assert file_io.get_json_backend() == "json"
+        assert file_io.get_json_backend(projecting=True) == "json (projecting)"
+        assert file_io.read_json(test_file) == json.loads(TEST_JSON_DATA)
+        assert list(file_io.iter_json_array(test_file)) == json.loads(TEST_JSON_DATA)
@@ -0,0 +1,138 @@
+import pytest
+from pathlib import Path
+from typing import List
+
+from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.manifest import Manifest
+
+
+TEST_MESSAGE_FIELDS = ["ts", "テキスト"]
+TEST_ATTACHMENT_FIELDS = ["ファイル名", "url"]
+
+
+@pytest.fixture(scope="function")
+def file_io() -> FileIO:
+    return FileIO()
+
+
+@pytest.fixture(scope="function")
+def message_files(tmp_path: Path) -> List[Path]:
+    message_files = []
+    for x in range(3):
+        message_file = tmp_path / f"2023-01-0{x + 1}.json"
+        message_file.write_text(f'[{{"text": "{x}"}}]')
+        message_files.append(message_file)
+
+    return message_files
+
+
+def convert_all(entries, counts=(1, 0)):
+    return {
+        name: {**entry, "messages": counts[0], "attachments": counts[1]}
+        for (name, entry) in entries.items()
+    }
+
+
+class TestManifestFindChanges:
+    def shouldReportEveryFileAsChangedWhenNothingIsRecorded(
+        self, file_io: FileIO, message_files: List[Path]
+    ):
+        (entries, changed_files) = Manifest.find_changes(file_io, message_files, {})
+
+        assert changed_files == message_files
+        assert list(entries.keys()) == [file.name for file in message_files]
+        for message_file in message_files:
+            entry = entries[message_file.name]
+            assert entry["size"] == message_file.stat().st_size
+            assert entry["mtime"] == message_file.stat().st_mtime_ns
+            assert entry["hash"] == file_io.hash_file(message_file)
+
+    def shouldNotReportUnchangedFiles(self, file_io: FileIO, message_files: List[Path]):
+        (entries, _) = Manifest.find_changes(file_io, message_files, {})
+        entries = convert_all(entries)
+
+        (new_entries, changed_files) = Manifest.find_changes(
+            file_io, message_files, entries
+        )
+
+        assert changed_files == []
+        assert new_entries == entries
+
+    def shouldReportFilesWithChangedContent(
+        self, file_io: FileIO, message_files: List[Path]
+    ):
+        (entries, _) = Manifest.find_changes(file_io, message_files, {})
+        entries = convert_all(entries)
+        message_files[1].write_text('[{"text": "changed"}]')
+
+        (new_entries, changed_files) = Manifest.find_changes(
+            file_io, message_files, entries
+        )
+
+        assert changed_files == [message_files[1]]
+        assert "messages" not in new_entries[message_files[1].name]
+        assert new_entries[message_files[0].name] == entries[message_files[0].name]
+
+    def shouldNotReportFilesOnlyTouched(self, file_io: FileIO, message_files: List[Path]):
+        (entries, _) = Manifest.find_changes(file_io, message_files, {})
+        entries = convert_all(entries)
+        for entry in entries.values():
+            entry["mtime"] -= 1000
+
+        (new_entries, changed_files) = Manifest.find_changes(
+            file_io, message_files, entries
+        )
+
+        assert changed_files == []
+        for message_file in message_files:
+            entry = new_entries[message_file.name]
+            assert entry["mtime"] == message_file.stat().st_mtime_ns
+            assert entry["messages"] == 1
+
+
+class TestManifestSaveLoad:
+    def shouldLoadWhatWasSaved(self, tmp_path: Path, file_io: FileIO):
+        manifest_file = tmp_path / "manifest.json"
+        manifest = Manifest(TEST_MESSAGE_FIELDS, TEST_ATTACHMENT_FIELDS)
+        entries = {"2023-01-01.json": {"size": 1, "mtime": 2, "hash": "x"}}
+        manifest.set_channel("general", entries)
+
+        manifest.save(file_io, manifest_file)
+        loaded = Manifest.load(
+            file_io, manifest_file, TEST_MESSAGE_FIELDS, TEST_ATTACHMENT_FIELDS
+        )
+
+        assert loaded.get_channel("general") == entries
+        assert loaded.get_channel("random") == {}
+
+    def shouldLoadEmptyManifestWhenFileNotExist(self, tmp_path: Path, file_io: FileIO):
+        manifest = Manifest.load(
+            file_io,
+            tmp_path / "manifest.json",
+            TEST_MESSAGE_FIELDS,
+            TEST_ATTACHMENT_FIELDS,
+        )
+
+        assert manifest.get_channel("general") == {}
+
+    def shouldDiscardManifestSavedForDifferentFields(
+        self, tmp_path: Path, file_io: FileIO
+    ):
+        manifest_file = tmp_path / "manifest.json"
+        manifest = Manifest(TEST_MESSAGE_FIELDS, TEST_ATTACHMENT_FIELDS)
+        manifest.set_channel("general", {"2023-01-01.json": {"size": 1}})
+        manifest.save(file_io, manifest_file)
+
+        loaded = Manifest.load(file_io, manifest_file, ["ts"], TEST_ATTACHMENT_FIELDS)
+
+        assert loaded.get_channel("general") == {}
+
+    def shouldForgetChannelsNoLongerInExport(self, tmp_path: Path, file_io: FileIO):
+        manifest = Manifest(TEST_MESSAGE_FIELDS, TEST_ATTACHMENT_FIELDS)
+        manifest.set_channel("general", {"2023-01-01.json": {"size": 1}})
+        manifest.set_channel("random", {"2023-01-01.json": {"size": 1}})
+
+        manifest.remove_channels_except(["random"])
+
+        assert manifest.get_channel("general") == {}
+        assert manifest.get_channel("random") != {}
@@ -0,0 +1,51 @@
+import pytest
+
+from slack_export_csv_converter.markup import MarkupRewriter
+
+TEST_USERS = {"U0001": "John", "U0002": "Mary"}
+
+
+@pytest.fixture
+def rewriter() -> MarkupRewriter:
+    return MarkupRewriter(TEST_USERS)
+
+
+class TestRewrite:
+    def shouldReturnTextWithoutMarkupAsItIs(self, rewriter: MarkupRewriter):
+        text = "just some text > with no markup"
+
+        assert rewriter.rewrite(text) is text
+
+    def shouldRewriteUserMentionsToNames(self, rewriter: MarkupRewriter):
+        assert rewriter.rewrite("Hi <@U0001> and <@U0002>") == "Hi @John and @Mary"
+        assert rewriter.rewrite("<@U0001|john>") == "@John"
+
+    def shouldRewriteUnknownUserMentions(self, rewriter: MarkupRewriter):
+        assert rewriter.rewrite("<@U9999>") == "@Not available"
+        assert rewriter.rewrite("<@U9999|someone>") == "@someone"
+
+    def shouldRewriteChannelReferences(self, rewriter: MarkupRewriter):
+        assert rewriter.rewrite("see <#C0001|general>") == "see #general"
+        assert rewriter.rewrite("see <#C0001>") == "see #C0001"
+
+    def shouldRewriteSpecialMentions(self, rewriter: MarkupRewriter):
+        assert rewriter.rewrite("<!here> <!channel|channel>") == "@here @channel"
+        assert rewriter.rewrite("<!everyone>") == "@everyone"
+        assert rewriter.rewrite("<!subteam^S0001|@devs>") == "@devs"
+        assert rewriter.rewrite("<!date^1392734382^{date}|Feb 18>") == "Feb 18"
+
+    def shouldDecodeEntities(self, rewriter: MarkupRewriter):
+        assert rewriter.rewrite("a &lt;b&gt; &amp; c") == "a <b> & c"
+        assert rewriter.rewrite("&amp;lt; &nbsp;") == "&lt; &nbsp;"
+
+    def shouldNotTreatDecodedEntitiesAsMarkup(self, rewriter: MarkupRewriter):
+        assert rewriter.rewrite("&lt;@U0001&gt;") == "<@U0001>"
+
+    def shouldEscapeNewlines(self, rewriter: MarkupRewriter):
+        assert rewriter.rewrite("line 1\nline 2\n") == "line 1\\nline 2\\n"
+        assert rewriter.rewrite("<@U0001>\n&amp;") == "@John\\n&"
+
+    def shouldLeaveLinksAsTheyAre(self, rewriter: MarkupRewriter):
+        text = "<https://example.com|example> <mailto:john@example.com>"
+
+        assert rewriter.rewrite(text) == text
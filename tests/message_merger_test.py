@@ -0,0 +1,72 @@
+from typing import List
+
+from slack_export_csv_converter.message_merger import MessageMerger
+from slack_export_csv_converter.message_file_days import get_earliest_ts, parse_day
+from slack_export_csv_converter.types import ExportFileElement
+
+# 2023-01-02 00:00:00 in UTC
+DAY_START = 1672617600
+
+
+def message(seconds: float, text: str = "") -> ExportFileElement:
+    return {"ts": f"{DAY_START + seconds:.6f}", "text": text}
+
+
+def texts(messages: List[ExportFileElement]) -> List[str]:
+    return [message["text"] for message in messages]
+
+
+class TestMessageFileDays:
+    def shouldParseDayFileIsNamedAfter(self):
+        day = parse_day("2023-01-02.json")
+
+        assert (day.year, day.month, day.day) == (2023, 1, 2)
+        assert parse_day("canvas.json") is None
+
+    def shouldReturnStartOfDayBeforeInUTC(self):
+        assert get_earliest_ts("2023-01-03.json") == DAY_START
+        assert get_earliest_ts("canvas.json") is None
+
+
+class TestMessageMerger:
+    def shouldSortMessagesOfFileKeepingOrderOfSameTs(self):
+        merger = MessageMerger()
+
+        merger.add([message(2, "c"), message(1, "a"), message(1, "b")])
+
+        assert texts(merger.pop_ready()) == ["a", "b", "c"]
+        assert merger.pop_ready() == []
+
+    def shouldHoldMessagesNextFileMayPrecede(self):
+        merger = MessageMerger()
+        merger.add([message(0, "a"), message(86400 * 2, "c")])
+
+        # the file of 2023-01-04 may hold messages from the start of 2023-01-03 in UTC
+        assert texts(merger.pop_ready("2023-01-04.json")) == ["a"]
+
+        merger.add([message(86400, "b"), message(86400 * 3, "d")])
+        assert texts(merger.pop_ready("2023-01-10.json")) == ["b", "c", "d"]
+
+    def shouldMergeOverlappingFilesKeepingEarlierFilesFirstOnSameTs(self):
+        merger = MessageMerger()
+        merger.add([message(1, "a"), message(3, "c1"), message(5, "e")])
+        merger.add([message(2, "b"), message(3, "c2"), message(4, "d")])
+
+        assert texts(merger.pop_ready()) == ["a", "b", "c1", "c2", "d", "e"]
+
+    def shouldHoldEveryMessageUntilFileNotNamedAfterDayIsAdded(self):
+        merger = MessageMerger()
+        merger.add([message(0, "b")])
+
+        assert merger.pop_ready("canvas.json") == []
+
+        merger.add([message(-1, "a")])
+        assert texts(merger.pop_ready()) == ["a", "b"]
+
+    def shouldKeepElementsWithoutTsFirst(self):
+        merger = MessageMerger()
+
+        merger.add([message(0, "a"), {"text": "no ts"}])
+
+        assert texts(merger.pop_ready("2023-01-02.json")) == ["no ts"]
+        assert texts(merger.pop_ready()) == ["a"]
@@ -0,0 +1,112 @@
+from slack_export_csv_converter.downloader import DownloadResult
+from slack_export_csv_converter.metrics import (
+    ConversionMetrics,
+    ConversionReport,
+    summarize_latencies,
+)
+
+
+def create_metrics(scale: int) -> ConversionMetrics:
+    return ConversionMetrics(
+        files_read=1 * scale,
+        bytes_read=100 * scale,
+        decode_seconds=0.5 * scale,
+        generate_seconds=0.25 * scale,
+        write_seconds=0.125 * scale,
+        rows_written=10 * scale,
+        file_latencies=[0.75 * scale],
+        json_backends={"orjson": scale, "json (streaming)": 1},
+        downloads=DownloadResult(
+            downloaded=scale, failed=1, downloaded_bytes=1000 * scale, latencies=[scale]
+        ),
+    )
+
+
+class TestConversionMetrics:
+    def shouldAddUpMeasurements(self):
+        metrics = create_metrics(1) + create_metrics(2)
+
+        assert metrics == ConversionMetrics(
+            files_read=3,
+            bytes_read=300,
+            decode_seconds=1.5,
+            generate_seconds=0.75,
+            write_seconds=0.375,
+            rows_written=30,
+            file_latencies=[0.75, 1.5],
+            json_backends={"orjson": 3, "json (streaming)": 2},
+            downloads=DownloadResult(downloaded=3, failed=2, downloaded_bytes=3000),
+        )
+        assert metrics.downloads.latencies == [1, 2]
+
+    def shouldSummarizeLatenciesInDict(self):
+        metrics_dict = create_metrics(2).to_dict()
+
+        assert metrics_dict["files_read"] == 2
+        assert metrics_dict["rows_written"] == 20
+        assert metrics_dict["file_latency_seconds"] == {
+            "p50": 1.5,
+            "p90": 1.5,
+            "p99": 1.5,
+            "max": 1.5,
+        }
+        assert metrics_dict["json_backends"] == {"json (streaming)": 1, "orjson": 2}
+        assert metrics_dict["downloads"]["bytes"] == 2000
+        assert metrics_dict["downloads"]["latency_seconds"]["max"] == 2
+        assert metrics_dict["failures"] == 1
+
+
+class TestConversionReport:
+    def shouldAddUpMeasurementsOfChannelsToTotal(self):
+        report = ConversionReport(
+            json_backend="json",
+            channels={"general": create_metrics(1), "random": create_metrics(2)},
+        )
+
+        assert report.get_total() == create_metrics(1) + create_metrics(2)
+
+    def shouldConvertToDict(self):
+        report = ConversionReport(
+            json_backend="orjson",
+            elapsed_seconds=1.0,
+            channels={"general": create_metrics(1)},
+            failed_channels=["random"],
+        )
+
+        assert report.to_dict() == {
+            "json_backend": "orjson",
+            "elapsed_seconds": 1.0,
+            "total": create_metrics(1).to_dict(),
+            "channels": {"general": create_metrics(1).to_dict()},
+            "failed_channels": ["random"],
+        }
+
+    def shouldConvertEmptyReportToDict(self):
+        report_dict = ConversionReport(json_backend="json").to_dict()
+
+        assert report_dict["channels"] == {}
+        assert report_dict["total"]["files_read"] == 0
+        assert report_dict["total"]["file_latency_seconds"] == {}
+
+
+class TestSummarizeLatencies:
+    def shouldTakePercentilesOfNearestRank(self):
+        latencies = [float(x) for x in range(100, 0, -1)]
+
+        assert summarize_latencies(latencies) == {
+            "p50": 50.0,
+            "p90": 90.0,
+            "p99": 99.0,
+            "max": 100.0,
+        }
+
+    def shouldSummarizeSingleLatency(self):
+        assert summarize_latencies([0.5]) == {
+            "p50": 0.5,
+            "p90": 0.5,
+            "p99": 0.5,
+            "max": 0.5,
+        }
+
+    def shouldReturnEmptySummaryWithoutLatencies(self):
+        assert summarize_latencies([]) == {}
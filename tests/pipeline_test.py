@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from slack_export_csv_converter.pipeline import Pipeline
+
+
+class TestPipelineRun:
+    def shouldPassItemsThroughStagesInOrder(self):
+        pipeline = Pipeline(lambda x: x + 1, lambda x: x * 2, str)
+
+        assert pipeline.run(range(100)) == [str((x + 1) * 2) for x in range(100)]
+
+    def shouldRunWithSingleStage(self):
+        assert Pipeline(lambda x: -x).run([1, 2, 3]) == [-1, -2, -3]
+
+    def shouldRunStagesConcurrently(self):
+        def wait(x: int) -> int:
+            time.sleep(0.05)
+            return x
+
+        pipeline = Pipeline(wait, wait, wait)
+
+        start = time.perf_counter()
+        pipeline.run(range(10))
+        elapsed = time.perf_counter() - start
+
+        # each stage takes 0.5 seconds in total, 1.5 seconds one after another
+        assert elapsed < 1.0
+
+    def shouldHoldBackStageRunningAheadOfNextOne(self):
+        started: List[int] = []
+        lock = threading.Lock()
+        max_ahead = 0
+
+        def first(x: int) -> int:
+            with lock:
+                started.append(x)
+            return x
+
+        def slow(x: int) -> int:
+            nonlocal max_ahead
+            time.sleep(0.01)
+            with lock:
+                max_ahead = max(max_ahead, len(started) - x)
+            return x
+
+        Pipeline(first, slow, queue_size=2).run(range(20))
+
+        # at most the item in slow, items in the queue and the one being put
+        assert max_ahead <= 4
+
+    @pytest.mark.parametrize("failing_stage", [0, 1, 2])
+    def shouldRaiseErrorOfFailingStage(self, failing_stage: int):
+        def create_stage(index: int):
+            def stage(x: int) -> int:
+                if index == failing_stage and x == 5:
+                    raise ValueError("failed")
+                return x
+
+            return stage
+
+        pipeline = Pipeline(*[create_stage(index) for index in range(3)])
+
+        with pytest.raises(ValueError):
+            pipeline.run(range(1000))
+
+    def shouldRaiseErrorOfItems(self):
+        def items():
+            yield 1
+            raise KeyError("broken items")
+
+        with pytest.raises(KeyError):
+            Pipeline(lambda x: x, lambda x: x).run(items())
+
+    def shouldThrowWhenNoStageIsGiven(self):
+        with pytest.raises(ValueError):
+            Pipeline()
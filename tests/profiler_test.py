@@ -0,0 +1,124 @@
+import pickle
+import pstats
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.profiler import Profiler
+
+
+def decode_element(x: int) -> int:
+    return x
+
+
+def generate_row(x: int) -> str:
+    return str(x)
+
+
+def write_rows(rows: List[str]) -> None:
+    "".join(rows)
+
+
+def decode_file() -> Iterator[int]:
+    for x in range(10):
+        yield decode_element(x)
+
+
+def convert_file(profiler: Profiler) -> None:
+    with profiler.stage("generate"):
+        rows = [generate_row(x) for x in profiler.iterate("decode", decode_file())]
+    with profiler.stage("write"):
+        write_rows(rows)
+
+
+def get_function_names(raw_stats: Dict) -> List[str]:
+    return [function_name for (_, _, function_name) in raw_stats.keys()]
+
+
+class TestProfilerCollect:
+    def shouldKeepStatisticsOfEachStageApart(self):
+        profiler = Profiler()
+
+        convert_file(profiler)
+        result = profiler.collect()
+
+        assert result.stats.keys() == {"decode", "generate", "write"}
+        assert "decode_element" in get_function_names(result.stats["decode"])
+        assert "generate_row" in get_function_names(result.stats["generate"])
+        assert "write_rows" in get_function_names(result.stats["write"])
+
+    def shouldLeaveNestedStageOutOfStatisticsOfOuterStage(self):
+        profiler = Profiler()
+
+        convert_file(profiler)
+        result = profiler.collect()
+
+        assert "decode_element" not in get_function_names(result.stats["generate"])
+        assert "generate_row" not in get_function_names(result.stats["decode"])
+
+    def shouldStartOverAfterCollecting(self):
+        profiler = Profiler()
+        convert_file(profiler)
+        profiler.collect()
+
+        with profiler.stage("write"):
+            write_rows([])
+        result = profiler.collect()
+
+        assert result.stats.keys() == {"write"}
+
+    def shouldTracePeakMemoryOfChannelsWhenRequested(self):
+        profiler = Profiler(trace_memory=True)
+
+        with profiler.channel("general"):
+            data = [bytearray(1024 * 1024)]
+            del data
+        result = profiler.collect()
+
+        assert result.memory_peaks["general"] >= 1024 * 1024
+
+    def shouldNotTraceMemoryUnlessRequested(self):
+        profiler = Profiler()
+
+        with profiler.channel("general"):
+            convert_file(profiler)
+        result = profiler.collect()
+
+        assert result.memory_peaks == {}
+
+
+class TestProfilerWrite:
+    def shouldWriteStatisticsOfEachStageAndSummary(self, tmp_path: Path):
+        profiler = Profiler(trace_memory=True)
+        with profiler.channel("general"):
+            convert_file(profiler)
+
+        profiler.write(FileIO(), tmp_path)
+
+        for stage in ["decode", "generate", "write"]:
+            stats = pstats.Stats(str(tmp_path / f"{stage}.pstats"))
+            assert stats.total_calls > 0
+        summary = (tmp_path / "summary.txt").read_text(encoding="utf-8")
+        assert "#general" in summary
+        assert "generate_row" in summary
+
+    def shouldAddUpStatisticsCollectedByWorkerProfilers(self, tmp_path: Path):
+        profiler = Profiler(trace_memory=True)
+        for channel in ["general", "random"]:
+            # a copy of the profiler is sent to each worker process
+            worker_profiler = pickle.loads(pickle.dumps(profiler))
+            with worker_profiler.channel(channel):
+                convert_file(worker_profiler)
+            profiler.add(pickle.loads(pickle.dumps(worker_profiler.collect())))
+
+        profiler.write(FileIO(), tmp_path)
+
+        stats = pstats.Stats(str(tmp_path / "decode.pstats"))
+        decode_calls = [
+            primitive_calls
+            for ((_, _, function_name), (primitive_calls, *_)) in stats.stats.items()
+            if function_name == "decode_element"
+        ]
+        assert decode_calls == [20]
+        summary = (tmp_path / "summary.txt").read_text(encoding="utf-8")
+        assert "#general" in summary and "#random" in summary
@@ -0,0 +1,159 @@
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from slack_export_csv_converter.exceptions import ConverterException
+from slack_export_csv_converter.search_index import SearchIndex, search
+
+TEST_MESSAGE_FIELDS = ["ts", "ユーザー", "テキスト"]
+TEST_MESSAGES = [
+    {"ts": "1672531200.000000", "ユーザー": "John", "テキスト": "来週の会議資料を共有します"},
+    {"ts": "1672531201.000000", "ユーザー": "Jane", "テキスト": "Release notes are ready"},
+    {"ts": "1672531202.000000", "ユーザー": "John", "テキスト": "会議は15時からです"},
+    {"ts": "1672531203.000000", "ユーザー": "Jane", "テキスト": ""},
+    {"ts": "1672531204.000000", "ユーザー": "John", "テキスト": '100%_done "quoted" OR NOT'},
+]
+
+
+@pytest.fixture
+def index_file(tmp_path: Path) -> Path:
+    return tmp_path / "search.sqlite3"
+
+
+def write_index(index_file: Path, **kwargs) -> SearchIndex:
+    index = SearchIndex(index_file, TEST_MESSAGE_FIELDS, **kwargs)
+    index.create_tables()
+    index.write_rows("general", TEST_MESSAGES, [])
+    index.write_rows("random", TEST_MESSAGES[:1], [])
+    index.create_indexes()
+    index.close()
+    return index
+
+
+def query(index_file: Path, statement: str) -> List[Tuple]:
+    with sqlite3.connect(str(index_file)) as connection:
+        return connection.execute(statement).fetchall()
+
+
+def texts(rows: List[dict]) -> List[Tuple[str, str]]:
+    return [(row["channel"], row["テキスト"]) for row in rows]
+
+
+class TestSearchIndexWriteRows:
+    def shouldIndexMessagesWithTextAlongWithChannel(self, index_file: Path):
+        write_index(index_file)
+
+        rows = query(index_file, "SELECT * FROM messages")
+        assert rows == [
+            ("general", *message.values()) for message in TEST_MESSAGES if message["テキスト"]
+        ] + [("random", *TEST_MESSAGES[0].values())]
+
+    def shouldIndexEveryRowInBatches(self, index_file: Path):
+        write_index(index_file, batch_size=2)
+
+        assert query(index_file, "SELECT COUNT(*) FROM messages") == [(5,)]
+
+    def shouldWriteFromProcessOtherThanTheOneCreatingIndex(self, index_file: Path):
+        index = SearchIndex(index_file, TEST_MESSAGE_FIELDS)
+        index.create_tables()
+
+        # a copy of the index is sent to each worker process
+        worker_index = pickle.loads(pickle.dumps(index))
+        worker_index.write_rows("general", TEST_MESSAGES, [])
+        worker_index.close()
+
+        assert query(index_file, "SELECT COUNT(*) FROM messages") == [(4,)]
+
+    def shouldReplaceRowsOfPreviousConversion(self, index_file: Path):
+        write_index(index_file)
+
+        SearchIndex(index_file, TEST_MESSAGE_FIELDS).create_tables()
+
+        assert query(index_file, "SELECT COUNT(*) FROM messages") == [(0,)]
+
+    @pytest.mark.parametrize("missing_field", ["ts", "テキスト"])
+    def shouldThrowWhenRequiredFieldIsMissing(self, index_file: Path, missing_field):
+        fields = [field for field in TEST_MESSAGE_FIELDS if field != missing_field]
+
+        with pytest.raises(ConverterException):
+            SearchIndex(index_file, fields)
+
+
+class TestSearch:
+    def shouldFindMessagesContainingTermInOrderTheyWereIndexed(self, index_file: Path):
+        write_index(index_file)
+
+        rows = search(index_file, "会議資料")
+
+        assert rows == [
+            {"channel": "general", **TEST_MESSAGES[0]},
+            {"channel": "random", **TEST_MESSAGES[0]},
+        ]
+
+    def shouldFindMessagesContainingEveryTerm(self, index_file: Path):
+        write_index(index_file)
+
+        assert texts(search(index_file, "会議 15時")) == [
+            ("general", TEST_MESSAGES[2]["テキスト"])
+        ]
+        assert texts(search(index_file, "会議 共有します")) == [
+            ("general", TEST_MESSAGES[0]["テキスト"]),
+            ("random", TEST_MESSAGES[0]["テキスト"]),
+        ]
+
+    def shouldMatchTermsShorterThanTrigram(self, index_file: Path):
+        write_index(index_file)
+
+        assert texts(search(index_file, "会議")) == [
+            ("general", TEST_MESSAGES[0]["テキスト"]),
+            ("general", TEST_MESSAGES[2]["テキスト"]),
+            ("random", TEST_MESSAGES[0]["テキスト"]),
+        ]
+
+    def shouldIgnoreCaseOfAsciiLetters(self, index_file: Path):
+        write_index(index_file)
+
+        assert texts(search(index_file, "RELEASE")) == [
+            ("general", TEST_MESSAGES[1]["テキスト"])
+        ]
+
+    @pytest.mark.parametrize("term", ['"quoted"', "OR NOT", "0%_", "%", "_d"])
+    def shouldMatchTermsAsTheyAre(self, index_file: Path, term: str):
+        write_index(index_file)
+
+        assert texts(search(index_file, term)) == [("general", TEST_MESSAGES[4]["テキスト"])]
+
+    def shouldFindNothingWhenTermIsNotContained(self, index_file: Path):
+        write_index(index_file)
+
+        assert search(index_file, "存在しない") == []
+        assert search(index_file, "%%") == []
+
+    def shouldSearchInChannel(self, index_file: Path):
+        write_index(index_file)
+
+        assert texts(search(index_file, "会議資料", channel="random")) == [
+            ("random", TEST_MESSAGES[0]["テキスト"])
+        ]
+
+    def shouldReturnUpToLimit(self, index_file: Path):
+        write_index(index_file)
+
+        assert texts(search(index_file, "会議", limit=1)) == [
+            ("general", TEST_MESSAGES[0]["テキスト"])
+        ]
+
+    def shouldThrowWhenQueryIsEmpty(self, index_file: Path):
+        write_index(index_file)
+
+        with pytest.raises(ConverterException):
+            search(index_file, "  ")
+
+    def shouldThrowWithoutCreatingIndexWhenNotFound(self, index_file: Path):
+        with pytest.raises(ConverterException):
+            search(index_file, "会議")
+
+        assert not index_file.exists()
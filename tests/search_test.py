@@ -0,0 +1,54 @@
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from search import main
+from slack_export_csv_converter.search_index import SearchIndex
+
+TEST_MESSAGES = [
+    {"ts": "1672531200.000000", "テキスト": "会議資料です"},
+    {"ts": "1672531201.000000", "テキスト": "会議は15時から"},
+]
+
+
+@pytest.fixture
+def index_file(tmp_path: Path) -> Path:
+    index_file = tmp_path / "search.sqlite3"
+    index = SearchIndex(index_file, ["ts", "テキスト"])
+    index.create_tables()
+    index.write_rows("general", TEST_MESSAGES, [])
+    index.create_indexes()
+    index.close()
+    return index_file
+
+
+class TestSearchMain:
+    def shouldPrintMatchingRowsAsCSV(self, index_file: Path, capsys):
+        main([str(index_file), "会議", "資料"])
+
+        assert capsys.readouterr().out.splitlines() == [
+            '"channel","ts","テキスト"',
+            '"general","1672531200.000000","会議資料です"',
+        ]
+
+    def shouldPassOptionsToSearch(self, index_file: Path):
+        with patch("search.search", return_value=[]) as search:
+            main([str(index_file), "会議", "--channel=random", "--limit=5"])
+
+            search.assert_called_once_with(index_file, "会議", channel="random", limit=5)
+
+    def shouldPrintNothingWhenNoRowsMatch(self, index_file: Path, capsys):
+        main([str(index_file), "存在しない"])
+
+        assert capsys.readouterr().out == ""
+
+    @pytest.mark.parametrize(
+        "args", [[], ["search.sqlite3"], ["search.sqlite3", "会議", "--workers=2"]]
+    )
+    def shouldExitWhenArgumentsAreInvalid(self, args):
+        with pytest.raises(SystemExit):
+            main(args)
+
+    def shouldExitWhenIndexIsNotFound(self, tmp_path: Path):
+        with pytest.raises(SystemExit):
+            main([str(tmp_path / "search.sqlite3"), "会議"])
@@ -0,0 +1,164 @@
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from slack_export_csv_converter.exceptions import ConverterException
+from slack_export_csv_converter.sqlite_sink import SQLiteDatabase, SQLiteSink
+
+TEST_MESSAGE_FIELDS = ["ts", "ユーザー", "テキスト", "thread_ts"]
+TEST_ATTACHMENT_FIELDS = ["ファイル名", "message_ts", "url"]
+TEST_MESSAGES = [
+    {"ts": f"16725312{x:02}.000000", "ユーザー": "John", "テキスト": f"{x}", "thread_ts": ""}
+    for x in range(5)
+]
+TEST_ATTACHMENTS = [
+    {
+        "ファイル名": "a.png",
+        "message_ts": "1672531200.000000",
+        "url": "https://example.com/a.png",
+    }
+]
+
+
+@pytest.fixture
+def database_file(tmp_path: Path) -> Path:
+    return tmp_path / "workspace.sqlite3"
+
+
+def create_sink(database_file: Path, **kwargs) -> SQLiteSink:
+    return SQLiteSink(
+        database_file, TEST_MESSAGE_FIELDS, TEST_ATTACHMENT_FIELDS, **kwargs
+    )
+
+
+def query(database_file: Path, statement: str) -> List[Tuple]:
+    with sqlite3.connect(str(database_file)) as connection:
+        return connection.execute(statement).fetchall()
+
+
+class TestSQLiteSinkWriteRows:
+    def shouldWriteRowsWithChannelOfEachTable(self, database_file: Path):
+        sink = create_sink(database_file)
+        sink.create_tables()
+
+        sink.write_rows("general", TEST_MESSAGES, TEST_ATTACHMENTS)
+        sink.write_rows("random", TEST_MESSAGES[:1], [])
+        sink.close()
+
+        messages = query(database_file, "SELECT * FROM messages")
+        assert messages == [
+            ("general", *message.values()) for message in TEST_MESSAGES
+        ] + [("random", *TEST_MESSAGES[0].values())]
+        attachments = query(database_file, "SELECT * FROM attachments")
+        assert attachments == [("general", *TEST_ATTACHMENTS[0].values())]
+
+    def shouldWriteEveryRowInBatches(self, database_file: Path):
+        sink = create_sink(database_file, batch_size=2)
+        sink.create_tables()
+
+        sink.write_rows("general", TEST_MESSAGES, TEST_ATTACHMENTS)
+        sink.close()
+
+        assert query(database_file, "SELECT COUNT(*) FROM messages") == [
+            (len(TEST_MESSAGES),)
+        ]
+
+    def shouldWriteFromProcessOtherThanTheOneCreatingTables(self, database_file: Path):
+        sink = create_sink(database_file)
+        sink.create_tables()
+
+        # a copy of the sink is sent to each worker process
+        worker_sink = pickle.loads(pickle.dumps(sink))
+        worker_sink.write_rows("general", TEST_MESSAGES, [])
+        worker_sink.close()
+
+        assert len(query(database_file, "SELECT * FROM messages")) == len(TEST_MESSAGES)
+
+    def shouldWriteRowsOfTablesWithSingleField(self, database_file: Path):
+        sink = SQLiteSink(database_file, ["ts"], ["url"])
+        sink.create_tables()
+
+        sink.write_rows("general", TEST_MESSAGES[:1], TEST_ATTACHMENTS)
+        sink.close()
+
+        assert query(database_file, "SELECT * FROM messages") == [
+            ("general", TEST_MESSAGES[0]["ts"])
+        ]
+        assert query(database_file, "SELECT * FROM attachments") == [
+            ("general", TEST_ATTACHMENTS[0]["url"])
+        ]
+
+    def shouldThrowWhenTablesWereNotCreated(self, database_file: Path):
+        sink = create_sink(database_file)
+
+        with pytest.raises(ConverterException):
+            sink.write_rows("general", TEST_MESSAGES, [])
+
+    def shouldThrowWhenBatchSizeIsNotPositive(self, database_file: Path):
+        with pytest.raises(ConverterException):
+            create_sink(database_file, batch_size=0)
+
+
+class TestSQLiteSinkCreateTables:
+    def shouldUseWriteAheadLog(self, database_file: Path):
+        create_sink(database_file).create_tables()
+
+        assert query(database_file, "PRAGMA journal_mode") == [("wal",)]
+
+    def shouldReplaceRowsOfPreviousConversion(self, database_file: Path):
+        sink = create_sink(database_file)
+        sink.create_tables()
+        sink.write_rows("general", TEST_MESSAGES, TEST_ATTACHMENTS)
+        sink.create_indexes()
+
+        sink.create_tables()
+
+        assert query(database_file, "SELECT COUNT(*) FROM messages") == [(0,)]
+        assert query(database_file, "SELECT name FROM sqlite_master") == [
+            ("messages",),
+            ("attachments",),
+        ]
+
+
+class TestSQLiteSinkCreateIndexes:
+    def shouldIndexFieldsTablesHave(self, database_file: Path):
+        sink = create_sink(database_file)
+        sink.create_tables()
+        sink.write_rows("general", TEST_MESSAGES, TEST_ATTACHMENTS)
+
+        sink.create_indexes()
+        sink.close()
+
+        indexes = query(
+            database_file,
+            "SELECT tbl_name, name FROM sqlite_master WHERE type = 'index' ORDER BY name",
+        )
+        assert indexes == [
+            ("attachments", "attachments_message_ts"),
+            ("messages", "messages_thread_ts"),
+            ("messages", "messages_ts"),
+            ("messages", "messages_ユーザー"),
+        ]
+        plan = query(
+            database_file,
+            "EXPLAIN QUERY PLAN SELECT * FROM messages WHERE thread_ts = '1'",
+        )
+        assert "messages_thread_ts" in str(plan)
+
+
+class TestSQLiteDatabase:
+    def shouldThrowWhenCreatingDatabaseMissingLifecycleMethod(self, database_file: Path):
+        class IncompleteDatabase(SQLiteDatabase):
+            def create_tables(self) -> None:
+                pass
+
+            def write_rows(
+                self, channel, csv_data_messages, csv_data_attachments
+            ) -> None:
+                pass
+
+        with pytest.raises(TypeError):
+            IncompleteDatabase(database_file)
@@ -0,0 +1,95 @@
+import pytest
+import random
+from datetime import datetime, timedelta, timezone
+
+from slack_export_csv_converter.timestamp_formatter import (
+    TimestampFormatter,
+    parse_timezone,
+)
+from slack_export_csv_converter.exceptions import ConverterException
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+requires_zoneinfo = pytest.mark.skipif(
+    ZoneInfo is None, reason="zoneinfo is not available"
+)
+
+
+def format_by_datetime(ts, tz=None) -> str:
+    return str(datetime.fromtimestamp(float(ts), tz).replace(tzinfo=None))
+
+
+class TestFormat:
+    def shouldFormatTimestampInLocalTimezone(self):
+        formatter = TimestampFormatter()
+
+        # whatever timezone the host is set to
+        assert formatter.format("1672531200.000000") == format_by_datetime(1672531200)
+        assert formatter.format(1672531200) == format_by_datetime(1672531200)
+        assert formatter.format("1672534799.123456") == format_by_datetime(
+            "1672534799.123456"
+        )
+
+    def shouldFormatTimestampInGivenTimezone(self):
+        formatter = TimestampFormatter(timezone.utc)
+
+        assert formatter.format("1672531200.000000") == "2023-01-01 00:00:00"
+        assert formatter.format("1672531200.5") == "2023-01-01 00:00:00.500000"
+
+    def shouldMatchDatetimeForRandomTimestamps(self):
+        rng = random.Random(0)
+        for tz in [None, timezone.utc, timezone(timedelta(hours=-3, minutes=-30))]:
+            formatter = TimestampFormatter(tz)
+            for _ in range(10_000):
+                seconds = rng.randint(0, 2_000_000_000)
+                for ts in [
+                    str(seconds),
+                    f"{seconds}.{rng.randint(0, 999_999):06d}",
+                    seconds + rng.random(),
+                ]:
+                    assert formatter.format(ts) == format_by_datetime(ts, tz)
+
+    @requires_zoneinfo
+    def shouldMatchDatetimeAroundDaylightSavingTransitions(self):
+        # transitions of 2023 in both zones, Lord Howe shifting by 30 minutes
+        cases = [
+            ("America/New_York", [1678604400, 1699164000]),
+            ("Australia/Lord_Howe", [1680357600, 1696089600]),
+        ]
+        for name, transitions in cases:
+            tz = ZoneInfo(name)
+            formatter = TimestampFormatter(tz)
+            for transition in transitions:
+                for seconds in range(transition - 7200, transition + 7200, 7):
+                    ts = f"{seconds}.250000"
+                    assert formatter.format(ts) == format_by_datetime(ts, tz)
+
+    def shouldFormatCompactTimestamp(self):
+        formatter = TimestampFormatter(timezone.utc)
+
+        assert formatter.format_compact(1672531200) == "20230101000000"
+        assert formatter.format_compact("1672531200.5") == "20230101000000.500000"
+
+
+class TestParseTimezone:
+    def shouldParseUTC(self):
+        assert parse_timezone("UTC") is timezone.utc
+        assert parse_timezone("z") is timezone.utc
+
+    def shouldParseUTCOffset(self):
+        assert parse_timezone("+09:00").utcoffset(None) == timedelta(hours=9)
+        assert parse_timezone("-0330").utcoffset(None) == timedelta(hours=-3, minutes=-30)
+
+    @requires_zoneinfo
+    def shouldParseTimezoneName(self):
+        assert parse_timezone("Asia/Tokyo") == ZoneInfo("Asia/Tokyo")
+
+    def shouldThrowWhenTimezoneIsUnknown(self):
+        with pytest.raises(ConverterException):
+            parse_timezone("Nowhere/Unknown")
+
+        with pytest.raises(ConverterException):
+            parse_timezone("+9")
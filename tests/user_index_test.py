@@ -0,0 +1,121 @@
+import pytest
+import json
+import pickle
+import random
+from pathlib import Path
+
+from slack_export_csv_converter.user_index import UserIndex
+from slack_export_csv_converter.file_io import FileIO
+from slack_export_csv_converter.csv_data_generator import CSVDataGenerator
+
+
+TEST_USERS_DATA = [
+    {"id": "U2", "profile": {"real_name": "Mary"}, "name": "mary"},
+    {"id": "U10", "profile": {"real_name": "山田 太郎"}, "deleted": False},
+    {"id": "U1", "profile": {"real_name": "John", "image_72": "https://x"}},
+    {"id": "W3", "profile": {"real_name": ""}},
+]
+
+
+@pytest.fixture(scope="function")
+def users_file(tmp_path: Path) -> Path:
+    users_file = tmp_path / "users.json"
+    users_file.write_text(json.dumps(TEST_USERS_DATA), encoding="utf-8")
+    return users_file
+
+
+class TestUserIndex:
+    def shouldLookUpRealNames(self, tmp_path: Path):
+        user_index = UserIndex.build(TEST_USERS_DATA, tmp_path / "users.idx", "test")
+
+        assert len(user_index) == len(TEST_USERS_DATA)
+        for user in TEST_USERS_DATA:
+            assert user_index.get(user["id"], "") == user["profile"]["real_name"]
+        assert user_index.get("U3", "Not available") == "Not available"
+        assert user_index.get("", "Not available") == "Not available"
+
+    def shouldLookUpSameNamesAsDictForManyUsers(self, tmp_path: Path):
+        rng = random.Random(0)
+        users_data = [
+            {"id": f"U{rng.getrandbits(40):010X}", "profile": {"real_name": f"User {x}"}}
+            for x in range(5000)
+        ]
+        mapping = {user["id"]: user["profile"]["real_name"] for user in users_data}
+
+        user_index = UserIndex.build(users_data, tmp_path / "users.idx", "test")
+
+        for user_id, name in mapping.items():
+            assert user_index.get(user_id, "Not available") == name
+        for user_id in ["U", "U0", "UZZZZZZZZZZZ", "A", "a"]:
+            assert user_index.get(user_id, "Not available") == "Not available"
+
+    def shouldLookUpFromEmptyIndex(self, tmp_path: Path):
+        user_index = UserIndex.build([], tmp_path / "users.idx", "test")
+
+        assert len(user_index) == 0
+        assert user_index.get("U1", "Not available") == "Not available"
+
+    def shouldKeepOnlyNamesLookedUpRecentlyInMemory(self, tmp_path: Path):
+        UserIndex.build(TEST_USERS_DATA, tmp_path / "users.idx", "test")
+        user_index = UserIndex(tmp_path / "users.idx", cache_size=2)
+
+        for _ in range(2):
+            for user in TEST_USERS_DATA:
+                assert user_index.get(user["id"], "") == user["profile"]["real_name"]
+
+        cache_info = user_index._lookup.cache_info()
+        assert cache_info.currsize == 2
+        assert cache_info.hits == 0
+
+    def shouldBePicklableByReopeningIndexFile(self, tmp_path: Path):
+        user_index = UserIndex.build(TEST_USERS_DATA, tmp_path / "users.idx", "test")
+
+        unpickled_user_index = pickle.loads(pickle.dumps(user_index))
+
+        assert unpickled_user_index.get("U10", "") == "山田 太郎"
+        assert unpickled_user_index.get_fingerprint() == "test"
+
+    def shouldReuseIndexBuiltFromSameUsersFile(self, tmp_path: Path, users_file: Path):
+        index_file = tmp_path / "users.idx"
+        UserIndex.load_or_build(FileIO(), users_file, index_file)
+        mtime = index_file.stat().st_mtime_ns
+
+        user_index = UserIndex.load_or_build(FileIO(), users_file, index_file)
+
+        assert index_file.stat().st_mtime_ns == mtime
+        assert user_index.get("U1", "") == "John"
+
+    def shouldRebuildIndexWhenUsersFileChanged(self, tmp_path: Path, users_file: Path):
+        index_file = tmp_path / "users.idx"
+        UserIndex.load_or_build(FileIO(), users_file, index_file)
+        users_file.write_text(
+            json.dumps([{"id": "U1", "profile": {"real_name": "Johnny"}}]),
+            encoding="utf-8",
+        )
+
+        user_index = UserIndex.load_or_build(FileIO(), users_file, index_file)
+
+        assert len(user_index) == 1
+        assert user_index.get("U1", "") == "Johnny"
+
+    def shouldRebuildIndexWhenIndexFileIsBroken(self, tmp_path: Path, users_file: Path):
+        index_file = tmp_path / "users.idx"
+        index_file.write_bytes(b"broken")
+
+        user_index = UserIndex.load_or_build(FileIO(), users_file, index_file)
+
+        assert user_index.get("U2", "") == "Mary"
+
+    def shouldConvertSameUserNamesAsUsersData(self, tmp_path: Path):
+        user_index = UserIndex.build(TEST_USERS_DATA, tmp_path / "users.idx", "test")
+        messages_data = [
+            {"type": "message", "ts": "1672531200.000000", "user": user_id, "text": text}
+            for user_id in ["U1", "U10", "W3", "unknown"]
+            for text in ["<@U2> hi", "<@nobody>"]
+        ]
+
+        (messages, _) = CSVDataGenerator(user_index).generate_rows(messages_data)
+
+        assert messages == CSVDataGenerator(TEST_USERS_DATA).generate_messages(
+            messages_data
+        )